@@ -87,6 +87,17 @@ DATABASES = {
 }
 
 
+# Autenticación: el usuario de la sesión se carga con sus perfiles de
+# Cliente y Conductor en la misma consulta (ver src/backends.py).
+# ModelBackend se conserva para las sesiones iniciadas con él y el código
+# que lo nombra explícitamente; los nuevos inicios de sesión usan el primero.
+
+AUTHENTICATION_BACKENDS = [
+    'src.backends.PerfilModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -142,3 +153,43 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = '/'  # Redirige al inicio si no está autenticado
 LOGIN_REDIRECT_URL = '/home/'  # Redirige a home después del login
 LOGOUT_REDIRECT_URL = '/'  # Redirige al inicio después del logout
+
+# ====================================
+# CONFIGURACIÓN DE TAREAS EN SEGUNDO PLANO
+# ====================================
+BACKGROUND_WORKERS = 2  # Hilos del pool local que generan reportes
+REPORT_JOB_STALE_MINUTES = 30  # Trabajos pendientes más antiguos no se reutilizan
+REPORT_JOB_RETENTION_DAYS = 7  # purgar_reportes elimina los trabajos y archivos más antiguos
+
+# ====================================
+# CACHÉ DE REPORTES
+# ====================================
+REPORT_CACHE_TTL = 15 * 60  # Segundos que un reporte permanece en caché
+REPORT_CACHE_MAX_ENTRIES = 128  # Al superarse se descarta el menos usado (LRU)
+REPORT_CACHE_MAX_BYTES = 5 * 1024 * 1024  # Archivos más grandes no se cachean
+
+# ====================================
+# CACHÉ DE MÉTRICAS DE COMPAÑÍAS
+# ====================================
+COMPANY_METRICS_CACHE_TTL = 10 * 60  # Segundos que las métricas del tablero permanecen en caché
+COMPANY_METRICS_CACHE_MAX_ENTRIES = 512
+
+# ====================================
+# CACHÉ DE AUTOCOMPLETADO DE CONDUCTORES
+# ====================================
+AUTOCOMPLETE_CACHE_TTL = 5 * 60  # Segundos que un resultado permanece en caché
+AUTOCOMPLETE_CACHE_MAX_ENTRIES = 256
+
+# ====================================
+# CACHÉ DEL LISTADO DE COMPAÑÍAS
+# ====================================
+COMPANIES_LIST_CACHE_TTL = 60 * 60  # Segundos; las señales de Compania invalidan antes
+
+# ====================================
+# CARGA DE DOCUMENTOS DE CONDUCTORES
+# ====================================
+DRIVER_DOCUMENT_MAX_BYTES = 5 * 1024 * 1024  # Tamaño máximo por archivo; se valida mientras se recibe
+DOCUMENT_PREVIEW_MAX_PX = 1280  # Lado mayor de la vista previa de las fotos
+DOCUMENT_THUMBNAIL_MAX_PX = 256  # Lado mayor de la miniatura
+DOCUMENT_DERIVATIVE_QUALITY = 80  # Calidad JPEG de las versiones reducidas
+DOCUMENT_ORPHAN_GRACE_HOURS = 24  # Archivos sin registro más recientes no se purgan
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PaginaWebConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'src'
+
+    def ready(self):
+        # Registrar las señales de los modelos
+        from . import signals  # noqa: F401
@@ -0,0 +1,24 @@
+"""
+Backend de autenticación del proyecto.
+
+Carga el usuario de la sesión junto con sus perfiles de Cliente y
+Conductor en una sola consulta (LEFT JOIN). Así get_user_type() y los
+decoradores de src/utils/decorators.py resuelven el rol sin consultas
+adicionales. Como el rol se lee en cada petición, crear o eliminar un
+perfil se refleja en la petición siguiente sin invalidar nada.
+"""
+
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth import get_user_model
+
+
+class PerfilModelBackend(ModelBackend):
+    """ModelBackend que trae los perfiles de Cliente y Conductor con el usuario."""
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related('cliente', 'conductor').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,41 @@
+"""
+Genera la vista previa y la miniatura de los documentos de imagen que aún
+no las tienen (p. ej. documentos subidos antes de existir el proceso o
+que quedaron pendientes si el worker se detuvo). Retoma los contenidos
+que quedaron 'En Proceso', por lo que debe ejecutarse sin workers generando.
+Ejecutar: python manage.py generar_derivados_documentos [--reintentar-errores]
+"""
+
+from django.core.management.base import BaseCommand
+
+from src.models.models import DocumentoConductor
+from src.utils.derivados import es_imagen, generar_derivados
+
+
+class Command(BaseCommand):
+    help = 'Genera las versiones reducidas pendientes de los documentos de conductores'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reintentar-errores',
+            action='store_true',
+            help='Incluye los documentos cuyo procesamiento falló antes'
+        )
+
+    def handle(self, *args, **options):
+        reintentar = options['reintentar_errores']
+        estados = ['Pendiente', 'Error'] if reintentar else ['Pendiente']
+        pendientes = DocumentoConductor.objects.filter(estado_derivados__in=estados).values_list('id', 'archivo')
+
+        resultados = {}
+        # Se procesan en este proceso, uno a la vez, para acotar la memoria
+        for documento_id, archivo in pendientes.iterator():
+            if es_imagen(archivo):
+                estado = generar_derivados(documento_id, retomar=True, reintentar=reintentar)
+            else:
+                DocumentoConductor.objects.filter(pk=documento_id).update(estado_derivados='No Aplica')
+                estado = 'No Aplica'
+            resultados[estado] = resultados.get(estado, 0) + 1
+
+        resumen = ', '.join(f'{estado}: {total}' for estado, total in sorted(resultados.items())) or 'sin pendientes'
+        self.stdout.write(self.style.SUCCESS(f'Documentos procesados ({resumen})'))
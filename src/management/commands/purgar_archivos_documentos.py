@@ -0,0 +1,165 @@
+"""
+Mantenimiento del almacenamiento por contenido de los documentos.
+Elimina los contenidos que ya no usa ningún documento, los archivos que
+nunca llegaron a tener fila en ArchivoAlmacenado (p. ej. de un registro
+interrumpido), las versiones reducidas que ya no usa ningún documento y,
+con --verificar, comprueba que cada archivo conserve su hash.
+Ejecutar: python manage.py purgar_archivos_documentos [--verificar] [--simular] [--gracia-horas N]
+"""
+
+import os
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from src.models.models import ArchivoAlmacenado, DocumentoConductor
+from src.utils.almacenamiento import CAS_PREFIX, PREFIJO_TEMPORAL, cas_storage
+
+# Filas consultadas por lote al buscar archivos sin registro
+LOTE_ARCHIVOS = 500
+
+# Directorio de las versiones reducidas (vista previa y miniatura)
+DERIVADOS_PREFIX = DocumentoConductor._meta.get_field('vista_previa').upload_to.split('%')[0].rstrip('/')
+
+
+class Command(BaseCommand):
+    help = 'Elimina los archivos de documentos sin referencias y verifica su integridad'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Recalcula el hash de cada archivo y reporta los que no coinciden o faltan'
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Muestra lo que se eliminaría sin eliminar nada'
+        )
+        parser.add_argument(
+            '--gracia-horas',
+            type=float,
+            default=getattr(settings, 'DOCUMENT_ORPHAN_GRACE_HOURS', 24),
+            help='Antigüedad mínima de un archivo sin registro para eliminarlo'
+        )
+
+    def handle(self, *args, **options):
+        eliminados = 0
+        for contenido in ArchivoAlmacenado.objects.filter(referencias=0).iterator():
+            if options['simular']:
+                self.stdout.write(f'Se eliminaría {contenido.archivo.name}')
+                eliminados += 1
+                continue
+            with transaction.atomic():
+                # Se vuelve a comprobar con la fila bloqueada: un registro
+                # pudo reutilizar el contenido mientras tanto
+                bloqueado = ArchivoAlmacenado.objects.select_for_update().filter(
+                    pk=contenido.pk, referencias=0, documentos__isnull=True
+                ).first()
+                if bloqueado is None:
+                    continue
+                storage, nombre = bloqueado.archivo.storage, bloqueado.archivo.name
+                bloqueado.delete()
+                # El archivo se borra solo si la eliminación de la fila se confirma
+                transaction.on_commit(lambda storage=storage, nombre=nombre: storage.delete(nombre))
+            eliminados += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Contenidos sin referencias eliminados: {eliminados}'))
+
+        # Un registro en curso pudo escribir (o reutilizar) un archivo sin
+        # haber confirmado aún su fila: solo se eliminan los que llevan más
+        # del plazo de gracia sin usarse
+        limite = time.time() - options['gracia_horas'] * 3600
+        huerfanos = self._purgar_sin_registro(
+            cas_storage(), CAS_PREFIX, self._contenidos_registrados, limite, options['simular']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archivos sin registro eliminados: {huerfanos}'))
+
+        # Las versiones reducidas se comparten entre los documentos con el
+        # mismo contenido: se eliminan cuando ya no las usa ninguno. El plazo
+        # de gracia cubre las que un worker guardó y aún no asignó.
+        derivados = self._purgar_sin_registro(
+            default_storage, DERIVADOS_PREFIX, self._derivados_registrados, limite, options['simular']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Versiones reducidas sin documento eliminadas: {derivados}'))
+
+        if options['verificar']:
+            invalidos = 0
+            for contenido in ArchivoAlmacenado.objects.filter(referencias__gt=0).iterator():
+                if not contenido.verificar_integridad():
+                    invalidos += 1
+                    self.stdout.write(self.style.ERROR(
+                        f'Archivo dañado o faltante: {contenido.archivo.name} ({contenido.hash_sha256})'
+                    ))
+            self.stdout.write(self.style.SUCCESS(f'Verificación terminada: {invalidos} archivo(s) con problemas'))
+
+    def _contenidos_registrados(self, nombres):
+        return set(ArchivoAlmacenado.objects.filter(archivo__in=nombres).values_list('archivo', flat=True))
+
+    def _derivados_registrados(self, nombres):
+        documentos = DocumentoConductor.objects.order_by()
+        vistas_previas = documentos.filter(vista_previa__in=nombres).values_list('vista_previa', flat=True)
+        miniaturas = documentos.filter(miniatura__in=nombres).values_list('miniatura', flat=True)
+        return set(vistas_previas.union(miniaturas))
+
+    def _purgar_sin_registro(self, storage, prefijo, registrados_en, limite, simular):
+        """
+        Elimina los archivos bajo `prefijo` anteriores a `limite` que
+        `registrados_en(nombres)` no reconoce como usados.
+        """
+        raiz = storage.path(prefijo)
+        eliminados = 0
+        candidatos = {}
+
+        def procesar():
+            nonlocal eliminados
+            registrados = registrados_en(list(candidatos)) if candidatos else set()
+            for nombre, ruta in candidatos.items():
+                if nombre in registrados:
+                    continue
+                if simular:
+                    self.stdout.write(f'Se eliminaría {nombre}')
+                elif not self._eliminar_si_antiguo(ruta, limite):
+                    continue
+                eliminados += 1
+            candidatos.clear()
+
+        for directorio, _, archivos in os.walk(raiz):
+            for archivo in archivos:
+                ruta = os.path.join(directorio, archivo)
+                if not self._es_antiguo(ruta, limite):
+                    continue
+                if archivo.startswith(PREFIJO_TEMPORAL):
+                    # Temporal de una escritura interrumpida
+                    if simular:
+                        self.stdout.write(f'Se eliminaría {ruta}')
+                    elif not self._eliminar_si_antiguo(ruta, limite):
+                        continue
+                    eliminados += 1
+                    continue
+                nombre = os.path.relpath(ruta, storage.location).replace(os.sep, '/')
+                candidatos[nombre] = ruta
+                if len(candidatos) >= LOTE_ARCHIVOS:
+                    procesar()
+        procesar()
+        return eliminados
+
+    def _es_antiguo(self, ruta, limite):
+        try:
+            return os.stat(ruta).st_mtime < limite
+        except FileNotFoundError:
+            return False
+
+    def _eliminar_si_antiguo(self, ruta, limite):
+        # Se vuelve a comprobar justo antes de borrar: una subida que reutiliza
+        # el archivo renueva su fecha de modificación
+        if not self._es_antiguo(ruta, limite):
+            return False
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            return False
+        return True
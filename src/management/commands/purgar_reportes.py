@@ -0,0 +1,99 @@
+"""
+Elimina los trabajos de reporte en segundo plano más antiguos que el plazo
+de retención, junto con sus archivos, y los archivos de MEDIA_ROOT/reportes/
+que ya no pertenecen a ningún trabajo.
+Ejecutar: python manage.py purgar_reportes [--dias N] [--simular]
+"""
+
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from src.models.models import TrabajoReporte
+
+# Directorio de los archivos generados (upload_to de TrabajoReporte.archivo)
+DIRECTORIO_REPORTES = 'reportes'
+
+# Filas consultadas por lote al buscar archivos sin trabajo
+LOTE_ARCHIVOS = 500
+
+
+class Command(BaseCommand):
+    help = 'Elimina los trabajos de reporte antiguos y sus archivos generados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=float,
+            default=getattr(settings, 'REPORT_JOB_RETENTION_DAYS', 7),
+            help='Antigüedad mínima, en días, de los trabajos y archivos a eliminar'
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Muestra lo que se eliminaría sin eliminar nada'
+        )
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(days=options['dias'])
+        simular = options['simular']
+
+        # Los trabajos pendientes o en proceso de esa antigüedad ya se
+        # consideran abandonados (ver REPORT_JOB_STALE_MINUTES)
+        antiguos = TrabajoReporte.objects.filter(fecha_creacion__lt=limite)
+        trabajos = 0
+        for trabajo_id, archivo in antiguos.values_list('id', 'archivo').iterator():
+            if simular:
+                self.stdout.write(f'Se eliminaría el trabajo {trabajo_id} {archivo or ""}'.rstrip())
+            else:
+                if archivo:
+                    default_storage.delete(archivo)
+                TrabajoReporte.objects.filter(id=trabajo_id).delete()
+            trabajos += 1
+        self.stdout.write(self.style.SUCCESS(f'Trabajos de reporte eliminados: {trabajos}'))
+
+        huerfanos = self._purgar_sin_trabajo(limite.timestamp(), simular)
+        self.stdout.write(self.style.SUCCESS(f'Archivos sin trabajo eliminados: {huerfanos}'))
+
+    def _purgar_sin_trabajo(self, limite, simular):
+        """Elimina los archivos de reportes sin TrabajoReporte, anteriores a `limite`."""
+        raiz = default_storage.path(DIRECTORIO_REPORTES)
+        eliminados = 0
+        candidatos = {}
+
+        def procesar():
+            nonlocal eliminados
+            registrados = set(
+                TrabajoReporte.objects.filter(archivo__in=list(candidatos)).values_list('archivo', flat=True)
+            )
+            for nombre, ruta in candidatos.items():
+                if nombre in registrados:
+                    continue
+                if simular:
+                    self.stdout.write(f'Se eliminaría {nombre}')
+                else:
+                    try:
+                        os.remove(ruta)
+                    except FileNotFoundError:
+                        continue
+                eliminados += 1
+            candidatos.clear()
+
+        for directorio, _, archivos in os.walk(raiz):
+            for archivo in archivos:
+                ruta = os.path.join(directorio, archivo)
+                try:
+                    if os.stat(ruta).st_mtime >= limite:
+                        continue
+                except FileNotFoundError:
+                    continue
+                nombre = os.path.relpath(ruta, default_storage.location).replace(os.sep, '/')
+                candidatos[nombre] = ruta
+                if len(candidatos) >= LOTE_ARCHIVOS:
+                    procesar()
+        procesar()
+        return eliminados
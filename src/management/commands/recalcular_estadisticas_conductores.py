@@ -0,0 +1,35 @@
+"""
+Reconstruye desde cero el resumen de viajes (EstadisticaConductor) de
+todos los conductores o de los indicados.
+Ejecutar: python manage.py recalcular_estadisticas_conductores [--conductor ID ...]
+"""
+
+from django.core.management.base import BaseCommand
+
+from src.models.models import Conductor
+from src.utils.estadisticas import recalcular_estadisticas
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las estadísticas precalculadas de los conductores a partir de sus viajes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--conductor',
+            type=int,
+            nargs='+',
+            dest='conductores',
+            help='IDs de los conductores a recalcular (por defecto, todos)'
+        )
+
+    def handle(self, *args, **options):
+        conductores = Conductor.objects.order_by('id')
+        if options['conductores']:
+            conductores = conductores.filter(id__in=options['conductores'])
+
+        total = 0
+        for conductor_id in conductores.values_list('id', flat=True).iterator():
+            recalcular_estadisticas(conductor_id)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Estadísticas recalculadas para {total} conductores'))
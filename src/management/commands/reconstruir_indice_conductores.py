@@ -0,0 +1,34 @@
+"""
+Reconstruye el índice de búsqueda de conductores (TerminoBusquedaConductor).
+Ejecutar: python manage.py reconstruir_indice_conductores [--conductor ID ...]
+"""
+
+from django.core.management.base import BaseCommand
+
+from src.models.models import Conductor
+from src.utils.busqueda import indexar_conductor
+
+
+class Command(BaseCommand):
+    help = 'Regenera los términos de búsqueda de los conductores'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--conductor',
+            type=int,
+            nargs='+',
+            dest='conductores',
+            help='IDs de los conductores a reindexar (por defecto, todos)'
+        )
+
+    def handle(self, *args, **options):
+        conductores = Conductor.objects.order_by('id')
+        if options['conductores']:
+            conductores = conductores.filter(id__in=options['conductores'])
+
+        total = 0
+        for conductor_id in conductores.values_list('id', flat=True).iterator():
+            indexar_conductor(conductor_id)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Índice de búsqueda regenerado para {total} conductores'))
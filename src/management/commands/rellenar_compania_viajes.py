@@ -0,0 +1,48 @@
+"""
+Asigna la compañía desnormalizada (Viaje.compania) a partir del cliente de
+cada viaje. Útil después de cargas masivas que no pasan por Viaje.save().
+Ejecutar: python manage.py rellenar_compania_viajes [--todos] [--lote N]
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import F, OuterRef, Q, Subquery
+
+from src.models.models import Cliente, Viaje
+
+
+class Command(BaseCommand):
+    help = 'Rellena Viaje.compania con la compañía del cliente de cada viaje'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todos',
+            action='store_true',
+            help='Revisa todos los viajes, no solo los que no tienen compañía'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=5000,
+            help='Viajes actualizados por cada UPDATE (por defecto 5000)'
+        )
+
+    def handle(self, *args, **options):
+        compania_cliente = Subquery(
+            Cliente.objects.filter(pk=OuterRef('cliente_id')).values('compania_id')[:1]
+        )
+
+        pendientes = Viaje.objects.filter(compania__isnull=True)
+        if options['todos']:
+            pendientes = Viaje.objects.filter(
+                Q(compania__isnull=True) | ~Q(compania_id=F('cliente__compania_id'))
+            )
+
+        # Se actualiza por lotes de ids para no bloquear la tabla en un solo UPDATE
+        total = 0
+        while True:
+            ids = list(pendientes.order_by('id').values_list('id', flat=True)[:options['lote']])
+            if not ids:
+                break
+            total += Viaje.objects.filter(id__in=ids).update(compania_id=compania_cliente)
+
+        self.stdout.write(self.style.SUCCESS(f'Compañía asignada en {total} viajes'))
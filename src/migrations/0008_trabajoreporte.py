@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0007_alter_conductor_estado_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoReporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('servicios', 'Reporte de Servicios'), ('ingresos', 'Reporte de Ingresos'), ('novedades', 'Reporte de Novedades'), ('conductor', 'Reporte de Conductor')], max_length=20, verbose_name='Tipo de Reporte')),
+                ('parametros', models.JSONField(default=dict, verbose_name='Parámetros')),
+                ('clave', models.CharField(max_length=64, verbose_name='Clave de Deduplicación')),
+                ('estado', models.CharField(choices=[('Pendiente', 'Pendiente'), ('En Proceso', 'En Proceso'), ('Completado', 'Completado'), ('Error', 'Error')], default='Pendiente', max_length=15, verbose_name='Estado')),
+                ('archivo', models.FileField(blank=True, upload_to='reportes/%Y/%m/%d/', verbose_name='Archivo Generado')),
+                ('mensaje_error', models.TextField(blank=True, null=True, verbose_name='Mensaje de Error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_finalizacion', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de Finalización')),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos_reporte', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado Por')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Reporte',
+                'verbose_name_plural': 'Trabajos de Reportes',
+                'db_table': 'trabajo_reporte',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['clave', 'estado'], name='trabajo_rep_clave_f6559a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0008_trabajoreporte'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaConductor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_viajes', models.PositiveIntegerField(default=0, verbose_name='Total de Viajes')),
+                ('viajes_completados', models.PositiveIntegerField(default=0, verbose_name='Viajes Completados')),
+                ('viajes_cancelados', models.PositiveIntegerField(default=0, verbose_name='Viajes Cancelados')),
+                ('suma_calificaciones', models.DecimalField(decimal_places=1, default=0, max_digits=12, verbose_name='Suma de Calificaciones')),
+                ('num_calificaciones', models.PositiveIntegerField(default=0, verbose_name='Número de Calificaciones')),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ingresos')),
+                ('ultimo_viaje', models.DateTimeField(blank=True, null=True, verbose_name='Fecha del Último Viaje')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+                ('conductor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='estadisticas', to='src.conductor', verbose_name='Conductor')),
+            ],
+            options={
+                'verbose_name': 'Estadística de Conductor',
+                'verbose_name_plural': 'Estadísticas de Conductores',
+                'db_table': 'estadistica_conductor',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def rellenar_compania(apps, schema_editor):
+    """Copia la compañía del cliente en los viajes existentes."""
+    Cliente = apps.get_model('src', 'Cliente')
+    Viaje = apps.get_model('src', 'Viaje')
+    Viaje.objects.filter(compania__isnull=True).update(
+        compania_id=models.Subquery(
+            Cliente.objects.filter(pk=models.OuterRef('cliente_id')).values('compania_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0009_estadisticaconductor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='viaje',
+            name='compania',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='viajes', to='src.compania', verbose_name='Compañía'),
+        ),
+        migrations.RunPython(rellenar_compania, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='viaje',
+            index=models.Index(fields=['compania', 'fecha_solicitud'], name='viaje_compani_6ca9fc_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:28
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+def rellenar_email(apps, schema_editor):
+    """Copia el email del usuario, en minúsculas, en los clientes existentes."""
+    Cliente = apps.get_model('src', 'Cliente')
+    User = apps.get_model('auth', 'User')
+    Cliente.objects.update(
+        email_normalizado=models.Subquery(
+            User.objects.filter(pk=models.OuterRef('user_id')).annotate(email_lower=Lower('email')).values('email_lower')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0010_viaje_compania'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='email_normalizado',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=254, verbose_name='Email Normalizado'),
+        ),
+        migrations.RunPython(rellenar_email, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:29
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copia fija de src.utils.busqueda al momento de esta migración: los
+# cambios posteriores de la app no deben alterar lo que genera
+_NO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+_PARTES_PLACA = re.compile(r'[a-z]+|[0-9]+')
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return _NO_ALFANUMERICO.sub(' ', texto).strip()
+
+
+def terminos_conductor(nombres, numero_documento, placa):
+    terminos = set()
+    for nombre in nombres:
+        for palabra in _normalizar(nombre).split():
+            terminos.add((palabra[:100], 'nombre'))
+
+    if numero_documento:
+        terminos.add((_normalizar(numero_documento).replace(' ', '')[:100], 'documento'))
+
+    if placa:
+        placa_compacta = _normalizar(placa).replace(' ', '')
+        terminos.add((placa_compacta[:100], 'placa'))
+        for parte in _PARTES_PLACA.findall(placa_compacta):
+            terminos.add((parte[:100], 'placa'))
+
+    return terminos
+
+
+def construir_indice(apps, schema_editor):
+    """Genera los términos de búsqueda de los conductores existentes."""
+    Conductor = apps.get_model('src', 'Conductor')
+    TerminoBusquedaConductor = apps.get_model('src', 'TerminoBusquedaConductor')
+
+    filas = Conductor.objects.values_list(
+        'id', 'user__first_name', 'segundo_nombre', 'user__last_name', 'segundo_apellido',
+        'numero_documento', 'vehiculo__placa'
+    )
+    TerminoBusquedaConductor.objects.bulk_create([
+        TerminoBusquedaConductor(conductor_id=conductor_id, termino=termino, tipo=tipo)
+        for conductor_id, *nombres, numero_documento, placa in filas.iterator()
+        for termino, tipo in terminos_conductor(nombres, numero_documento, placa)
+        if termino
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0011_cliente_email_normalizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TerminoBusquedaConductor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termino', models.CharField(max_length=100, verbose_name='Término')),
+                ('tipo', models.CharField(choices=[('nombre', 'Nombre'), ('documento', 'Número de Documento'), ('placa', 'Placa')], max_length=10, verbose_name='Tipo de Término')),
+                ('conductor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terminos_busqueda', to='src.conductor', verbose_name='Conductor')),
+            ],
+            options={
+                'verbose_name': 'Término de Búsqueda de Conductor',
+                'verbose_name_plural': 'Términos de Búsqueda de Conductores',
+                'db_table': 'termino_busqueda_conductor',
+                'indexes': [models.Index(fields=['termino', 'conductor'], name='termino_bus_termino_e1cfc3_idx')],
+            },
+        ),
+        migrations.RunPython(construir_indice, migrations.RunPython.noop),
+    ]
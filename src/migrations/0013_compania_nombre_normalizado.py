@@ -0,0 +1,69 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:32
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copia fija de src.utils.busqueda al momento de esta migración: los
+# cambios posteriores de la app no deben alterar lo que genera
+_NO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return _NO_ALFANUMERICO.sub(' ', texto).strip()
+
+
+def rellenar_busqueda(apps, schema_editor):
+    """Normaliza el nombre y genera los términos de búsqueda de las compañías existentes."""
+    Compania = apps.get_model('src', 'Compania')
+    TerminoBusquedaCompania = apps.get_model('src', 'TerminoBusquedaCompania')
+
+    companias = list(Compania.objects.only('id', 'nombre', 'razon_social'))
+    for compania in companias:
+        compania.nombre_normalizado = normalizar(compania.nombre)[:100]
+    Compania.objects.bulk_update(companias, ['nombre_normalizado'], batch_size=500)
+
+    TerminoBusquedaCompania.objects.bulk_create([
+        TerminoBusquedaCompania(compania_id=compania.id, termino=termino, tipo=tipo)
+        for compania in companias
+        for termino, tipo in {
+            (palabra[:100], tipo)
+            for texto, tipo in ((compania.nombre, 'nombre'), (compania.razon_social, 'razon_social'))
+            for palabra in normalizar(texto).split()
+        }
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0012_terminobusquedaconductor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compania',
+            name='nombre_normalizado',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=100, verbose_name='Nombre Normalizado'),
+        ),
+        migrations.CreateModel(
+            name='TerminoBusquedaCompania',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termino', models.CharField(max_length=100, verbose_name='Término')),
+                ('tipo', models.CharField(choices=[('nombre', 'Nombre'), ('razon_social', 'Razón Social')], max_length=12, verbose_name='Tipo de Término')),
+                ('compania', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terminos_busqueda', to='src.compania', verbose_name='Compañía')),
+            ],
+            options={
+                'verbose_name': 'Término de Búsqueda de Compañía',
+                'verbose_name_plural': 'Términos de Búsqueda de Compañías',
+                'db_table': 'termino_busqueda_compania',
+                'indexes': [models.Index(fields=['termino', 'compania'], name='termino_bus_termino_3ef64e_idx')],
+            },
+        ),
+        migrations.RunPython(rellenar_busqueda, migrations.RunPython.noop),
+    ]
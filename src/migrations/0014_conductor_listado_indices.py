@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0013_compania_nombre_normalizado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conductor',
+            index=models.Index(fields=['estado', 'fecha_registro'], name='conductor_estado_5e3e2a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conductor',
+            index=models.Index(fields=['fecha_registro'], name='conductor_fecha_r_8d97ca_idx'),
+        ),
+    ]
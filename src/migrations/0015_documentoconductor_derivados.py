@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0014_conductor_listado_indices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentoconductor',
+            name='estado_derivados',
+            field=models.CharField(choices=[('Pendiente', 'Pendiente'), ('Generado', 'Generado'), ('No Aplica', 'No Aplica'), ('Error', 'Error')], default='Pendiente', max_length=20, verbose_name='Estado de Versiones Reducidas'),
+        ),
+        migrations.AddField(
+            model_name='documentoconductor',
+            name='miniatura',
+            field=models.FileField(blank=True, default='', upload_to='documentos_conductores/derivados/%Y/%m/%d/', verbose_name='Miniatura'),
+        ),
+        migrations.AddField(
+            model_name='documentoconductor',
+            name='tamaño_miniatura',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Tamaño de la Miniatura (bytes)'),
+        ),
+        migrations.AddField(
+            model_name='documentoconductor',
+            name='tamaño_vista_previa',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Tamaño de la Vista Previa (bytes)'),
+        ),
+        migrations.AddField(
+            model_name='documentoconductor',
+            name='vista_previa',
+            field=models.FileField(blank=True, default='', upload_to='documentos_conductores/derivados/%Y/%m/%d/', verbose_name='Vista Previa'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:39
+
+import django.db.models.deletion
+import src.utils.almacenamiento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0015_documentoconductor_derivados'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='documentoconductor',
+            name='archivo',
+            field=models.FileField(max_length=255, upload_to='documentos_conductores/%Y/%m/%d/', verbose_name='Archivo'),
+        ),
+        migrations.CreateModel(
+            name='ArchivoAlmacenado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash_sha256', models.CharField(max_length=64, unique=True, verbose_name='Hash SHA-256')),
+                ('archivo', models.FileField(max_length=255, storage=src.utils.almacenamiento.cas_storage, upload_to='', verbose_name='Archivo')),
+                ('tamaño', models.PositiveBigIntegerField(verbose_name='Tamaño (bytes)')),
+                ('referencias', models.PositiveIntegerField(default=0, verbose_name='Referencias')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+            ],
+            options={
+                'verbose_name': 'Archivo Almacenado',
+                'verbose_name_plural': 'Archivos Almacenados',
+                'db_table': 'archivo_almacenado',
+                'indexes': [models.Index(fields=['referencias'], name='archivo_alm_referen_3a6517_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='documentoconductor',
+            name='contenido',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='documentos', to='src.archivoalmacenado', verbose_name='Contenido'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0016_archivoalmacenado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['fecha_registro', 'id'], name='cliente_fecha_r_388114_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:40
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def liberar_emails_duplicados(apps, schema_editor):
+    """
+    Deja cada email (sin distinguir mayúsculas) en una sola cuenta para poder
+    crear el índice único. Lo conserva la cuenta cuyo username es ese email
+    (la convención del registro) o, si no hay, la más antigua; a las demás
+    se les vacía el email (también la copia en Cliente.email_normalizado).
+    Las cuentas y sus usernames no cambian.
+    """
+    User = apps.get_model('auth', 'User')
+    Cliente = apps.get_model('src', 'Cliente')
+
+    repetidos = (
+        User.objects.exclude(email='')
+        .values(email_normalizado=Lower('email'))
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+        .values_list('email_normalizado', flat=True)
+    )
+    for email in list(repetidos):
+        cuentas = list(User.objects.filter(email__iexact=email).order_by('id'))
+        conservada = next((u for u in cuentas if u.username.lower() == email), cuentas[0])
+        liberadas = [u.id for u in cuentas if u.id != conservada.id]
+        User.objects.filter(id__in=liberadas).update(email='')
+        Cliente.objects.filter(user_id__in=liberadas).update(email_normalizado='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0017_cliente_fecha_registro_indice'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(liberar_emails_duplicados, migrations.RunPython.noop),
+        # auth.User no es un modelo de la app: el índice se crea en SQL. Los
+        # usuarios sin email (p. ej. creados con createsuperuser) quedan fuera.
+        migrations.RunSQL(
+            "CREATE UNIQUE INDEX auth_user_email_unico ON auth_user (LOWER(email)) WHERE email <> ''",
+            "DROP INDEX auth_user_email_unico",
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0018_usuario_email_unico'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivoalmacenado',
+            name='estado_derivados',
+            field=models.CharField(choices=[('Pendiente', 'Pendiente'), ('En Proceso', 'En Proceso'), ('Generado', 'Generado'), ('Error', 'Error')], default='Pendiente', max_length=20, verbose_name='Estado de Versiones Reducidas'),
+        ),
+    ]
@@ -3,8 +3,8 @@ from django.contrib.auth.models import User
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 from django.conf import settings
 
-
-
+from ..utils.almacenamiento import cas_storage, hash_archivo
+from ..utils.busqueda import normalizar
 
 
 # ====================================
@@ -53,6 +53,18 @@ class Compania(models.Model):
     estado = models.BooleanField(default=True, verbose_name="Activa")
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
     
+    # Nombre normalizado (minúsculas, sin tildes ni signos), indexado para
+    # ordenar y paginar la búsqueda. Se asigna en save(); las palabras que
+    # se buscan están en TerminoBusquedaCompania.
+    nombre_normalizado = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        editable=False,
+        db_index=True,
+        verbose_name="Nombre Normalizado"
+    )
+    
     class Meta:
         db_table = 'compania'
         verbose_name = 'Compañía'
@@ -65,6 +77,10 @@ class Compania(models.Model):
     
     def __str__(self):
         return self.nombre
+    
+    def save(self, *args, **kwargs):
+        self.nombre_normalizado = normalizar(self.nombre)[:100]
+        super().save(*args, **kwargs)
 
 
 # ====================================
@@ -140,6 +156,17 @@ class Cliente(models.Model):
         verbose_name="Compañía Asociada"
     )
     
+    # Copia en minúsculas de user.email, indexada para búsquedas exactas y
+    # por prefijo. Se asigna en save() y desde la señal post_save de User.
+    email_normalizado = models.CharField(
+        max_length=254,
+        blank=True,
+        default='',
+        editable=False,
+        db_index=True,
+        verbose_name="Email Normalizado"
+    )
+    
     # Campo adicional para detalle de compañía
     cargo = models.CharField(
         max_length=50,
@@ -167,11 +194,20 @@ class Cliente(models.Model):
         indexes = [
             models.Index(fields=['numero_documento']),
             models.Index(fields=['compania']),
+            # Orden de la paginación por cursor de client_list_api
+            models.Index(fields=['fecha_registro', 'id']),
         ]
     
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name} - {self.compania.nombre}"
     
+    def save(self, *args, **kwargs):
+        # Con el usuario cargado se sincroniza el email; los cambios hechos
+        # sobre User los propaga la señal post_save de User
+        if self.user_id and ('user' in self._state.fields_cache or not self.email_normalizado):
+            self.email_normalizado = (self.user.email or '').lower()
+        super().save(*args, **kwargs)
+    
     def get_nombre_completo(self):
         """Retorna el nombre completo del cliente"""
         nombres = [self.user.first_name]
@@ -342,6 +378,9 @@ class Conductor(models.Model):
         indexes = [
             models.Index(fields=['numero_documento']),
             models.Index(fields=['estado']),
+            # Listados paginados del más reciente al más antiguo, con y sin filtro de estado
+            models.Index(fields=['estado', 'fecha_registro']),
+            models.Index(fields=['fecha_registro']),
         ]
     
     def __str__(self):
@@ -462,6 +501,80 @@ class Vehiculo(models.Model):
     
     
 
+# ====================================
+# MODELO: ARCHIVO ALMACENADO
+# ====================================
+class ArchivoAlmacenado(models.Model):
+    """
+    Contenido único de un documento, identificado por su hash SHA-256.
+    Varios DocumentoConductor pueden apuntar al mismo contenido;
+    `referencias` cuenta cuántos lo usan. Los contenidos sin referencias
+    se eliminan con `python manage.py purgar_archivos_documentos`.
+    """
+    
+    hash_sha256 = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name="Hash SHA-256"
+    )
+    
+    archivo = models.FileField(
+        storage=cas_storage,
+        max_length=255,
+        verbose_name="Archivo"
+    )
+    
+    tamaño = models.PositiveBigIntegerField(
+        verbose_name="Tamaño (bytes)"
+    )
+    
+    referencias = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Referencias"
+    )
+    
+    # Generación de las versiones reducidas del contenido: el worker que
+    # pasa el estado a 'En Proceso' es el único que las genera; los demás
+    # documentos con el mismo contenido las copian (ver src/utils/derivados.py).
+    ESTADO_DERIVADOS_CHOICES = [
+        ('Pendiente', 'Pendiente'),
+        ('En Proceso', 'En Proceso'),
+        ('Generado', 'Generado'),
+        ('Error', 'Error'),
+    ]
+    
+    estado_derivados = models.CharField(
+        max_length=20,
+        choices=ESTADO_DERIVADOS_CHOICES,
+        default='Pendiente',
+        verbose_name="Estado de Versiones Reducidas"
+    )
+    
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Fecha de Creación"
+    )
+    
+    class Meta:
+        db_table = 'archivo_almacenado'
+        verbose_name = 'Archivo Almacenado'
+        verbose_name_plural = 'Archivos Almacenados'
+        indexes = [
+            models.Index(fields=['referencias']),
+        ]
+    
+    def __str__(self):
+        return f"{self.hash_sha256[:12]} ({self.referencias} ref.)"
+    
+    def verificar_integridad(self):
+        """True si el archivo en disco conserva el hash registrado."""
+        try:
+            with self.archivo.open('rb') as archivo:
+                return hash_archivo(archivo) == self.hash_sha256
+        except FileNotFoundError:
+            return False
+
+
 # ====================================
 # MODELO: DOCUMENTO CONDUCTOR
 # ====================================
@@ -499,9 +612,21 @@ class DocumentoConductor(models.Model):
     
     archivo = models.FileField(
         upload_to='documentos_conductores/%Y/%m/%d/',
+        max_length=255,
         verbose_name="Archivo"
     )
     
+    # Contenido deduplicado; en los documentos nuevos `archivo` es el mismo
+    # nombre del contenido. Los documentos anteriores no tienen contenido.
+    contenido = models.ForeignKey(
+        ArchivoAlmacenado,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='documentos',
+        verbose_name="Contenido"
+    )
+    
     nombre_original = models.CharField(
         max_length=255,
         verbose_name="Nombre Original del Archivo"
@@ -511,6 +636,48 @@ class DocumentoConductor(models.Model):
         verbose_name="Tamaño del Archivo (bytes)"
     )
     
+    # Versiones reducidas de las imágenes para las pantallas de revisión.
+    # Las genera un worker después del registro (ver src/utils/derivados.py).
+    ESTADO_DERIVADOS_CHOICES = [
+        ('Pendiente', 'Pendiente'),
+        ('Generado', 'Generado'),
+        ('No Aplica', 'No Aplica'),
+        ('Error', 'Error'),
+    ]
+    
+    estado_derivados = models.CharField(
+        max_length=20,
+        choices=ESTADO_DERIVADOS_CHOICES,
+        default='Pendiente',
+        verbose_name="Estado de Versiones Reducidas"
+    )
+    
+    vista_previa = models.FileField(
+        upload_to='documentos_conductores/derivados/%Y/%m/%d/',
+        blank=True,
+        default='',
+        verbose_name="Vista Previa"
+    )
+    
+    tamaño_vista_previa = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Tamaño de la Vista Previa (bytes)"
+    )
+    
+    miniatura = models.FileField(
+        upload_to='documentos_conductores/derivados/%Y/%m/%d/',
+        blank=True,
+        default='',
+        verbose_name="Miniatura"
+    )
+    
+    tamaño_miniatura = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Tamaño de la Miniatura (bytes)"
+    )
+    
     # Campos de auditoría
     fecha_subida = models.DateTimeField(
         auto_now_add=True,
@@ -535,6 +702,31 @@ class DocumentoConductor(models.Model):
     def __str__(self):
         return f"{self.conductor.get_nombre_completo()} - {self.get_tipo_documento_display()}"
     
+    def get_version(self, version):
+        """
+        Retorna (url, tamaño) de la versión pedida ('vista_previa',
+        'miniatura' u 'original'). Si no existe se usa la siguiente más
+        grande; la URL y el tamaño siempre salen del mismo archivo.
+        """
+        candidatas = {
+            'miniatura': ('miniatura', 'vista_previa'),
+            'vista_previa': ('vista_previa',),
+        }.get(version, ())
+        for campo in candidatas:
+            archivo = getattr(self, campo)
+            if archivo:
+                tamaño = getattr(self, f'tamaño_{campo}')
+                return archivo.url, tamaño if tamaño is not None else archivo.size
+        return self.archivo.url, self.tamaño_archivo
+    
+    def get_url_vista_previa(self):
+        """URL de la vista previa o, si no existe, del archivo original."""
+        return self.get_version('vista_previa')[0]
+    
+    def get_url_miniatura(self):
+        """URL de la miniatura o, si no existe, de la vista previa o el original."""
+        return self.get_version('miniatura')[0]
+    
 # Agregar al final de models.py
 
 # ====================================
@@ -568,6 +760,19 @@ class Viaje(models.Model):
         verbose_name="Cliente"
     )
     
+    # Copia de cliente.compania para filtrar por compañía sin unir con cliente.
+    # Se asigna en save() y se actualiza si el cliente cambia de compañía.
+    compania = models.ForeignKey(
+        Compania,
+        on_delete=models.CASCADE,
+        related_name='viajes',
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=False,  # Cubierto por el índice (compania, fecha_solicitud)
+        verbose_name="Compañía"
+    )
+    
     fecha_solicitud = models.DateTimeField(
         verbose_name="Fecha de Solicitud"
     )
@@ -713,11 +918,22 @@ class Viaje(models.Model):
             models.Index(fields=['cliente', '-fecha_solicitud']),
             models.Index(fields=['estado']),
             models.Index(fields=['fecha_solicitud']),
+            models.Index(fields=['compania', 'fecha_solicitud']),
         ]
     
     def __str__(self):
         return f"Viaje {self.id} - {self.conductor.get_nombre_completo()} → {self.origen[:30]}"
     
+    def save(self, *args, **kwargs):
+        # Mantener la compañía desnormalizada: al crear el viaje o al asignar
+        # un cliente distinto (el cliente queda cargado en la instancia)
+        if self.cliente_id and (self.compania_id is None or 'cliente' in self._state.fields_cache):
+            self.compania_id = self.cliente.compania_id
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'cliente' in update_fields:
+                kwargs['update_fields'] = set(update_fields) | {'compania'}
+        super().save(*args, **kwargs)
+    
     def get_duracion_formateada(self):
         """Retorna la duración en formato legible"""
         if self.tiempo_real:
@@ -993,4 +1209,270 @@ class Novedad(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.tipo_novedad} - {self.estado} ({self.fecha_creacion.strftime('%Y-%m-%d')})"
\ No newline at end of file
+        return f"{self.tipo_novedad} - {self.estado} ({self.fecha_creacion.strftime('%Y-%m-%d')})"
+
+# ====================================
+# MODELO: TRABAJO DE REPORTE
+# ====================================
+class TrabajoReporte(models.Model):
+    """
+    Modelo para los reportes generados en segundo plano.
+    El archivo resultante se guarda en MEDIA_ROOT y se descarga cuando
+    el trabajo termina.
+    """
+    
+    TIPO_CHOICES = [
+        ('servicios', 'Reporte de Servicios'),
+        ('ingresos', 'Reporte de Ingresos'),
+        ('novedades', 'Reporte de Novedades'),
+        ('conductor', 'Reporte de Conductor'),
+    ]
+    
+    ESTADO_CHOICES = [
+        ('Pendiente', 'Pendiente'),
+        ('En Proceso', 'En Proceso'),
+        ('Completado', 'Completado'),
+        ('Error', 'Error'),
+    ]
+    
+    tipo = models.CharField(
+        max_length=20,
+        choices=TIPO_CHOICES,
+        verbose_name="Tipo de Reporte"
+    )
+    
+    parametros = models.JSONField(
+        default=dict,
+        verbose_name="Parámetros"
+    )
+    
+    # Hash de tipo + parámetros, usado para no duplicar trabajos pendientes
+    clave = models.CharField(
+        max_length=64,
+        verbose_name="Clave de Deduplicación"
+    )
+    
+    estado = models.CharField(
+        max_length=15,
+        choices=ESTADO_CHOICES,
+        default='Pendiente',
+        verbose_name="Estado"
+    )
+    
+    archivo = models.FileField(
+        upload_to='reportes/%Y/%m/%d/',
+        blank=True,
+        verbose_name="Archivo Generado"
+    )
+    
+    mensaje_error = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name="Mensaje de Error"
+    )
+    
+    solicitado_por = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='trabajos_reporte',
+        verbose_name="Solicitado Por"
+    )
+    
+    # Campos de auditoría
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Fecha de Creación"
+    )
+    
+    fecha_finalizacion = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Fecha de Finalización"
+    )
+    
+    class Meta:
+        db_table = 'trabajo_reporte'
+        verbose_name = 'Trabajo de Reporte'
+        verbose_name_plural = 'Trabajos de Reportes'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['clave', 'estado']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.id} - {self.estado}"
+
+
+class EstadisticaConductor(models.Model):
+    """
+    Resumen precalculado de los viajes de un conductor.
+    Se actualiza de forma incremental al guardar o eliminar viajes
+    (ver src/signals.py) y se puede reconstruir con el comando
+    `recalcular_estadisticas_conductores`.
+    """
+    
+    conductor = models.OneToOneField(
+        Conductor,
+        on_delete=models.CASCADE,
+        related_name='estadisticas',
+        verbose_name="Conductor"
+    )
+    
+    total_viajes = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Total de Viajes"
+    )
+    
+    viajes_completados = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Viajes Completados"
+    )
+    
+    viajes_cancelados = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Viajes Cancelados"
+    )
+    
+    # Suma y número de calificaciones, para calcular el promedio sin recorrer los viajes
+    suma_calificaciones = models.DecimalField(
+        max_digits=12,
+        decimal_places=1,
+        default=0,
+        verbose_name="Suma de Calificaciones"
+    )
+    
+    num_calificaciones = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Número de Calificaciones"
+    )
+    
+    # Valor total de los viajes completados
+    ingresos = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name="Ingresos"
+    )
+    
+    ultimo_viaje = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Fecha del Último Viaje"
+    )
+    
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Última Actualización"
+    )
+    
+    class Meta:
+        db_table = 'estadistica_conductor'
+        verbose_name = 'Estadística de Conductor'
+        verbose_name_plural = 'Estadísticas de Conductores'
+    
+    def __str__(self):
+        return f"Estadísticas de {self.conductor.get_nombre_completo()}"
+    
+    @property
+    def calificacion_promedio(self):
+        """Promedio de calificaciones o None si no hay calificaciones"""
+        if not self.num_calificaciones:
+            return None
+        return round(self.suma_calificaciones / self.num_calificaciones, 1)
+    
+    @property
+    def tasa_completado(self):
+        """Porcentaje de viajes completados"""
+        if not self.total_viajes:
+            return 0
+        return int(self.viajes_completados * 100 / self.total_viajes)
+
+
+class TerminoBusquedaConductor(models.Model):
+    """
+    Índice de búsqueda de conductores: un registro por palabra del nombre,
+    documento y placa, normalizada (minúsculas y sin tildes).
+    Permite buscar por prefijo con un rango sobre el índice de `termino`
+    en lugar de LIKE '%texto%' sobre varias tablas. Se mantiene desde las
+    señales de Conductor, User y Vehiculo (ver src/signals.py).
+    """
+    
+    TIPO_CHOICES = [
+        ('nombre', 'Nombre'),
+        ('documento', 'Número de Documento'),
+        ('placa', 'Placa'),
+    ]
+    
+    conductor = models.ForeignKey(
+        Conductor,
+        on_delete=models.CASCADE,
+        related_name='terminos_busqueda',
+        verbose_name="Conductor"
+    )
+    
+    termino = models.CharField(
+        max_length=100,
+        verbose_name="Término"
+    )
+    
+    tipo = models.CharField(
+        max_length=10,
+        choices=TIPO_CHOICES,
+        verbose_name="Tipo de Término"
+    )
+    
+    class Meta:
+        db_table = 'termino_busqueda_conductor'
+        verbose_name = 'Término de Búsqueda de Conductor'
+        verbose_name_plural = 'Términos de Búsqueda de Conductores'
+        indexes = [
+            models.Index(fields=['termino', 'conductor']),
+        ]
+    
+    def __str__(self):
+        return f"{self.termino} ({self.tipo}) → {self.conductor_id}"
+
+
+class TerminoBusquedaCompania(models.Model):
+    """
+    Índice de búsqueda de compañías: un registro por palabra normalizada
+    del nombre y la razón social, para buscar por prefijo de cualquier
+    palabra ('global' encuentra 'Logística Global'). Se mantiene desde la
+    señal post_save de Compania (ver src/signals.py).
+    """
+    
+    TIPO_CHOICES = [
+        ('nombre', 'Nombre'),
+        ('razon_social', 'Razón Social'),
+    ]
+    
+    compania = models.ForeignKey(
+        Compania,
+        on_delete=models.CASCADE,
+        related_name='terminos_busqueda',
+        verbose_name="Compañía"
+    )
+    
+    termino = models.CharField(
+        max_length=100,
+        verbose_name="Término"
+    )
+    
+    tipo = models.CharField(
+        max_length=12,
+        choices=TIPO_CHOICES,
+        verbose_name="Tipo de Término"
+    )
+    
+    class Meta:
+        db_table = 'termino_busqueda_compania'
+        verbose_name = 'Término de Búsqueda de Compañía'
+        verbose_name_plural = 'Términos de Búsqueda de Compañías'
+        indexes = [
+            models.Index(fields=['termino', 'compania']),
+        ]
+    
+    def __str__(self):
+        return f"{self.termino} ({self.tipo}) → {self.compania_id}"
@@ -0,0 +1,192 @@
+"""
+Señales de los modelos para mantener cachés y datos derivados al día.
+Se registran en PaginaWebConfig.ready().
+"""
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models.models import ArchivoAlmacenado, Cliente, Compania, Conductor, DocumentoConductor, Novedad, Vehiculo, Viaje
+from .utils.busqueda import autocomplete_cache, indexar_compania, indexar_conductor
+from .utils.cache_companias import invalidate_companies_payload
+from .utils.cache_reportes import invalidate_company_reports
+from .utils.estadisticas import CAMPOS_VIAJE, aplicar_viaje, aporte_viaje
+from .utils.metricas import invalidate_company_metrics
+
+
+# ====================================
+# CACHÉ DE REPORTES Y MÉTRICAS
+# ====================================
+@receiver(post_save, sender=Viaje)
+@receiver(post_delete, sender=Viaje)
+def invalidar_reportes_viaje(sender, instance, created=False, **kwargs):
+    compania_id = instance.compania_id
+    # En una edición la fecha anterior pudo ser otra: se invalida toda la compañía
+    es_edicion = kwargs.get('signal') is post_save and not created
+    invalidate_company_reports(compania_id, None if es_edicion else instance.fecha_solicitud)
+    invalidate_company_metrics(compania_id)
+
+
+@receiver(post_save, sender=Novedad)
+@receiver(post_delete, sender=Novedad)
+def invalidar_reportes_novedad(sender, instance, created=False, **kwargs):
+    es_edicion = kwargs.get('signal') is post_save and not created
+    invalidate_company_reports(instance.compania_id, None if es_edicion else instance.fecha_creacion)
+
+
+@receiver(pre_save, sender=Cliente)
+def capturar_compania_anterior(sender, instance, **kwargs):
+    instance._compania_anterior = None
+    if instance.pk:
+        instance._compania_anterior = Cliente.objects.filter(pk=instance.pk).values_list('compania_id', flat=True).first()
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+def invalidar_metricas_cliente(sender, instance, **kwargs):
+    # Cambios de estado o de compañía del cliente afectan los empleados activos
+    invalidate_company_metrics(instance.compania_id)
+    previa = getattr(instance, '_compania_anterior', None)
+    if previa is not None and previa != instance.compania_id:
+        # Sus viajes pasan a la nueva compañía (Viaje.compania está desnormalizada)
+        Viaje.objects.filter(cliente=instance).update(compania_id=instance.compania_id)
+        invalidate_company_metrics(previa)
+        invalidate_company_reports(previa)
+        invalidate_company_reports(instance.compania_id)
+
+
+@receiver(post_save, sender=Compania)
+@receiver(post_delete, sender=Compania)
+def invalidar_listado_companias(sender, **kwargs):
+    invalidate_companies_payload()
+
+
+@receiver(post_save, sender=Compania)
+def indexar_compania_guardada(sender, instance, update_fields=None, **kwargs):
+    # Los términos de búsqueda salen del nombre y la razón social
+    if update_fields is not None and not {'nombre', 'razon_social'} & set(update_fields):
+        return
+    indexar_compania(instance.pk)
+
+
+# ====================================
+# ESTADÍSTICAS DE CONDUCTORES
+# ====================================
+@receiver(pre_save, sender=Viaje)
+def capturar_viaje_anterior(sender, instance, **kwargs):
+    # Valores guardados antes de la edición, para restar su aporte después
+    instance._valores_anteriores = None
+    if instance.pk:
+        instance._valores_anteriores = Viaje.objects.filter(pk=instance.pk).values_list(*CAMPOS_VIAJE).first()
+
+
+@receiver(post_save, sender=Viaje)
+def actualizar_estadisticas_viaje(sender, instance, **kwargs):
+    aporte_nuevo = aporte_viaje(instance.estado, instance.calificacion_conductor, instance.valor_total)
+    anteriores = getattr(instance, '_valores_anteriores', None)
+
+    if anteriores is None:
+        aplicar_viaje(instance.conductor_id, None, aporte_nuevo)
+        return
+
+    conductor_anterior, estado, calificacion, valor_total = anteriores
+    aporte_anterior = aporte_viaje(estado, calificacion, valor_total)
+    if conductor_anterior == instance.conductor_id:
+        aplicar_viaje(instance.conductor_id, aporte_anterior, aporte_nuevo)
+    else:
+        # El viaje se reasignó a otro conductor
+        aplicar_viaje(conductor_anterior, aporte_anterior, None)
+        aplicar_viaje(instance.conductor_id, None, aporte_nuevo)
+
+
+@receiver(post_delete, sender=Viaje)
+def descontar_estadisticas_viaje(sender, instance, **kwargs):
+    aplicar_viaje(
+        instance.conductor_id,
+        aporte_viaje(instance.estado, instance.calificacion_conductor, instance.valor_total),
+        None
+    )
+
+
+# ====================================
+# EMAIL NORMALIZADO DE CLIENTES
+# ====================================
+@receiver(post_save, sender=User)
+def sincronizar_email_cliente(sender, instance, created=False, update_fields=None, **kwargs):
+    # Un usuario nuevo aún no tiene cliente; Cliente.save() asigna el email.
+    # Guardados parciales que no tocan el email (p. ej. last_login) se omiten.
+    if created or (update_fields is not None and 'email' not in update_fields):
+        return
+    Cliente.objects.filter(user=instance).exclude(
+        email_normalizado=(instance.email or '').lower()
+    ).update(email_normalizado=(instance.email or '').lower())
+
+
+# ====================================
+# ÍNDICE DE BÚSQUEDA DE CONDUCTORES
+# ====================================
+# Campos de User que forman parte de los términos de búsqueda
+CAMPOS_USUARIO_BUSQUEDA = {'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Conductor)
+def indexar_conductor_guardado(sender, instance, update_fields=None, **kwargs):
+    # Cambios solo de estado u otros campos no afectan los términos
+    if update_fields is not None and not {'segundo_nombre', 'segundo_apellido', 'numero_documento'} & set(update_fields):
+        return
+    indexar_conductor(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def indexar_conductor_usuario(sender, instance, created=False, update_fields=None, **kwargs):
+    if created or (update_fields is not None and not CAMPOS_USUARIO_BUSQUEDA & set(update_fields)):
+        return
+    for conductor_id in Conductor.objects.filter(user=instance).values_list('id', flat=True):
+        indexar_conductor(conductor_id)
+
+
+@receiver(post_save, sender=Vehiculo)
+def indexar_conductor_vehiculo(sender, instance, **kwargs):
+    indexar_conductor(instance.conductor_id)
+
+
+@receiver(post_delete, sender=Vehiculo)
+def indexar_conductor_sin_vehiculo(sender, instance, **kwargs):
+    # Si el vehículo se borra en cascada con su conductor, reindexar aquí
+    # insertaría términos de un conductor que está por eliminarse; al
+    # confirmarse la transacción el conductor ya no existe y solo se limpian
+    conductor_id = instance.conductor_id
+    transaction.on_commit(lambda: indexar_conductor(conductor_id))
+
+
+@receiver(post_save, sender=Conductor)
+@receiver(post_delete, sender=Conductor)
+@receiver(post_save, sender=Vehiculo)
+@receiver(post_delete, sender=Vehiculo)
+def limpiar_cache_autocompletado(sender, **kwargs):
+    # Los resultados incluyen nombre, documento, placa y estado del conductor
+    autocomplete_cache.clear()
+
+
+@receiver(post_save, sender=User)
+def limpiar_cache_autocompletado_usuario(sender, instance, created=False, update_fields=None, **kwargs):
+    if created or (update_fields is not None and not CAMPOS_USUARIO_BUSQUEDA & set(update_fields)):
+        return
+    autocomplete_cache.clear()
+
+
+# ====================================
+# REFERENCIAS DE ARCHIVOS ALMACENADOS
+# ====================================
+@receiver(post_delete, sender=DocumentoConductor)
+def liberar_contenido_documento(sender, instance, **kwargs):
+    # El archivo no se borra aquí: otro registro podría estar por reutilizarlo.
+    # Los contenidos sin referencias los elimina purgar_archivos_documentos.
+    if instance.contenido_id is None:
+        return
+    ArchivoAlmacenado.objects.filter(pk=instance.contenido_id, referencias__gt=0).update(
+        referencias=F('referencias') - 1
+    )
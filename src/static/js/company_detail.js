@@ -180,15 +180,19 @@ function updateMetrics(metrics) {
 // ====================================
 // CARGAR CLIENTES ASOCIADOS
 // ====================================
-async function loadClients() {
+async function loadClients(page = 1) {
     const container = document.getElementById('clientes-container');
     const loading = document.getElementById('loading-clientes');
     
-    container.innerHTML = '';
+    // La primera página reemplaza el listado; las siguientes se agregan al final
+    if (page === 1) {
+        container.innerHTML = '';
+    }
+    document.getElementById('btn-more-clients')?.remove();
     loading.classList.remove('hidden');
     
     try {
-        const response = await fetch(`/api/companias/${currentCompanyId}/clientes/`);
+        const response = await fetch(`/api/companias/${currentCompanyId}/clientes/?page=${page}`);
         
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
@@ -210,6 +214,15 @@ async function loadClients() {
                 const card = createClientCard(cliente);
                 container.appendChild(card);
             });
+            
+            if (data.has_next) {
+                const moreButton = document.createElement('button');
+                moreButton.id = 'btn-more-clients';
+                moreButton.className = 'w-full py-3 text-blue-600 font-semibold hover:bg-blue-50 rounded-lg transition-colors';
+                moreButton.textContent = 'Cargar más clientes';
+                moreButton.addEventListener('click', () => loadClients(page + 1));
+                container.appendChild(moreButton);
+            }
         } else {
             container.innerHTML = '<div class="text-center py-12"><i class="fas fa-exclamation-triangle text-red-500 text-6xl mb-4"></i><p class="text-gray-600 text-lg">Error al cargar clientes</p></div>';
             showNotification(data.message || 'Error al cargar clientes', 'error');
@@ -471,6 +484,11 @@ function validateReportForm() {
 // ====================================
 // EXPORTAR REPORTE A EXCEL
 // ====================================
+// El Excel se genera en segundo plano: el endpoint retorna el trabajo,
+// se consulta su estado hasta que termina y luego se descarga.
+const REPORT_POLL_INTERVAL_MS = 2000;
+const REPORT_POLL_MAX_ATTEMPTS = 150;
+
 async function exportToExcel() {
     const reportType = document.getElementById('report-type').value;
     const fechaInicio = document.getElementById('fecha-inicio').value;
@@ -482,6 +500,9 @@ async function exportToExcel() {
         'novedades': '/api/reportes/novedades/'
     };
     
+    const button = document.getElementById('btn-export-excel');
+    button.disabled = true;
+    
     try {
         showNotification('Generando archivo Excel...', 'info');
         
@@ -489,35 +510,56 @@ async function exportToExcel() {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                'X-CSRFToken': getCsrfToken()
             },
             body: JSON.stringify({
                 company_id: currentCompanyId,
                 fecha_inicio: fechaInicio,
                 fecha_fin: fechaFin,
-                export: true
+                export: true,
+                async: true
             })
         });
         
-        if (response.ok) {
-            // Descargar el archivo
-            const blob = await response.blob();
-            const url = window.URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = `reporte_${reportType}_${fechaInicio}_${fechaFin}.xlsx`;
-            document.body.appendChild(a);
-            a.click();
-            window.URL.revokeObjectURL(url);
-            document.body.removeChild(a);
-            
+        const data = await response.json();
+        if (!response.ok || !data.success) {
+            showNotification(data.message || 'Error al generar el archivo Excel', 'error');
+            return;
+        }
+        
+        const job = await waitForReportJob(data.data.status_url);
+        if (!job) {
+            showNotification('El reporte está tardando demasiado. Intenta de nuevo más tarde', 'warning');
+        } else if (job.estado === 'Completado') {
+            // El endpoint de descarga responde como adjunto: la página no cambia
+            window.location.href = job.download_url;
             showNotification('Archivo Excel descargado exitosamente', 'success');
         } else {
-            showNotification('Error al generar el archivo Excel', 'error');
+            showNotification(job.mensaje_error || 'Error al generar el archivo Excel', 'error');
         }
     } catch (error) {
         console.error('Error:', error);
         showNotification('Error al exportar a Excel', 'error');
+    } finally {
+        validateReportForm();
+    }
+}
+
+async function waitForReportJob(statusUrl) {
+    // Retorna el trabajo terminado ('Completado' o 'Error'), o null si no termina a tiempo
+    for (let attempt = 0; attempt < REPORT_POLL_MAX_ATTEMPTS; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, REPORT_POLL_INTERVAL_MS));
+        
+        const response = await fetch(statusUrl, { headers: { 'Accept': 'application/json' } });
+        const data = await response.json();
+        if (!response.ok || !data.success) {
+            throw new Error(data.message || 'No se pudo consultar el estado del reporte');
+        }
+        if (data.data.estado === 'Completado' || data.data.estado === 'Error') {
+            return data.data;
+        }
     }
+    return null;
 }
 
 // ====================================
@@ -0,0 +1,463 @@
+"""
+Pruebas de la aplicación.
+Ejecutar: python manage.py test src
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models.models import ArchivoAlmacenado, Cliente, Compania, Conductor, TrabajoReporte, Viaje
+from .utils.almacenamiento import CAS_PREFIX
+from .utils.cache_reportes import report_cache, report_key
+from .utils.registro import primer_duplicado
+
+
+# ====================================
+# LISTADO DE CLIENTES DE UNA COMPAÑÍA
+# ====================================
+
+class CompanyClientsApiTests(TestCase):
+    """
+    company_clients_api debe ejecutar un número fijo de consultas
+    (compañía, total y página) sin importar cuántos clientes tenga.
+    """
+
+    CONSULTAS_ESPERADAS = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.compania = Compania.objects.create(nombre='Transportes Prueba', nit='900100200-1')
+        usuario = User.objects.create_user(username='conductor@prueba.co', email='conductor@prueba.co')
+        cls.conductor = Conductor.objects.create(
+            user=usuario,
+            tipo_documento='CC',
+            numero_documento='1000000001',
+            fecha_nacimiento=date(1990, 1, 1),
+            telefono_principal='3000000001',
+            direccion='Calle 1',
+            ciudad='Bogotá',
+            numero_licencia='L-0001',
+            licencia_expedicion=date(2020, 1, 1),
+            licencia_vencimiento=date(2030, 1, 1),
+            tipo_cuenta='Ahorros',
+            banco='Bancolombia',
+            numero_cuenta='1234567890'
+        )
+
+    def crear_clientes(self, cantidad):
+        ahora = timezone.now()
+        for i in range(cantidad):
+            email = f'cliente{i}@prueba.co'
+            cliente = Cliente.objects.create(
+                user=User.objects.create_user(username=email, email=email, first_name='Cliente', last_name=str(i)),
+                tipo_documento='CC',
+                numero_documento=f'2000{i:06d}',
+                telefono='3100000000',
+                compania=self.compania
+            )
+            # Dos viajes por cliente para que las agregaciones tengan datos
+            for dias in (1, 2):
+                Viaje.objects.create(
+                    conductor=self.conductor,
+                    cliente=cliente,
+                    fecha_solicitud=ahora - timedelta(days=dias + i),
+                    estado='Completado',
+                    origen='Origen',
+                    destino=f'Destino {dias}',
+                    valor_base=Decimal('10000'),
+                    valor_total=Decimal('10000'),
+                    calificacion_cliente=Decimal('4.5')
+                )
+
+    def consultar(self, cantidad):
+        url = reverse('company_clients_api', args=[self.compania.id])
+        with self.assertNumQueries(self.CONSULTAS_ESPERADAS):
+            response = self.client.get(url, {'page_size': cantidad})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['success'])
+        return data
+
+    def test_consultas_con_un_cliente(self):
+        self.crear_clientes(1)
+        data = self.consultar(1)
+        self.assertEqual(data['count'], 1)
+        cliente = data['data'][0]
+        self.assertEqual(cliente['total_viajes'], 2)
+        self.assertEqual(cliente['ultimo_viaje']['destino'], 'Destino 1')
+
+    def test_consultas_no_crecen_con_los_clientes(self):
+        self.crear_clientes(20)
+        data = self.consultar(20)
+        self.assertEqual(data['count'], 20)
+        self.assertEqual(len(data['data']), 20)
+        self.assertTrue(all(cliente['total_viajes'] == 2 for cliente in data['data']))
+
+
+# ====================================
+# LISTADO DE CLIENTES (CURSOR Y FILTRO DE EMAIL)
+# ====================================
+
+class ClientListApiTests(TestCase):
+    """client_list_api: paginación por cursor y modos del filtro de email."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin@prueba.co', password='Clave1234')
+        compania = Compania.objects.create(nombre='Compañía Listado', nit='900300400-1')
+        # Fechas repetidas para que el desempate por id del cursor se ejercite
+        fecha = timezone.now()
+        emails = ['ana@prueba.co', 'juana@prueba.co', 'andres@prueba.co', 'beto@prueba.co', 'carla@prueba.co']
+        for i, email in enumerate(emails):
+            cliente = Cliente.objects.create(
+                user=User.objects.create_user(username=email, email=email),
+                tipo_documento='CC',
+                numero_documento=f'3000{i:06d}',
+                telefono='3100000000',
+                compania=compania
+            )
+            Cliente.objects.filter(pk=cliente.pk).update(fecha_registro=fecha - timedelta(days=i // 2))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def listar(self, **params):
+        response = self.client.get(reverse('client_list_api'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_recorre_todas_las_filas_sin_repetir(self):
+        esperados = list(Cliente.objects.order_by('-fecha_registro', '-id').values_list('id', flat=True))
+        vistos = []
+        cursor = None
+        while True:
+            params = {'limit': 2, 'fields': 'id'}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.listar(**params)
+            vistos.extend(fila['id'] for fila in data['data'])
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(vistos, esperados)
+
+    def test_cursor_no_valido(self):
+        response = self.client.get(reverse('client_list_api'), {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_email_por_prefijo_por_defecto(self):
+        data = self.listar(email='AN')
+        self.assertEqual(sorted(fila['email'] for fila in data['data']), ['ana@prueba.co', 'andres@prueba.co'])
+
+    def test_email_contiene_solo_si_se_pide(self):
+        data = self.listar(email='ana', email_match='contains')
+        self.assertEqual(sorted(fila['email'] for fila in data['data']), ['ana@prueba.co', 'juana@prueba.co'])
+
+
+# ====================================
+# CACHÉ DE REPORTES
+# ====================================
+
+class ReportCacheTests(TestCase):
+    """La caché de reportes se indexa por fechas y se invalida por rango."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.compania = Compania.objects.create(nombre='Compañía Reportes', nit='900500600-1')
+        email = 'cliente.reportes@prueba.co'
+        cls.cliente = Cliente.objects.create(
+            user=User.objects.create_user(username=email, email=email),
+            tipo_documento='CC',
+            numero_documento='4000000001',
+            telefono='3100000000',
+            compania=cls.compania
+        )
+        usuario = User.objects.create_user(username='conductor.reportes@prueba.co')
+        cls.conductor = Conductor.objects.create(
+            user=usuario,
+            tipo_documento='CC',
+            numero_documento='1000000002',
+            fecha_nacimiento=date(1990, 1, 1),
+            telefono_principal='3000000002',
+            direccion='Calle 2',
+            ciudad='Bogotá',
+            numero_licencia='L-0002',
+            licencia_expedicion=date(2020, 1, 1),
+            licencia_vencimiento=date(2030, 1, 1),
+            tipo_cuenta='Ahorros',
+            banco='Bancolombia',
+            numero_cuenta='1234567891'
+        )
+
+    def setUp(self):
+        report_cache.clear()
+        self.clave = report_key('novedades', self.compania.id, date(2024, 1, 5), date(2024, 1, 20), 'json')
+
+    def pedir_reporte(self, fecha_inicio, fecha_fin):
+        response = self.client.post(
+            reverse('generate_issues_report_api'),
+            json.dumps({'company_id': self.compania.id, 'fecha_inicio': fecha_inicio, 'fecha_fin': fecha_fin}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def crear_viaje(self, fecha):
+        Viaje.objects.create(
+            conductor=self.conductor,
+            cliente=self.cliente,
+            fecha_solicitud=timezone.make_aware(datetime.combine(fecha, datetime.min.time()).replace(hour=12)),
+            estado='Completado',
+            origen='Origen',
+            destino='Destino',
+            valor_base=Decimal('10000'),
+            valor_total=Decimal('10000')
+        )
+
+    def test_fechas_sin_ceros_comparten_la_clave(self):
+        self.pedir_reporte('2024-1-5', '2024-1-20')
+        self.assertIsNotNone(report_cache.get(self.clave))
+        self.assertEqual(len(report_cache), 1)
+        self.pedir_reporte('2024-01-05', '2024-01-20')
+        self.assertEqual(len(report_cache), 1)
+
+    def test_viaje_dentro_del_rango_invalida(self):
+        self.pedir_reporte('2024-1-5', '2024-1-20')
+        # Con claves de texto, '2024-01-10' quedaba fuera de '2024-1-5'..'2024-1-20'
+        self.crear_viaje(date(2024, 1, 10))
+        self.assertIsNone(report_cache.get(self.clave))
+
+    def test_viaje_fuera_del_rango_conserva_la_entrada(self):
+        self.pedir_reporte('2024-01-05', '2024-01-20')
+        self.crear_viaje(date(2024, 2, 10))
+        self.assertIsNotNone(report_cache.get(self.clave))
+
+
+# ====================================
+# REPORTES EN SEGUNDO PLANO
+# ====================================
+
+class ReportJobOwnershipTests(TestCase):
+    """Los trabajos de reporte quedan a nombre de quien los pide y solo él o un admin los ven."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.compania = Compania.objects.create(nombre='Compañía Trabajos', nit='900700800-1')
+        cls.admin = User.objects.create_user(username='admin.trabajos@prueba.co')
+        cls.duenio, cls.otro = [
+            Cliente.objects.create(
+                user=User.objects.create_user(username=email, email=email),
+                tipo_documento='CC',
+                numero_documento=f'5000{i:06d}',
+                telefono='3100000000',
+                compania=cls.compania
+            ).user
+            for i, email in enumerate(['duenio@prueba.co', 'otro@prueba.co'])
+        ]
+
+    def pedir_async(self):
+        return self.client.post(
+            reverse('generate_services_report_api'),
+            json.dumps({
+                'company_id': self.compania.id,
+                'fecha_inicio': '2024-01-01',
+                'fecha_fin': '2024-01-31',
+                'export': True,
+                'async': True
+            }),
+            content_type='application/json'
+        )
+
+    def estado(self, trabajo_id):
+        return self.client.get(reverse('report_job_status_api', args=[trabajo_id]))
+
+    def test_async_anonimo_se_rechaza(self):
+        response = self.pedir_async()
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(TrabajoReporte.objects.exists())
+
+    def test_trabajo_visible_solo_para_el_duenio_y_admin(self):
+        self.client.force_login(self.duenio)
+        response = self.pedir_async()
+        self.assertEqual(response.status_code, 202)
+        trabajo = TrabajoReporte.objects.get(id=response.json()['data']['id'])
+        self.assertEqual(trabajo.solicitado_por, self.duenio)
+        self.assertEqual(self.estado(trabajo.id).status_code, 200)
+
+        self.client.force_login(self.otro)
+        self.assertEqual(self.estado(trabajo.id).status_code, 404)
+        descarga = self.client.get(reverse('report_job_download', args=[trabajo.id]))
+        self.assertEqual(descarga.status_code, 404)
+
+        self.client.force_login(self.admin)
+        self.assertEqual(self.estado(trabajo.id).status_code, 200)
+
+
+# ====================================
+# REGISTRO DE CLIENTES (DUPLICADOS)
+# ====================================
+
+class ClientRegistrationDuplicateTests(TestCase):
+    """Un email ya registrado responde 409, también si la verificación previa no lo detecta."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.compania = Compania.objects.create(nombre='Compañía Registro', nit='900900100-1')
+        # Otra cuenta con el mismo email pero distinto username
+        User.objects.create_user(username='cuenta-antigua', email='Ana@Prueba.co')
+
+    def registrar(self, correo):
+        return self.client.post(
+            reverse('client_registration_api'),
+            json.dumps({
+                'primer_nombre': 'Ana',
+                'primer_apellido': 'Pérez',
+                'tipo_documento': 'CC',
+                'numero_documento': '6000000001',
+                'correo': correo,
+                'telefono': '3100000000',
+                'compania_id': self.compania.id,
+                'password': 'Clave1234',
+                'confirm_password': 'Clave1234'
+            }),
+            content_type='application/json'
+        )
+
+    def test_email_registrado_sin_distinguir_mayusculas(self):
+        response = self.registrar('ana@prueba.co')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['message'], 'El email se encuentra registrado')
+
+    def test_registro_simultaneo_lo_detiene_la_base(self):
+        # La verificación previa no ve el duplicado (como en dos registros
+        # simultáneos): el índice único hace fallar la escritura
+        consultas = [None]
+
+        def primer_duplicado_tardio(verificaciones):
+            return consultas.pop() if consultas else primer_duplicado(verificaciones)
+
+        with mock.patch('src.views.views.primer_duplicado', side_effect=primer_duplicado_tardio):
+            response = self.registrar('ana@prueba.co')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(User.objects.filter(email__iexact='ana@prueba.co').count(), 1)
+        self.assertFalse(Cliente.objects.exists())
+
+
+# ====================================
+# REGISTRO DE CONDUCTORES (ARCHIVOS)
+# ====================================
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='pruebas-media-'))
+class DriverRegistrationUploadTests(TestCase):
+    """Validación de los archivos del registro y limpieza cuando el registro falla."""
+
+    JPEG = b'\xff\xd8\xff\xe0' + b'foto' * 64
+    PDF = b'%PDF-1.4\n' + b'documento' * 64
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def datos(self, **archivos):
+        datos = {
+            'primer_nombre': 'Carlos',
+            'primer_apellido': 'Gómez',
+            'tipo_documento': 'CC',
+            'numero_documento': '7000000001',
+            'fecha_nacimiento': '1990-01-01',
+            'correo': 'carlos@prueba.co',
+            'telefono_principal': '3000000003',
+            'direccion': 'Calle 3',
+            'ciudad': 'Bogotá',
+            'password': 'Clave1234',
+            'confirm_password': 'Clave1234',
+            'numero_licencia': 'L-0003',
+            'licencia_expedicion': '2020-01-01',
+            'licencia_vencimiento': '2035-01-01',
+            'tipo_cuenta': 'Ahorros',
+            'banco': 'Bancolombia',
+            'numero_cuenta': '1234567892',
+            'confirmar_numero_cuenta': '1234567892',
+            'placa': 'ABC123',
+            'marca': 'Chevrolet',
+            'modelo': 'Spark',
+            'anio': '2020',
+            'color': 'Blanco',
+            'tipo_vehiculo': 'Automóvil',
+            'num_pasajeros': '4',
+        }
+        for campo in ('documento_frontal', 'tarjeta_propiedad', 'certificado_reconocimiento', 'foto_licencia',
+                      'documento_soat', 'antecedentes_judiciales', 'certificado_tecnomecanica'):
+            datos[campo] = SimpleUploadedFile(f'{campo}.pdf', self.PDF + campo.encode())
+        for campo in ('foto_vehiculo_frontal', 'foto_vehiculo_lateral', 'foto_vehiculo_interior'):
+            datos[campo] = SimpleUploadedFile(f'{campo}.jpg', self.JPEG + campo.encode())
+        datos.update(archivos)
+        return datos
+
+    def registrar(self, **archivos):
+        return self.client.post(reverse('driver_registration_api'), self.datos(**archivos))
+
+    def archivos_guardados(self):
+        raiz = os.path.join(settings.MEDIA_ROOT, CAS_PREFIX)
+        return [archivo for _, _, archivos in os.walk(raiz) for archivo in archivos]
+
+    def test_contenido_que_no_corresponde_a_la_extension(self):
+        response = self.registrar(foto_vehiculo_frontal=SimpleUploadedFile('frontal.jpg', self.PDF))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('foto_vehiculo_frontal', response.json()['invalid_files'])
+        self.assertFalse(Conductor.objects.exists())
+        self.assertFalse(ArchivoAlmacenado.objects.exists())
+
+    def test_extension_no_permitida(self):
+        response = self.registrar(documento_soat=SimpleUploadedFile('soat.exe', self.PDF))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('documento_soat', response.json()['invalid_files'])
+
+    def test_registro_revertido_no_deja_archivos(self):
+        # Otro conductor ocupa el documento después de la verificación previa
+        # (como en dos registros simultáneos): la transacción se revierte
+        usuario = User.objects.create_user(username='otro.conductor@prueba.co', email='otro.conductor@prueba.co')
+        consultas = [None]
+
+        def primer_duplicado_tardio(verificaciones):
+            return consultas.pop() if consultas else primer_duplicado(verificaciones)
+
+        with mock.patch('src.views.views.primer_duplicado', side_effect=primer_duplicado_tardio):
+            Conductor.objects.create(
+                user=usuario,
+                tipo_documento='CC',
+                numero_documento='7000000001',
+                fecha_nacimiento=date(1990, 1, 1),
+                telefono_principal='3000000004',
+                direccion='Calle 4',
+                ciudad='Bogotá',
+                numero_licencia='L-0004',
+                licencia_expedicion=date(2020, 1, 1),
+                licencia_vencimiento=date(2030, 1, 1),
+                tipo_cuenta='Ahorros',
+                banco='Bancolombia',
+                numero_cuenta='1234567893'
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.registrar()
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(ArchivoAlmacenado.objects.exists())
+        self.assertEqual(self.archivos_guardados(), [])
+
+    def test_registro_exitoso_guarda_y_referencia_los_archivos(self):
+        response = self.registrar()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ArchivoAlmacenado.objects.filter(referencias=1).count(), 10)
+        self.assertEqual(len(self.archivos_guardados()), 10)
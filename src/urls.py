@@ -2,13 +2,14 @@ from django.urls import path
 from django.contrib.auth import views as auth_views
 from .views import views
 from .views import driver_history_views
+from .views import report_jobs_views
 
 urlpatterns = [
     
-    # Listas: ahora muestran todos los conductores
-    path('conductores/activos/', views.conductores_todos, name='conductores_activos'),
-    path('conductores/inactivos/', views.conductores_todos, name='conductores_inactivos'),
-    path('conductores/todos/', views.conductores_todos, name='conductores_todos'),
+    # Listas de conductores filtradas por estado
+    path('conductores/activos/', views.conductores_todos, {'filtro': 'activos'}, name='conductores_activos'),
+    path('conductores/inactivos/', views.conductores_todos, {'filtro': 'inactivos'}, name='conductores_inactivos'),
+    path('conductores/todos/', views.conductores_todos, {'filtro': 'todos'}, name='conductores_todos'),
 
     # Detalle (si lo necesitas)
     path('conductores/<int:id>/', views.detalle_conductor, name='detalle_conductor'),
@@ -43,6 +44,7 @@ urlpatterns = [
     path('api/conductores/<int:driver_id>/generate-report/', driver_history_views.generate_report, name='generate_report'),
     path('api/conductores/<int:driver_id>/export-history/', driver_history_views.export_history, name='export_history'),
     path('api/conductores/<int:driver_id>/statistics/', driver_history_views.driver_statistics_api, name='driver_statistics_api'),
+    path('api/conductores/<int:driver_id>/documentos/', driver_history_views.driver_documents_api, name='driver_documents_api'),
     path('api/conductores/autocompletado/', driver_history_views.driver_autocomplete_api, name='driver_autocomplete_api'),
 
     # ====================================
@@ -57,4 +59,10 @@ urlpatterns = [
     path('api/reportes/servicios/', views.generate_services_report_api, name='generate_services_report_api'),
     path('api/reportes/ingresos/', views.generate_income_report_api, name='generate_income_report_api'),
     path('api/reportes/novedades/', views.generate_issues_report_api, name='generate_issues_report_api'),
+
+    # ====================================
+    # MÓDULO: REPORTES EN SEGUNDO PLANO
+    # ====================================
+    path('api/reportes/trabajos/<int:job_id>/', report_jobs_views.report_job_status_api, name='report_job_status_api'),
+    path('api/reportes/trabajos/<int:job_id>/descargar/', report_jobs_views.report_job_download, name='report_job_download'),
 ]
@@ -0,0 +1,113 @@
+"""
+Almacenamiento direccionado por contenido para los documentos de conductores.
+
+Cada archivo se guarda una sola vez bajo un nombre derivado de su hash
+SHA-256 (documentos_conductores/cas/ab/cd/<hash>.<ext>). Dos subidas con
+el mismo contenido producen el mismo nombre: la segunda no escribe nada
+en disco y solo suma una referencia en ArchivoAlmacenado.
+
+Cada archivo se escribe completo en un temporal y se publica con
+os.link(), que falla si el nombre ya existe: dos subidas
+simultáneas del mismo contenido no se bloquean ni se pisan, y nunca queda
+visible un archivo a medio escribir. Los archivos que no llegan a tener
+fila en ArchivoAlmacenado los elimina purgar_archivos_documentos.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+CAS_PREFIX = 'documentos_conductores/cas'
+
+# Prefijo de los temporales que se escriben antes de publicar un archivo
+PREFIJO_TEMPORAL = '.subida-'
+
+# Tamaño de bloque al recalcular hashes de archivos ya guardados
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage en el que un nombre identifica un contenido: si el
+    archivo ya existe no se reemplaza ni se renombra.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre ya es único por contenido
+        return name
+
+    def _save(self, name, content):
+        ruta = self.path(name)
+        if os.path.exists(ruta):
+            self._renovar(ruta)
+            return name
+        directorio = os.path.dirname(ruta)
+        self._crear_directorio(directorio)
+
+        # Un temporal de subida en el mismo sistema de archivos se enlaza sin copiarse
+        if hasattr(content, 'temporary_file_path'):
+            try:
+                self._publicar(content.temporary_file_path(), ruta)
+                return name
+            except OSError:
+                # Otro sistema de archivos: se copia al directorio destino
+                pass
+
+        fd, temporal = tempfile.mkstemp(dir=directorio, prefix=PREFIJO_TEMPORAL)
+        try:
+            with os.fdopen(fd, 'wb') as destino:
+                for bloque in content.chunks():
+                    destino.write(bloque)
+            self._publicar(temporal, ruta)
+        finally:
+            os.unlink(temporal)
+        return name
+
+    def _publicar(self, origen, ruta):
+        if self.file_permissions_mode is not None:
+            os.chmod(origen, self.file_permissions_mode)
+        try:
+            os.link(origen, ruta)
+        except FileExistsError:
+            # Otra subida publicó el mismo contenido mientras tanto
+            self._renovar(ruta)
+
+    def _renovar(self, ruta):
+        # La purga de archivos sin registrar cuenta el plazo de gracia desde
+        # la última vez que una subida usó el archivo
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+
+    def _crear_directorio(self, directorio):
+        if self.directory_permissions_mode is None:
+            os.makedirs(directorio, exist_ok=True)
+            return
+        # os.makedirs() no aplica el modo a los directorios intermedios
+        umask_anterior = os.umask(0o777 & ~self.directory_permissions_mode)
+        try:
+            os.makedirs(directorio, self.directory_permissions_mode, exist_ok=True)
+        finally:
+            os.umask(umask_anterior)
+
+
+def cas_storage():
+    """Instancia del almacenamiento (callable para FileField.storage)."""
+    return ContentAddressedStorage()
+
+
+def nombre_por_contenido(hash_hex, nombre_original):
+    """Nombre de almacenamiento para un contenido con la extensión del original."""
+    extension = os.path.splitext(nombre_original or '')[1].lower()
+    return f'{CAS_PREFIX}/{hash_hex[:2]}/{hash_hex[2:4]}/{hash_hex}{extension}'
+
+
+def hash_archivo(archivo):
+    """SHA-256 de un archivo abierto, leído por bloques."""
+    sha256 = hashlib.sha256()
+    for bloque in archivo.chunks(HASH_CHUNK_SIZE):
+        sha256.update(bloque)
+    return sha256.hexdigest()
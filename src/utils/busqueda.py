@@ -0,0 +1,299 @@
+"""
+Búsqueda de conductores por nombre, documento o placa, y de compañías por
+nombre o razón social.
+
+Cada conductor tiene sus términos normalizados (minúsculas, sin tildes ni
+signos) en TerminoBusquedaConductor. Una búsqueda normaliza el texto de
+la misma forma y exige que cada palabra sea prefijo de algún término del
+conductor; la primera palabra se resuelve con un rango sobre el índice
+(termino >= p AND termino < p + '\\uffff') y las demás se comprueban solo
+sobre esos candidatos. Las coincidencias exactas de documento o placa se
+ordenan primero. Las compañías siguen la misma regla sobre
+TerminoBusquedaCompania.
+"""
+
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Subquery
+
+from .cache import LRUCache
+
+_NO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+_PARTES_PLACA = re.compile(r'[a-z]+|[0-9]+')
+
+# Límite superior para las búsquedas por prefijo
+_FIN_PREFIJO = '\uffff'
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes y con los signos reemplazados por espacios."""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return _NO_ALFANUMERICO.sub(' ', texto).strip()
+
+
+def palabras(texto):
+    """Palabras normalizadas de un texto."""
+    return normalizar(texto).split()
+
+
+def compacto(texto):
+    """Texto normalizado sin espacios (p. ej. 'ABC-123' -> 'abc123')."""
+    return normalizar(texto).replace(' ', '')
+
+
+def terminos_conductor(nombres, numero_documento, placa):
+    """
+    Términos de búsqueda de un conductor como tuplas (termino, tipo).
+    `nombres` es la lista de nombres y apellidos.
+    """
+    terminos = set()
+    for nombre in nombres:
+        for palabra in palabras(nombre):
+            terminos.add((palabra[:100], 'nombre'))
+
+    if numero_documento:
+        terminos.add((compacto(numero_documento)[:100], 'documento'))
+
+    if placa:
+        # La placa completa y sus partes de letras y números ('abc123', 'abc', '123')
+        placa_compacta = compacto(placa)
+        terminos.add((placa_compacta[:100], 'placa'))
+        for parte in _PARTES_PLACA.findall(placa_compacta):
+            terminos.add((parte[:100], 'placa'))
+
+    return terminos
+
+
+def indexar_conductor(conductor_id):
+    """Reemplaza los términos de búsqueda de un conductor."""
+    from ..models.models import Conductor, TerminoBusquedaConductor
+
+    datos = Conductor.objects.filter(pk=conductor_id).values_list(
+        'user__first_name', 'segundo_nombre', 'user__last_name', 'segundo_apellido',
+        'numero_documento', 'vehiculo__placa'
+    ).first()
+
+    with transaction.atomic():
+        TerminoBusquedaConductor.objects.filter(conductor_id=conductor_id).delete()
+        if datos is None:
+            return
+
+        *nombres, numero_documento, placa = datos
+        TerminoBusquedaConductor.objects.bulk_create([
+            TerminoBusquedaConductor(conductor_id=conductor_id, termino=termino, tipo=tipo)
+            for termino, tipo in terminos_conductor(nombres, numero_documento, placa)
+            if termino
+        ])
+
+
+def buscar_conductores(texto):
+    """
+    Queryset de conductores cuyo nombre, documento o placa coincide con
+    `texto` por prefijo de palabra, con las coincidencias exactas de
+    documento o placa primero. Retorna un queryset vacío si no hay palabras.
+    """
+    from ..models.models import Conductor, TerminoBusquedaConductor
+
+    consulta = palabras(texto)
+    if not consulta:
+        return Conductor.objects.none()
+
+    def con_prefijo(palabra):
+        return TerminoBusquedaConductor.objects.filter(
+            termino__gte=palabra,
+            termino__lt=palabra + _FIN_PREFIJO
+        )
+
+    # Candidatos: rango del índice para la palabra más larga (la más selectiva)
+    principal = max(consulta, key=len)
+    conductores = Conductor.objects.filter(
+        id__in=Subquery(con_prefijo(principal).values('conductor_id'))
+    )
+
+    # Las demás palabras se comprueban solo sobre los candidatos
+    for palabra in consulta:
+        if palabra != principal:
+            conductores = conductores.filter(
+                Exists(con_prefijo(palabra).filter(conductor=OuterRef('pk')))
+            )
+
+    # Un documento o placa escrito con separadores ('ABC-123') se busca
+    # también de forma compacta
+    texto_compacto = ''.join(consulta)
+    if len(consulta) > 1:
+        conductores = conductores | Conductor.objects.filter(id__in=Subquery(
+            con_prefijo(texto_compacto).filter(tipo__in=('documento', 'placa')).values('conductor_id')
+        ))
+
+    exacto = TerminoBusquedaConductor.objects.filter(
+        conductor=OuterRef('pk'),
+        tipo__in=('documento', 'placa'),
+        termino=texto_compacto
+    )
+    return conductores.annotate(coincidencia_exacta=Exists(exacto)).order_by(
+        '-coincidencia_exacta', 'user__first_name', 'user__last_name', 'id'
+    )
+
+
+# ====================================
+# BÚSQUEDA DE COMPAÑÍAS
+# ====================================
+def terminos_compania(nombre, razon_social):
+    """Términos de búsqueda de una compañía como tuplas (termino, tipo)."""
+    terminos = set()
+    for texto, tipo in ((nombre, 'nombre'), (razon_social, 'razon_social')):
+        for palabra in palabras(texto):
+            terminos.add((palabra[:100], tipo))
+    return terminos
+
+
+def indexar_compania(compania_id):
+    """Reemplaza los términos de búsqueda de una compañía."""
+    from ..models.models import Compania, TerminoBusquedaCompania
+
+    datos = Compania.objects.filter(pk=compania_id).values_list('nombre', 'razon_social').first()
+
+    with transaction.atomic():
+        TerminoBusquedaCompania.objects.filter(compania_id=compania_id).delete()
+        if datos is None:
+            return
+
+        TerminoBusquedaCompania.objects.bulk_create([
+            TerminoBusquedaCompania(compania_id=compania_id, termino=termino, tipo=tipo)
+            for termino, tipo in terminos_compania(*datos)
+            if termino
+        ])
+
+
+def filtro_companias(texto):
+    """
+    Condición (Q) que exige que cada palabra de `texto` sea prefijo de
+    alguna palabra del nombre o la razón social de la compañía. Retorna
+    None si el texto no tiene palabras.
+    """
+    from ..models.models import TerminoBusquedaCompania
+
+    consulta = palabras(texto)
+    if not consulta:
+        return None
+
+    def con_prefijo(palabra):
+        return TerminoBusquedaCompania.objects.filter(
+            termino__gte=palabra,
+            termino__lt=palabra + _FIN_PREFIJO
+        )
+
+    # Candidatos: rango del índice para la palabra más larga (la más selectiva)
+    principal = max(consulta, key=len)
+    filtro = Q(id__in=Subquery(con_prefijo(principal).values('compania_id')))
+
+    # Las demás palabras se comprueban solo sobre los candidatos
+    for palabra in consulta:
+        if palabra != principal:
+            filtro &= Q(Exists(con_prefijo(palabra).filter(compania=OuterRef('pk'))))
+    return filtro
+
+
+# ====================================
+# AUTOCOMPLETADO CON CACHÉ
+# ====================================
+# Resultados recientes por texto normalizado. Cada entrada guarda, además
+# de los resultados, los términos de cada conductor para poder responder
+# un texto más largo filtrando en memoria (ver autocompletar_conductores).
+# Las señales de Conductor, Vehiculo y User vacían la caché.
+
+AUTOCOMPLETE_LIMIT = 10
+
+autocomplete_cache = LRUCache(
+    maxsize=getattr(settings, 'AUTOCOMPLETE_CACHE_MAX_ENTRIES', 256),
+    ttl=getattr(settings, 'AUTOCOMPLETE_CACHE_TTL', 5 * 60)
+)
+
+
+def _coincide(terminos, consulta, texto_compacto):
+    """Misma regla que buscar_conductores(), sobre los términos en memoria."""
+    if all(any(termino.startswith(palabra) for termino, _ in terminos) for palabra in consulta):
+        return True
+    return len(consulta) > 1 and any(
+        tipo in ('documento', 'placa') and termino.startswith(texto_compacto)
+        for termino, tipo in terminos
+    )
+
+
+def _ordenar(entradas, texto_compacto):
+    """Coincidencias exactas de documento o placa primero, luego por nombre."""
+    def clave(entrada):
+        terminos, orden, _ = entrada
+        exacto = any(tipo in ('documento', 'placa') and termino == texto_compacto for termino, tipo in terminos)
+        return (not exacto, *orden)
+    return sorted(entradas, key=clave)
+
+
+def _buscar_en_cache(consulta):
+    """
+    Busca en la caché el texto más largo que sea prefijo de la consulta y
+    cuyo resultado no se haya truncado en el límite: ese resultado contiene
+    todos los conductores que pueden coincidir con la consulta.
+    """
+    texto = ' '.join(consulta)
+    for fin in range(len(texto), 1, -1):
+        entrada = autocomplete_cache.get(texto[:fin])
+        if entrada is None:
+            continue
+        entradas, truncado = entrada
+        if fin == len(texto) or not truncado:
+            return entradas, truncado, fin == len(texto)
+    return None
+
+
+def autocompletar_conductores(texto, limite=AUTOCOMPLETE_LIMIT):
+    """
+    Resultados de autocompletado (lista de dicts) para `texto`.
+    Si un prefijo del texto está en caché con resultados completos, la
+    respuesta se obtiene filtrando esos resultados sin consultar la base
+    de datos.
+    """
+    consulta = palabras(texto)
+    if not consulta:
+        return []
+    clave = ' '.join(consulta)
+    texto_compacto = ''.join(consulta)
+
+    en_cache = _buscar_en_cache(consulta)
+    if en_cache is not None:
+        entradas, truncado, exacta = en_cache
+        if not exacta:
+            entradas = [e for e in entradas if _coincide(e[0], consulta, texto_compacto)]
+            autocomplete_cache.set(clave, (entradas, truncado))
+        return [resultado for _, _, resultado in _ordenar(entradas, texto_compacto)[:limite]]
+
+    # Se pide una fila extra para saber si el resultado quedó truncado
+    conductores = list(buscar_conductores(texto).select_related('user', 'vehiculo')[:limite + 1])
+    truncado = len(conductores) > limite
+
+    entradas = []
+    for conductor in conductores[:limite]:
+        placa = conductor.get_placa()
+        terminos = frozenset(terminos_conductor(
+            [conductor.user.first_name, conductor.segundo_nombre, conductor.user.last_name, conductor.segundo_apellido],
+            conductor.numero_documento,
+            placa
+        ))
+        entradas.append((
+            terminos,
+            (conductor.user.first_name, conductor.user.last_name, conductor.id),
+            {
+                'id': conductor.id,
+                'nombre_completo': conductor.get_nombre_completo(),
+                'numero_documento': conductor.numero_documento,
+                'placa': placa or 'Sin placa',
+                'estado': conductor.estado
+            }
+        ))
+
+    autocomplete_cache.set(clave, (entradas, truncado))
+    return [resultado for _, _, resultado in entradas]
@@ -0,0 +1,54 @@
+"""
+Caché del listado público de compañías activas (companies_list_api).
+
+Se guarda el cuerpo JSON ya serializado junto con su ETag (hash del
+contenido) y la fecha en que se generó, que el endpoint usa para responder
+304 a las peticiones condicionales. Las señales de Compania invalidan la
+entrada (ver src/signals.py).
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .cache import LRUCache
+
+
+companies_cache = LRUCache(
+    maxsize=1,
+    ttl=getattr(settings, 'COMPANIES_LIST_CACHE_TTL', 60 * 60)
+)
+
+_CLAVE = 'companias_activas'
+
+
+def companies_payload():
+    """
+    Retorna (contenido, etag, ultima_modificacion) del listado de compañías
+    activas, desde la caché o consultando la base de datos.
+    """
+    from ..models.models import Compania
+
+    payload = companies_cache.get(_CLAVE)
+    if payload is not None:
+        return payload
+
+    companias = Compania.objects.filter(estado=True).order_by('nombre').values_list('id', 'nombre')
+    contenido = json.dumps({
+        'success': True,
+        'data': [{'id': id_compania, 'nombre': nombre} for id_compania, nombre in companias]
+    }, cls=DjangoJSONEncoder).encode('utf-8')
+
+    # El ETag depende solo del contenido: es el mismo en todos los procesos
+    etag = f'"{hashlib.sha256(contenido).hexdigest()[:32]}"'
+    payload = (contenido, etag, timezone.now().replace(microsecond=0))
+    companies_cache.set(_CLAVE, payload)
+    return payload
+
+
+def invalidate_companies_payload():
+    """Elimina el listado cacheado."""
+    companies_cache.clear()
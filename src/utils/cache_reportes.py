@@ -0,0 +1,82 @@
+"""
+Caché de resultados de los endpoints de reportes.
+
+La clave es (tipo de reporte, compañía, fecha inicio, fecha fin, formato).
+Las entradas expiran por TTL y se desalojan por LRU; además se invalidan
+desde las señales de Viaje y Novedad cuando cambia un registro de la
+compañía dentro del rango del reporte (ver src/signals.py).
+
+La caché vive en la memoria de cada proceso: en despliegues con varios
+procesos, el TTL acota el tiempo que un proceso puede servir un reporte
+desactualizado por un cambio hecho en otro.
+"""
+
+import tempfile
+from datetime import datetime
+
+from django.conf import settings
+
+from .cache import LRUCache
+from .reportes import xlsx_bytes_response, xlsx_file_response
+
+
+report_cache = LRUCache(
+    maxsize=getattr(settings, 'REPORT_CACHE_MAX_ENTRIES', 128),
+    ttl=getattr(settings, 'REPORT_CACHE_TTL', 15 * 60)
+)
+
+# Archivos más grandes que esto se envían sin guardarse en caché
+MAX_CACHED_BYTES = getattr(settings, 'REPORT_CACHE_MAX_BYTES', 5 * 1024 * 1024)
+
+
+def _como_fecha(valor):
+    """Reduce un datetime a su fecha; las fechas se retornan sin cambios."""
+    return valor.date() if isinstance(valor, datetime) else valor
+
+
+def report_key(tipo, company_id, fecha_inicio, fecha_fin, formato):
+    """
+    Clave de caché. Las fechas se guardan como objetos date, no como el texto
+    recibido, para que '2024-1-5' y '2024-01-05' compartan la misma entrada
+    y la invalidación compare fechas y no cadenas.
+    """
+    return (tipo, int(company_id), _como_fecha(fecha_inicio), _como_fecha(fecha_fin), formato)
+
+
+def cached_xlsx_response(key, filename, build_writer):
+    """
+    Retorna el XLSX desde la caché o lo genera con `build_writer()`.
+    Solo se guardan en caché archivos de hasta MAX_CACHED_BYTES.
+    """
+    contenido = report_cache.get(key)
+    if contenido is not None:
+        return xlsx_bytes_response(contenido, filename)
+
+    archivo = tempfile.TemporaryFile()
+    build_writer().save(archivo)
+    if archivo.tell() > MAX_CACHED_BYTES:
+        return xlsx_file_response(archivo, filename)
+
+    archivo.seek(0)
+    contenido = archivo.read()
+    archivo.close()
+    report_cache.set(key, contenido)
+    return xlsx_bytes_response(contenido, filename)
+
+
+def invalidate_company_reports(company_id, fecha=None):
+    """
+    Elimina los reportes cacheados de una compañía. Si se indica `fecha`,
+    solo los reportes cuyo rango la incluye.
+    """
+    if company_id is None:
+        return 0
+    fecha = _como_fecha(fecha)
+
+    def afectado(key):
+        _, key_company, fecha_inicio, fecha_fin, _ = key
+        if key_company != company_id:
+            return False
+        return fecha is None or fecha_inicio <= fecha <= fecha_fin
+
+    return report_cache.delete_where(afectado)
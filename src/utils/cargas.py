@@ -0,0 +1,205 @@
+"""
+Carga de documentos de conductores.
+
+Los archivos del registro se reciben con DocumentoUploadHandler: cada
+archivo se escribe por bloques en un archivo temporal (nunca en memoria) y
+se valida mientras llega, sin esperar al final del cuerpo de la petición:
+extensión permitida, firma del contenido acorde a la extensión y tamaño
+máximo. Un archivo que no cumple se descarta y el error queda en
+`handler.errores`. Mientras llega también se calcula su SHA-256.
+
+Luego reservar_contenidos() crea o reutiliza el ArchivoAlmacenado de
+cada contenido y le suma las referencias, fuera de la transacción del
+registro, y guardar_archivos() mueve los temporales al almacenamiento por
+contenido (src/utils/almacenamiento.py); un contenido que ya existe no se
+vuelve a escribir. La transacción solo inserta filas, así que el bloqueo
+de escritura de SQLite dura lo que tardan esos INSERT.
+
+Mientras un contenido tiene referencias la purga no lo elimina, aunque
+sus documentos aún no se hayan confirmado. Si el registro falla,
+liberar_contenidos() devuelve las referencias y borra los contenidos que
+quedaron sin uso. Los archivos que aun así quedan sin ArchivoAlmacenado
+(p. ej. el proceso se detuvo) los elimina purgar_archivos_documentos
+pasado un plazo de gracia.
+"""
+
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import F
+
+from .almacenamiento import cas_storage, nombre_por_contenido
+
+# Tamaño máximo por archivo (el formulario también limita a 5 MB)
+MAX_DOCUMENT_BYTES = getattr(settings, 'DRIVER_DOCUMENT_MAX_BYTES', 5 * 1024 * 1024)
+
+# Extensión -> firmas válidas del inicio del archivo
+FIRMAS_DOCUMENTO = {
+    '.pdf': (b'%PDF-',),
+    '.jpg': (b'\xff\xd8\xff',),
+    '.jpeg': (b'\xff\xd8\xff',),
+    '.png': (b'\x89PNG\r\n\x1a\n',),
+}
+
+# Los campos de fotos solo aceptan imágenes
+CAMPOS_SOLO_IMAGEN = ('foto_vehiculo_frontal', 'foto_vehiculo_lateral', 'foto_vehiculo_interior')
+EXTENSIONES_IMAGEN = ('.jpg', '.jpeg', '.png')
+
+
+class DocumentoUploadHandler(TemporaryFileUploadHandler):
+    """
+    Escribe cada archivo en disco por bloques y lo valida mientras llega.
+    Debe asignarse en request.upload_handlers antes de leer request.POST
+    o request.FILES.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.errores = {}
+        self._firmas = ()
+        self._recibidos = 0
+        self._sha256 = None
+
+    def _rechazar(self, mensaje):
+        """Registra el error y elimina el temporal del archivo en curso."""
+        self.errores[self.field_name] = mensaje
+        if hasattr(self, 'file'):
+            # Al cerrarse se borra el temporal; se quita el atributo para que
+            # el parser no vuelva a cerrarlo
+            self.file.close()
+            del self.file
+
+    def _descartar(self, mensaje):
+        self._rechazar(mensaje)
+        raise SkipFile(mensaje)
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        self.field_name = field_name
+        self._recibidos = 0
+        self._sha256 = hashlib.sha256()
+
+        extension = os.path.splitext(file_name or '')[1].lower()
+        permitidas = EXTENSIONES_IMAGEN if field_name in CAMPOS_SOLO_IMAGEN else tuple(FIRMAS_DOCUMENTO)
+        if extension not in permitidas:
+            self._descartar(f'Tipo de archivo no permitido. Use: {", ".join(permitidas)}')
+        if content_length is not None and content_length > MAX_DOCUMENT_BYTES:
+            self._descartar(f'El archivo supera el tamaño máximo de {MAX_DOCUMENT_BYTES // (1024 * 1024)} MB')
+
+        self._firmas = FIRMAS_DOCUMENTO[extension]
+        # El temporal se crea solo para archivos que pasan las validaciones iniciales
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0 and not raw_data.startswith(self._firmas):
+            self._descartar('El contenido del archivo no corresponde a su extensión')
+
+        self._recibidos += len(raw_data)
+        if self._recibidos > MAX_DOCUMENT_BYTES:
+            self._descartar(f'El archivo supera el tamaño máximo de {MAX_DOCUMENT_BYTES // (1024 * 1024)} MB')
+
+        self._sha256.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if file_size == 0:
+            # El parser no admite SkipFile aquí: el archivo simplemente no se agrega
+            self._rechazar('El archivo está vacío')
+            return None
+        archivo = super().file_complete(file_size)
+        archivo.sha256 = self._sha256.hexdigest()
+        # El archivo ya pertenece a request.FILES: un SkipFile posterior no debe cerrarlo
+        del self.file
+        return archivo
+
+
+def _hash_subido(archivo):
+    """SHA-256 de un archivo subido (calculado por DocumentoUploadHandler si se usó)."""
+    if getattr(archivo, 'sha256', None):
+        return archivo.sha256
+    sha256 = hashlib.sha256()
+    for bloque in archivo.chunks():
+        sha256.update(bloque)
+    archivo.seek(0)
+    archivo.sha256 = sha256.hexdigest()
+    return archivo.sha256
+
+
+def reservar_contenidos(archivos):
+    """
+    Crea o reutiliza un ArchivoAlmacenado por contenido y le suma una
+    referencia por cada campo que lo usa. Se llama antes de guardar los
+    archivos y fuera de la transacción del registro, para que la purga no
+    elimine un contenido en uso; si el registro no se completa, las
+    referencias se devuelven con liberar_contenidos().
+    Retorna {hash: (ArchivoAlmacenado, referencias)}.
+    """
+    from ..models.models import ArchivoAlmacenado
+
+    usos = {}
+    for archivo in archivos.values():
+        hash_hex = _hash_subido(archivo)
+        uso = usos.setdefault(hash_hex, {
+            'nombre': nombre_por_contenido(hash_hex, archivo.name),
+            'tamaño': archivo.size,
+            'referencias': 0
+        })
+        uso['referencias'] += 1
+
+    reservas = {}
+    try:
+        for hash_hex, uso in usos.items():
+            while True:
+                contenido, _ = ArchivoAlmacenado.objects.get_or_create(
+                    hash_sha256=hash_hex,
+                    defaults={'archivo': uso['nombre'], 'tamaño': uso['tamaño']}
+                )
+                # Si la purga eliminó la fila entre las dos consultas, se vuelve a crear
+                if ArchivoAlmacenado.objects.filter(pk=contenido.pk).update(
+                    referencias=F('referencias') + uso['referencias']
+                ):
+                    break
+            reservas[hash_hex] = (contenido, uso['referencias'])
+    except BaseException:
+        liberar_contenidos(reservas)
+        raise
+    return reservas
+
+
+def liberar_contenidos(reservas):
+    """
+    Devuelve las referencias de reservar_contenidos() de un registro que
+    no se completó. Los contenidos que quedan sin referencias ni
+    documentos se eliminan con su archivo.
+    """
+    from ..models.models import ArchivoAlmacenado
+
+    for contenido, referencias in reservas.values():
+        with transaction.atomic():
+            ArchivoAlmacenado.objects.filter(pk=contenido.pk).update(referencias=F('referencias') - referencias)
+            libre = ArchivoAlmacenado.objects.select_for_update().filter(
+                pk=contenido.pk, referencias=0, documentos__isnull=True
+            ).first()
+            if libre is None:
+                continue
+            storage, nombre = libre.archivo.storage, libre.archivo.name
+            libre.delete()
+            # Igual que en la purga: el archivo se borra si la eliminación se confirma
+            transaction.on_commit(lambda storage=storage, nombre=nombre: storage.delete(nombre))
+
+
+def guardar_archivos(archivos):
+    """
+    Guarda los archivos subidos en el almacenamiento por contenido.
+    Retorna {campo del formulario: (nombre, hash)}. Un contenido que ya
+    existe no se vuelve a escribir.
+    """
+    storage = cas_storage()
+    guardados = {}
+    for campo, archivo in archivos.items():
+        hash_hex = _hash_subido(archivo)
+        nombre = storage.save(nombre_por_contenido(hash_hex, archivo.name), archivo)
+        guardados[campo] = (nombre, hash_hex)
+    return guardados
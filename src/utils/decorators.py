@@ -7,6 +7,9 @@ def get_user_type(user):
     """
     Determina el tipo de usuario basado en sus relaciones.
     Retorna: 'admin', 'cliente', 'conductor'
+    
+    El usuario de la sesión llega con sus perfiles ya cargados
+    (src.backends.PerfilModelBackend), así que esto no consulta la base.
     """
     if hasattr(user, 'cliente') and user.cliente:
         return 'cliente'
@@ -24,12 +27,8 @@ def admin_required(view_func):
     @wraps(view_func)
     @login_required
     def wrapper(request, *args, **kwargs):
-        # 🔴 CORRECCIÓN: La lógica estaba al revés
-        es_cliente = hasattr(request.user, 'cliente') and request.user.cliente
-        es_conductor = hasattr(request.user, 'conductor') and request.user.conductor
-        
         # Si NO es cliente NI conductor, entonces es admin y puede acceder
-        if not es_cliente and not es_conductor:
+        if get_user_type(request.user) == 'admin':
             return view_func(request, *args, **kwargs)
         
         # Si llega aquí, es cliente o conductor, no puede acceder
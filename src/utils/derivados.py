@@ -0,0 +1,179 @@
+"""
+Versiones reducidas de los documentos de conductores.
+
+Las fotos (vehículo, licencia, documento) se suben a resolución completa.
+Para las pantallas de revisión se genera, por cada DocumentoConductor de
+imagen, una vista previa y una miniatura reescaladas y recomprimidas en
+JPEG. El trabajo corre en el pool de workers (src/utils/tareas.py)
+después de confirmarse la transacción del registro. Los documentos que
+quedaron pendientes se procesan con
+`python manage.py generar_derivados_documentos`.
+"""
+
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from PIL import Image, ImageOps
+
+from . import tareas
+
+
+logger = logging.getLogger(__name__)
+
+# Lado mayor, en píxeles, de cada versión
+PREVIEW_MAX_PX = getattr(settings, 'DOCUMENT_PREVIEW_MAX_PX', 1280)
+THUMBNAIL_MAX_PX = getattr(settings, 'DOCUMENT_THUMBNAIL_MAX_PX', 256)
+JPEG_QUALITY = getattr(settings, 'DOCUMENT_DERIVATIVE_QUALITY', 80)
+
+EXTENSIONES_IMAGEN = ('.jpg', '.jpeg', '.png')
+
+
+def es_imagen(nombre):
+    return os.path.splitext(nombre or '')[1].lower() in EXTENSIONES_IMAGEN
+
+
+def _reducir(imagen, lado_max):
+    """Copia de la imagen con el lado mayor limitado, como JPEG en bytes."""
+    copia = imagen.copy()
+    copia.thumbnail((lado_max, lado_max), Image.LANCZOS)
+    salida = io.BytesIO()
+    copia.save(salida, format='JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return salida.getvalue()
+
+
+CAMPOS_DERIVADOS = ('vista_previa', 'miniatura', 'tamaño_vista_previa', 'tamaño_miniatura')
+
+
+def _copiar_generados(documento):
+    """
+    Copia las versiones ya generadas de otro documento con el mismo
+    contenido. Retorna True si había de dónde copiar.
+    """
+    from ..models.models import DocumentoConductor
+
+    existente = DocumentoConductor.objects.filter(
+        contenido_id=documento.contenido_id, estado_derivados='Generado'
+    ).exclude(pk=documento.pk).values(*CAMPOS_DERIVADOS).first()
+    if not existente:
+        return False
+    DocumentoConductor.objects.filter(pk=documento.pk).update(estado_derivados='Generado', **existente)
+    return True
+
+
+def _generar(documento):
+    """Genera y guarda las versiones del documento. Retorna el estado final."""
+    from ..models.models import DocumentoConductor
+
+    try:
+        with documento.archivo.open('rb') as archivo, Image.open(archivo) as original:
+            # Respeta la orientación EXIF de las fotos de celular
+            imagen = ImageOps.exif_transpose(original).convert('RGB')
+            vista_previa = _reducir(imagen, PREVIEW_MAX_PX)
+            miniatura = _reducir(imagen, THUMBNAIL_MAX_PX)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.exception('No se pudieron generar las versiones reducidas del documento %s', documento.pk)
+        DocumentoConductor.objects.filter(pk=documento.pk).update(estado_derivados='Error')
+        return 'Error'
+
+    base = os.path.splitext(os.path.basename(documento.archivo.name))[0]
+    documento.vista_previa.save(f'{base}_previa.jpg', ContentFile(vista_previa), save=False)
+    documento.miniatura.save(f'{base}_miniatura.jpg', ContentFile(miniatura), save=False)
+    documento.tamaño_vista_previa = len(vista_previa)
+    documento.tamaño_miniatura = len(miniatura)
+    documento.estado_derivados = 'Generado'
+    documento.save(update_fields=[*CAMPOS_DERIVADOS, 'estado_derivados'])
+    return 'Generado'
+
+
+def _generar_contenido(documento, retomar, reintentar):
+    """
+    Genera las versiones de un documento con contenido compartido.
+    Solo el worker que reclama el ArchivoAlmacenado (estado 'En Proceso')
+    las genera; al terminar las copia a los demás documentos pendientes
+    del mismo contenido. Los que no lo reclaman quedan pendientes y los
+    actualiza quien lo tiene.
+    """
+    from ..models.models import ArchivoAlmacenado, DocumentoConductor
+
+    if _copiar_generados(documento):
+        return 'Generado'
+
+    # 'Generado' sin documentos de dónde copiar: se eliminaron y hay que
+    # volver a generar
+    reclamables = ['Pendiente', 'Generado']
+    if retomar:
+        reclamables.append('En Proceso')
+    if reintentar:
+        reclamables.append('Error')
+    contenido = ArchivoAlmacenado.objects.filter(pk=documento.contenido_id)
+    if not contenido.filter(estado_derivados__in=reclamables).update(estado_derivados='En Proceso'):
+        # Otro worker lo reclamó; pudo terminar entre las dos consultas
+        if _copiar_generados(documento):
+            return 'Generado'
+        if contenido.filter(estado_derivados='Error').exists():
+            DocumentoConductor.objects.filter(pk=documento.pk).update(estado_derivados='Error')
+            return 'Error'
+        return 'Pendiente'
+
+    try:
+        # El reclamo pudo llegar justo después de que otro terminara
+        estado = 'Generado' if _copiar_generados(documento) else _generar(documento)
+    except BaseException:
+        contenido.update(estado_derivados='Pendiente')
+        raise
+
+    pendientes = DocumentoConductor.objects.filter(contenido_id=documento.contenido_id, estado_derivados='Pendiente')
+    if estado == 'Generado':
+        documento.refresh_from_db(fields=CAMPOS_DERIVADOS)
+        pendientes.update(
+            estado_derivados='Generado',
+            **{campo: getattr(documento, campo) for campo in CAMPOS_DERIVADOS}
+        )
+    else:
+        pendientes.update(estado_derivados='Error')
+    contenido.update(estado_derivados=estado)
+    return estado
+
+
+def generar_derivados(documento_id, retomar=False, reintentar=False):
+    """
+    Genera la vista previa y la miniatura de un documento de imagen.
+    `retomar` reclama contenidos que quedaron 'En Proceso' (el worker que
+    los tenía se detuvo) y `reintentar` los que fallaron; ambos los usa
+    el comando generar_derivados_documentos.
+    Retorna el estado final del documento.
+    """
+    from ..models.models import DocumentoConductor
+
+    documento = DocumentoConductor.objects.filter(pk=documento_id).first()
+    if documento is None:
+        return None
+
+    if not es_imagen(documento.archivo.name):
+        DocumentoConductor.objects.filter(pk=documento_id).update(estado_derivados='No Aplica')
+        return 'No Aplica'
+
+    # Documentos anteriores al almacenamiento por contenido
+    if documento.contenido_id is None:
+        return _generar(documento)
+
+    return _generar_contenido(documento, retomar, reintentar)
+
+
+def encolar_derivados(documento_ids):
+    """
+    Envía los documentos al pool de workers cuando se confirme la
+    transacción actual (o de inmediato si no hay una abierta).
+    """
+    documento_ids = list(documento_ids)
+
+    def _enviar():
+        for documento_id in documento_ids:
+            tareas.submit(generar_derivados, documento_id)
+
+    transaction.on_commit(_enviar)
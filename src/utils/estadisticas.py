@@ -0,0 +1,99 @@
+"""
+Mantenimiento del resumen de viajes por conductor (EstadisticaConductor).
+
+Cada viaje aporta a los contadores del conductor según su estado,
+calificación y valor. Al guardar o eliminar un viaje se resta el aporte
+anterior y se suma el nuevo con UPDATE ... SET campo = campo + delta, sin
+recorrer los demás viajes del conductor.
+"""
+
+from decimal import Decimal
+
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from ..models.models import EstadisticaConductor, Viaje
+
+# Campos de Viaje que afectan las estadísticas
+CAMPOS_VIAJE = ('conductor_id', 'estado', 'calificacion_conductor', 'valor_total')
+
+
+def aporte_viaje(estado, calificacion, valor_total):
+    """Contribución de un viaje a cada contador del resumen."""
+    completado = estado == 'Completado'
+    return {
+        'total_viajes': 1,
+        'viajes_completados': 1 if completado else 0,
+        'viajes_cancelados': 1 if estado == 'Cancelado' else 0,
+        # Los valores pueden venir sin convertir si el viaje se asignó desde un formulario
+        'suma_calificaciones': Decimal(str(calificacion)) if calificacion is not None else Decimal('0'),
+        'num_calificaciones': 1 if calificacion is not None else 0,
+        'ingresos': Decimal(str(valor_total)) if completado and valor_total is not None else Decimal('0'),
+    }
+
+
+def _ultimo_viaje(conductor_ref):
+    """Subconsulta con la fecha del viaje más reciente (índice conductor, -fecha_solicitud)."""
+    return Subquery(
+        Viaje.objects.filter(conductor=conductor_ref)
+        .order_by('-fecha_solicitud')
+        .values('fecha_solicitud')[:1]
+    )
+
+
+def recalcular_estadisticas(conductor_id):
+    """Reconstruye el resumen de un conductor a partir de sus viajes."""
+    resumen = Viaje.objects.filter(conductor_id=conductor_id).order_by().aggregate(
+        total_viajes=Count('id'),
+        viajes_completados=Count('id', filter=Q(estado='Completado')),
+        viajes_cancelados=Count('id', filter=Q(estado='Cancelado')),
+        suma_calificaciones=Sum('calificacion_conductor'),
+        num_calificaciones=Count('calificacion_conductor'),
+        ingresos=Sum('valor_total', filter=Q(estado='Completado')),
+        ultimo_viaje=Max('fecha_solicitud'),
+    )
+    resumen['suma_calificaciones'] = resumen['suma_calificaciones'] or Decimal('0')
+    resumen['ingresos'] = resumen['ingresos'] or Decimal('0')
+
+    estadistica, _ = EstadisticaConductor.objects.update_or_create(
+        conductor_id=conductor_id,
+        defaults=resumen
+    )
+    return estadistica
+
+
+def aplicar_viaje(conductor_id, aporte_anterior=None, aporte_nuevo=None):
+    """
+    Actualiza el resumen del conductor con la diferencia entre el aporte
+    anterior y el nuevo de un viaje (None si el viaje no existía o se eliminó).
+    Si el conductor aún no tiene resumen, se construye completo.
+    """
+    if not EstadisticaConductor.objects.filter(conductor_id=conductor_id).exists():
+        # Al eliminar no hay nada que mantener (p. ej. borrado en cascada del conductor)
+        if aporte_nuevo is not None:
+            recalcular_estadisticas(conductor_id)
+        return
+
+    cambios = {}
+    for campo in aporte_viaje(None, None, None):
+        delta = 0
+        if aporte_nuevo:
+            delta += aporte_nuevo[campo]
+        if aporte_anterior:
+            delta -= aporte_anterior[campo]
+        if delta:
+            cambios[campo] = F(campo) + delta
+
+    EstadisticaConductor.objects.filter(conductor_id=conductor_id).update(
+        ultimo_viaje=_ultimo_viaje(OuterRef('conductor_id')),
+        fecha_actualizacion=timezone.now(),
+        **cambios
+    )
+
+
+def obtener_estadisticas(conductor):
+    """Resumen del conductor; se construye la primera vez que se consulta."""
+    try:
+        return conductor.estadisticas
+    except EstadisticaConductor.DoesNotExist:
+        return recalcular_estadisticas(conductor.id)
@@ -0,0 +1,132 @@
+"""
+Métricas del tablero de una compañía.
+
+Se calculan con una sola consulta de agregación condicional sobre la
+compañía y sus viajes, y se guardan en caché por compañía y mes. Las
+señales de Viaje y Cliente invalidan la entrada de la compañía afectada
+(ver src/signals.py), así que las visitas repetidas al tablero no vuelven
+a recorrer el historial de viajes.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from ..models.models import Cliente, Compania
+from .cache import LRUCache
+
+
+metrics_cache = LRUCache(
+    maxsize=getattr(settings, 'COMPANY_METRICS_CACHE_MAX_ENTRIES', 512),
+    ttl=getattr(settings, 'COMPANY_METRICS_CACHE_TTL', 10 * 60)
+)
+
+
+def _inicio_mes(fecha):
+    """Primer instante del mes de `fecha`."""
+    return fecha.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _periodo_actual():
+    """Retorna (primer_dia_mes, mes_anterior_inicio, clave del mes)."""
+    primer_dia_mes = _inicio_mes(timezone.localtime())
+    mes_anterior_inicio = _inicio_mes(primer_dia_mes - timedelta(days=1))
+    return primer_dia_mes, mes_anterior_inicio, primer_dia_mes.strftime('%Y-%m')
+
+
+def _anotar_metricas(companias, primer_dia_mes, mes_anterior_inicio):
+    """Agrega a un queryset de compañías los contadores de las métricas."""
+    # Los viajes se cuentan con la compañía desnormalizada (índice compania,
+    # fecha_solicitud); los empleados activos van en una subconsulta para no
+    # multiplicar filas en la unión con viajes.
+    clientes_activos = Cliente.objects.filter(
+        compania=OuterRef('pk'), activo=True
+    ).order_by().values('compania').annotate(total=Count('id')).values('total')
+
+    return companias.annotate(
+        empleados_activos=Subquery(clientes_activos),
+        servicios_realizados=Count('viajes'),
+        servicios_mes=Count('viajes', filter=Q(viajes__fecha_solicitud__gte=primer_dia_mes)),
+        servicios_mes_anterior=Count(
+            'viajes',
+            filter=Q(
+                viajes__fecha_solicitud__gte=mes_anterior_inicio,
+                viajes__fecha_solicitud__lt=primer_dia_mes
+            )
+        )
+    )
+
+
+def _metricas(compania):
+    """Arma el dict de métricas de una compañía anotada con _anotar_metricas()."""
+    servicios_mes = compania.servicios_mes
+    servicios_mes_anterior = compania.servicios_mes_anterior
+    porcentaje_mes = 0
+    if servicios_mes_anterior > 0:
+        porcentaje_mes = ((servicios_mes - servicios_mes_anterior) / servicios_mes_anterior) * 100
+    elif servicios_mes > 0:
+        porcentaje_mes = 100
+
+    return {
+        'servicios_realizados': compania.servicios_realizados,
+        'empleados_activos': compania.empleados_activos or 0,
+        'servicios_mes': servicios_mes,
+        'porcentaje_mes': round(porcentaje_mes, 1)
+    }
+
+
+def get_company_with_metrics(company_id):
+    """
+    Retorna (compania, metricas). Con la caché vacía, la compañía y sus
+    métricas salen de una sola consulta. Lanza Compania.DoesNotExist si
+    la compañía no existe.
+    """
+    primer_dia_mes, mes_anterior_inicio, mes = _periodo_actual()
+
+    # La clave incluye el mes, así el cambio de mes no sirve métricas viejas
+    key = (int(company_id), mes)
+    metricas = metrics_cache.get(key)
+    if metricas is not None:
+        return Compania.objects.get(id=company_id), metricas
+
+    compania = _anotar_metricas(Compania.objects.all(), primer_dia_mes, mes_anterior_inicio).get(id=company_id)
+    metricas = _metricas(compania)
+    metrics_cache.set(key, metricas)
+    return compania, metricas
+
+
+def get_metrics_for_companies(company_ids):
+    """
+    Retorna {company_id: metricas} para varias compañías. Las que no están
+    en caché se calculan juntas en una sola consulta agrupada.
+    """
+    primer_dia_mes, mes_anterior_inicio, mes = _periodo_actual()
+
+    resultado = {}
+    faltantes = []
+    for company_id in company_ids:
+        metricas = metrics_cache.get((company_id, mes))
+        if metricas is None:
+            faltantes.append(company_id)
+        else:
+            resultado[company_id] = metricas
+
+    if faltantes:
+        companias = _anotar_metricas(
+            Compania.objects.filter(id__in=faltantes).only('id'), primer_dia_mes, mes_anterior_inicio
+        )
+        for compania in companias:
+            metricas = _metricas(compania)
+            metrics_cache.set((compania.id, mes), metricas)
+            resultado[compania.id] = metricas
+
+    return resultado
+
+
+def invalidate_company_metrics(company_id):
+    """Elimina las métricas cacheadas de una compañía."""
+    if company_id is None:
+        return 0
+    return metrics_cache.delete_where(lambda key: key[0] == company_id)
@@ -0,0 +1,140 @@
+"""
+Utilidades de paginación para los endpoints JSON.
+"""
+
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def get_page_params(params, default_size=DEFAULT_PAGE_SIZE, max_size=MAX_PAGE_SIZE):
+    """
+    Lee `page` (desde 1) y `page_size` de un dict de parámetros (request.GET
+    o body JSON). Valores inválidos se reemplazan por los valores por defecto
+    y el tamaño de página se limita a `max_size`.
+    Retorna (page, page_size, offset).
+    """
+    try:
+        page = max(int(params.get('page', 1)), 1)
+    except (TypeError, ValueError):
+        page = 1
+
+    try:
+        page_size = int(params.get('page_size', default_size))
+    except (TypeError, ValueError):
+        page_size = default_size
+    page_size = min(max(page_size, 1), max_size)
+
+    return page, page_size, (page - 1) * page_size
+
+
+# ====================================
+# PAGINACIÓN POR CURSOR (KEYSET)
+# ====================================
+# El cursor guarda los valores de ordenamiento de la última fila entregada.
+# La página siguiente se obtiene filtrando "después de" esos valores, con lo
+# que la consulta recorre un rango del índice en lugar de saltar filas con
+# OFFSET.
+
+def get_limit(params, default_size=DEFAULT_PAGE_SIZE, max_size=MAX_PAGE_SIZE):
+    """Lee `limit` de los parámetros, limitado a `max_size`."""
+    try:
+        limit = int(params.get('limit', default_size))
+    except (TypeError, ValueError):
+        limit = default_size
+    return min(max(limit, 1), max_size)
+
+
+def encode_cursor(*values):
+    """
+    Codifica los valores de la última fila (fechas, ids) como un cursor opaco.
+    Las fechas se guardan en formato ISO.
+    """
+    payload = [value.isoformat() if isinstance(value, (datetime, date)) else value for value in values]
+    return urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """
+    Decodifica un cursor generado por encode_cursor().
+    Retorna la lista de valores o lanza ValueError si el cursor no es válido.
+    """
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        values = json.loads(urlsafe_b64decode(cursor + padding))
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError('Cursor no válido') from e
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Cursor no válido')
+    return values
+
+
+def keyset_page(queryset, cursor, limit, date_field):
+    """
+    Retorna (filas, next_cursor) para un queryset ordenado de forma
+    descendente por (date_field, id), p. ej. los viajes más recientes primero.
+    `cursor` es None para la primera página. Acepta querysets de modelos o
+    de .values() (que deben incluir date_field e id).
+    """
+    queryset = queryset.order_by(f'-{date_field}', '-id')
+
+    if cursor:
+        fecha_str, last_id = decode_cursor(cursor, 2)
+        try:
+            fecha = datetime.fromisoformat(fecha_str)
+            last_id = int(last_id)
+        except (TypeError, ValueError) as e:
+            raise ValueError('Cursor no válido') from e
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__lt': fecha}) | Q(**{date_field: fecha, 'id__lt': last_id})
+        )
+
+    # Se pide una fila extra para saber si existe una página siguiente
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    if isinstance(last, dict):
+        return rows, encode_cursor(last[date_field], last['id'])
+    return rows, encode_cursor(getattr(last, date_field), last.id)
+
+
+def keyset_page_asc(queryset, cursor, limit, field):
+    """
+    Retorna (filas, next_cursor) para un queryset ordenado de forma
+    ascendente por (field, id), p. ej. un listado alfabético sobre una
+    columna de texto indexada. Acepta querysets de modelos o de .values()
+    (que deben incluir field e id).
+    """
+    queryset = queryset.order_by(field, 'id')
+
+    if cursor:
+        last_value, last_id = decode_cursor(cursor, 2)
+        try:
+            last_id = int(last_id)
+        except (TypeError, ValueError) as e:
+            raise ValueError('Cursor no válido') from e
+        if not isinstance(last_value, str):
+            raise ValueError('Cursor no válido')
+        queryset = queryset.filter(
+            Q(**{f'{field}__gt': last_value}) | Q(**{field: last_value, 'id__gt': last_id})
+        )
+
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    if isinstance(last, dict):
+        return rows, encode_cursor(last[field], last['id'])
+    return rows, encode_cursor(getattr(last, field), last.id)
@@ -0,0 +1,36 @@
+"""
+Verificación de duplicados en los endpoints de registro.
+
+Las verificaciones de unicidad (email, documento, placa) se resuelven en
+una sola consulta UNION ALL. La unicidad la garantizan las restricciones
+de la base de datos: esta consulta solo permite responder con un mensaje
+claro antes de escribir, y volver a ejecutarla después de un
+IntegrityError permite saber qué restricción falló sin depender del texto
+del error de cada motor.
+"""
+
+from django.db.models import CharField, Value
+
+
+def primer_duplicado(verificaciones):
+    """
+    `verificaciones` es una lista de (clave, queryset) en orden de
+    prioridad; cada queryset filtra las filas que chocarían con el
+    registro. Retorna la clave de la primera verificación con
+    coincidencias, o None. Ejecuta una sola consulta.
+    """
+    if not verificaciones:
+        return None
+
+    consultas = [
+        queryset.order_by().annotate(
+            clave_duplicado=Value(clave, output_field=CharField())
+        ).values_list('clave_duplicado', flat=True)
+        for clave, queryset in verificaciones
+    ]
+    encontradas = set(consultas[0].union(*consultas[1:], all=True))
+
+    for clave, _ in verificaciones:
+        if clave in encontradas:
+            return clave
+    return None
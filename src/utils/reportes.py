@@ -0,0 +1,546 @@
+"""
+Utilidades compartidas para la generación de reportes descargables.
+"""
+
+import csv
+import json
+import tempfile
+from decimal import Decimal
+from wsgiref.util import FileWrapper
+
+from django.http import HttpResponse, StreamingHttpResponse
+from openpyxl import Workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+
+from .serializacion import nombre_completo
+
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Formatos de salida aceptados por los endpoints de reportes
+REPORT_FORMATS = ('json', 'xlsx', 'csv', 'ndjson')
+
+# Filas que se traen de la base de datos por cada lote al iterar un queryset
+QUERY_CHUNK_SIZE = 2000
+
+# Tamaño de cada bloque enviado al cliente (bytes)
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+def to_money(value):
+    """Normaliza un valor monetario (Decimal o None) a dos decimales."""
+    return (value or Decimal('0')).quantize(Decimal('0.01'))
+
+
+def _attachment(response, filename):
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def xlsx_file_response(archivo, filename):
+    """
+    Envía por bloques un archivo XLSX ya escrito. `archivo` debe estar
+    posicionado al final (su tamaño se toma de la posición actual).
+    """
+    size = archivo.tell()
+    archivo.seek(0)
+    response = StreamingHttpResponse(
+        FileWrapper(archivo, STREAM_BLOCK_SIZE),
+        content_type=XLSX_CONTENT_TYPE
+    )
+    response['Content-Length'] = size
+    return _attachment(response, filename)
+
+
+def xlsx_bytes_response(contenido, filename):
+    """Respuesta de descarga para un XLSX que ya está en memoria."""
+    return _attachment(HttpResponse(contenido, content_type=XLSX_CONTENT_TYPE), filename)
+
+
+def streaming_xlsx_response(workbook, filename):
+    """
+    Guarda el workbook en un archivo temporal y lo envía por bloques.
+    Con un workbook write-only las filas ya están en disco, así que la
+    memoria usada no depende del número de filas del reporte.
+    """
+    archivo = tempfile.TemporaryFile()
+    workbook.save(archivo)
+    return xlsx_file_response(archivo, filename)
+
+
+# ====================================
+# SALIDAS CSV Y NDJSON POR STREAMING
+# ====================================
+class _Echo:
+    """Pseudo-buffer: csv.writer escribe en él y se recupera la línea."""
+
+    def write(self, value):
+        return value
+
+
+def streaming_csv_response(columns, rows, filename):
+    """Envía las filas (tuplas) como CSV a medida que se generan."""
+    writer = csv.writer(_Echo())
+
+    def contenido():
+        yield '\ufeff'
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(contenido(), content_type='text/csv; charset=utf-8')
+    return _attachment(response, filename)
+
+
+def streaming_ndjson_response(columns, rows, filename):
+    """
+    Envía las filas (tuplas) como NDJSON: un objeto JSON por línea.
+    Las claves se codifican una sola vez y cada línea se arma sin crear
+    un dict por fila.
+    """
+    keys = [json.dumps(column) + ': ' for column in columns]
+
+    def contenido():
+        for row in rows:
+            yield '{' + ', '.join(key + json.dumps(value) for key, value in zip(keys, row)) + '}\n'
+
+    response = StreamingHttpResponse(contenido(), content_type='application/x-ndjson; charset=utf-8')
+    return _attachment(response, filename)
+
+
+def flat_report_response(formato, columns, rows, filename):
+    """Respuesta en streaming para los formatos planos ('csv' o 'ndjson')."""
+    if formato == 'csv':
+        return streaming_csv_response(columns, rows, f'{filename}.csv')
+    return streaming_ndjson_response(columns, rows, f'{filename}.ndjson')
+
+
+# ====================================
+# ESCRITOR DE REPORTES EXCEL
+# ====================================
+class ReportWriter:
+    """
+    Escritor de reportes Excel sobre una hoja write-only.
+
+    El ancho de cada columna se calcula mientras se agregan las filas, sin
+    volver a recorrer la hoja. Como en modo write-only los anchos deben
+    definirse antes de escribir la primera fila, las primeras `sample_rows`
+    filas se retienen para medirlas; al completar la muestra (o al guardar)
+    se fijan los anchos y el resto de filas se escribe directamente.
+    """
+
+    def __init__(self, title, header_color, sample_rows=200, min_width=8, max_width=50):
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(title)
+        self.header_fill = PatternFill(start_color=header_color, end_color=header_color, fill_type="solid")
+        self.header_font = Font(bold=True, color="FFFFFF")
+        self.sample_rows = sample_rows
+        self.min_width = min_width
+        self.max_width = max_width
+        self._widths = []
+        self._pending = []
+        self._measured_rows = 0
+        self._flushed = False
+
+    def cell(self, value, **styles):
+        """
+        Crea una celda para usarla dentro de una fila.
+        Acepta estilos de openpyxl como argumentos: font, fill, border,
+        alignment, number_format.
+        """
+        cell = WriteOnlyCell(self.sheet, value=value)
+        for attr, style in styles.items():
+            setattr(cell, attr, style)
+        return cell
+
+    def title(self, text, size=14):
+        """Agrega una fila de título (no cuenta para el ancho de columnas)."""
+        self._write([self.cell(text, font=Font(bold=True, size=size))], measure=False)
+
+    def header(self, headers, **styles):
+        """Agrega la fila de encabezados con el estilo del reporte."""
+        self.append([
+            self.cell(
+                header,
+                font=self.header_font,
+                fill=self.header_fill,
+                alignment=Alignment(horizontal='center', vertical='center'),
+                **styles
+            )
+            for header in headers
+        ])
+
+    def blank(self):
+        """Agrega una fila vacía."""
+        self._write([], measure=False)
+
+    def append(self, values):
+        """Agrega una fila de datos y actualiza el ancho de sus columnas."""
+        self._write(list(values), measure=True)
+
+    def save(self, destino):
+        """Guarda el workbook en una ruta o archivo abierto."""
+        self._flush()
+        self.workbook.save(destino)
+
+    def response(self, filename):
+        """Retorna el reporte como descarga enviada por bloques."""
+        self._flush()
+        return streaming_xlsx_response(self.workbook, filename)
+
+    def _write(self, row, measure):
+        if self._flushed:
+            self.sheet.append(row)
+            return
+        self._pending.append(row)
+        if measure:
+            self._measure(row)
+            self._measured_rows += 1
+            if self._measured_rows >= self.sample_rows:
+                self._flush()
+
+    def _measure(self, row):
+        for idx, value in enumerate(row):
+            if isinstance(value, Cell):
+                value = value.value
+            length = len(str(value)) if value is not None else 0
+            if idx >= len(self._widths):
+                self._widths.append(length)
+            elif length > self._widths[idx]:
+                self._widths[idx] = length
+
+    def _flush(self):
+        if self._flushed:
+            return
+        for idx, length in enumerate(self._widths, 1):
+            width = min(max(length + 2, self.min_width), self.max_width)
+            self.sheet.column_dimensions[get_column_letter(idx)].width = width
+        for row in self._pending:
+            self.sheet.append(row)
+        self._pending = []
+        self._flushed = True
+
+
+# ====================================
+# GENERADORES DE REPORTES
+# ====================================
+# Cada generador recibe los parámetros ya validados y retorna un
+# ReportWriter listo para enviarse como respuesta o guardarse en disco.
+# Los usan tanto los endpoints síncronos como los trabajos en segundo plano.
+
+def build_services_report(compania, fecha_inicio, fecha_fin):
+    """Reporte de todos los viajes solicitados por la compañía en el rango."""
+    from ..models.models import Viaje
+
+    viajes = Viaje.objects.filter(
+        compania=compania,
+        fecha_solicitud__gte=fecha_inicio,
+        fecha_solicitud__lte=fecha_fin
+    ).select_related('cliente__user', 'conductor__user', 'cliente__compania')
+
+    writer = ReportWriter("Reporte de Servicios", header_color="0066CC")
+    writer.header(['ID Cliente', 'Nombre Cliente', 'Empresa', 'ID Empresa', 'Fecha',
+                   'ID Conductor', 'Nombre Conductor', 'Origen', 'Destino', 'Estado', 'Valor Total'])
+
+    # Datos: se recorren por lotes sin acumularlos en memoria
+    for viaje in viajes.iterator(chunk_size=QUERY_CHUNK_SIZE):
+        writer.append([
+            viaje.cliente.id,
+            viaje.cliente.get_nombre_completo(),
+            viaje.cliente.compania.nombre,
+            viaje.cliente.compania.id,
+            viaje.fecha_solicitud.strftime('%Y-%m-%d %H:%M'),
+            viaje.conductor.id,
+            viaje.conductor.get_nombre_completo(),
+            viaje.origen,
+            viaje.destino,
+            viaje.estado,
+            str(viaje.valor_total)
+        ])
+
+    return writer
+
+
+def build_income_report(compania, fecha_inicio, fecha_fin):
+    """Reporte de ingresos de los viajes completados, con total calculado en SQL."""
+    from django.db.models import Sum
+    from openpyxl.styles import numbers
+    from ..models.models import Viaje
+
+    viajes = Viaje.objects.filter(
+        compania=compania,
+        fecha_solicitud__gte=fecha_inicio,
+        fecha_solicitud__lte=fecha_fin,
+        estado='Completado'
+    )
+    total_ingresos = to_money(viajes.aggregate(total=Sum('valor_total'))['total'])
+
+    writer = ReportWriter("Reporte de Ingresos", header_color="00AA00")
+    writer.title(f"REPORTE DE INGRESOS - {compania.nombre}")
+    writer.blank()
+    writer.header(['ID Viaje', 'Fecha', 'ID Empresa', 'Nombre Empresa', 'Monto', 'Método de Pago', 'Origen', 'Destino'])
+
+    detalle_viajes = viajes.values_list(
+        'id', 'fecha_solicitud', 'valor_total', 'metodo_pago', 'origen', 'destino'
+    ).order_by('-fecha_solicitud')
+    for id_viaje, fecha, monto, metodo_pago, origen, destino in detalle_viajes.iterator(chunk_size=QUERY_CHUNK_SIZE):
+        writer.append([
+            id_viaje,
+            fecha.strftime('%Y-%m-%d %H:%M'),
+            compania.id,
+            compania.nombre,
+            monto,
+            metodo_pago,
+            origen,
+            destino
+        ])
+
+    # Fila de total
+    writer.blank()
+    writer.append([
+        None, None, None,
+        writer.cell('TOTAL INGRESOS:', font=Font(bold=True)),
+        writer.cell(
+            total_ingresos,
+            font=Font(bold=True, color="00AA00"),
+            number_format=numbers.FORMAT_CURRENCY_USD_SIMPLE
+        )
+    ])
+
+    return writer
+
+
+def build_issues_report(compania, fecha_inicio, fecha_fin):
+    """Reporte de novedades registradas para la compañía en el rango."""
+    from ..models.models import Novedad
+
+    novedades = Novedad.objects.filter(
+        compania=compania,
+        fecha_creacion__gte=fecha_inicio,
+        fecha_creacion__lte=fecha_fin
+    ).select_related('creado_por', 'viaje', 'conductor__user', 'cliente__user')
+
+    writer = ReportWriter("Reporte de Novedades", header_color="FF6600")
+    writer.title(f"REPORTE DE NOVEDADES - {compania.nombre}")
+    writer.blank()
+    writer.header(['ID', 'Fecha Creación', 'Tipo', 'Descripción', 'Estado', 'Prioridad',
+                   'Creado Por', 'ID Viaje', 'Conductor', 'Cliente', 'Fecha Resolución'])
+
+    for novedad in novedades.iterator(chunk_size=QUERY_CHUNK_SIZE):
+        writer.append([
+            novedad.id,
+            novedad.fecha_creacion.strftime('%Y-%m-%d %H:%M'),
+            novedad.tipo_novedad,
+            novedad.descripcion,
+            novedad.estado,
+            novedad.prioridad,
+            novedad.creado_por.get_full_name() if novedad.creado_por else 'Sistema',
+            novedad.viaje.id if novedad.viaje else 'N/A',
+            novedad.conductor.get_nombre_completo() if novedad.conductor else 'N/A',
+            novedad.cliente.get_nombre_completo() if novedad.cliente else 'N/A',
+            novedad.fecha_resolucion.strftime('%Y-%m-%d %H:%M') if novedad.fecha_resolucion else 'Pendiente'
+        ])
+
+    return writer
+
+
+def build_driver_report(driver, report_type, start_date, end_date):
+    """Reporte de viajes o monetario de un conductor para el período indicado."""
+    from openpyxl.styles import Border, Side
+
+    # Estilos
+    border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+    bold = Font(bold=True)
+    placa = driver.vehiculo.placa if hasattr(driver, 'vehiculo') and driver.vehiculo else 'N/A'
+
+    writer = ReportWriter(f"Reporte {report_type.title()}"[:31], header_color="1E40AF")
+
+    # Información del reporte (primera fila)
+    writer.title(f"Reporte {report_type.title()}", size=16)
+    writer.blank()
+
+    # Información del conductor
+    writer.title("Información del Conductor", size=11)
+    writer.blank()
+
+    conductor_info = [
+        ["Nombre:", driver.get_nombre_completo()],
+        ["Documento:", driver.numero_documento],
+        ["Placa:", placa],
+        ["Período:", f"{start_date} al {end_date}"],
+    ]
+
+    for label, value in conductor_info:
+        writer.append([writer.cell(label, font=bold), value])
+
+    # Espacio en blanco
+    writer.blank()
+
+    if report_type in ['monthly', 'daily']:
+        # Reporte de viajes
+        writer.title("REPORTE DE VIAJES")
+        writer.blank()
+
+        # Encabezados
+        writer.header([
+            "ID Conductor", "Nombre Conductor", "Placa Vehículo", "ID Cliente", 
+            "Nombre Cliente", "Lugar Recogida", "Destino", "Distancia (km)", 
+            "Tiempo Acumulado", "Fecha Inicio", "Fecha Fin"
+        ], border=border)
+
+        # Datos de ejemplo
+        sample_trips = [
+            [driver.id, driver.get_nombre_completo(), placa, 
+             "CLI001", "Juan Pérez", "Centro", "Aeropuerto", 15.5, "02:30:00", "2025-01-15 08:00", "2025-01-15 10:30"],
+            [driver.id, driver.get_nombre_completo(), placa,
+             "CLI002", "María González", "Mall", "Hospital", 8.2, "01:45:00", "2025-01-16 14:00", "2025-01-16 15:45"],
+            [driver.id, driver.get_nombre_completo(), placa,
+             "CLI003", "Carlos Rodríguez", "Estadio", "Centro", 12.8, "02:15:00", "2025-01-17 19:00", "2025-01-17 21:15"],
+        ]
+
+        # Agregar datos
+        for trip in sample_trips:
+            writer.append([writer.cell(value, border=border) for value in trip])
+
+        # Total de viajes
+        writer.blank()
+        writer.title(f"TOTAL VIAJES: {len(sample_trips)}", size=11)
+
+    elif report_type == 'monetary':
+        # Reporte monetario
+        writer.title("REPORTE MONETARIO")
+        writer.blank()
+
+        # Encabezados
+        writer.header(["ID Conductor", "Nombre Conductor", "Fecha Inicio", "Fecha Fin", "Valor Total Generado"], border=border)
+
+        # Datos de ejemplo
+        total_value = 2850000
+
+        writer.append([
+            writer.cell(value, border=border)
+            for value in [driver.id, driver.get_nombre_completo(), start_date, end_date, f"${total_value:,.0f}"]
+        ])
+
+    return writer
+
+
+# ====================================
+# FILAS PLANAS DE REPORTES (CSV / NDJSON)
+# ====================================
+# Cada función retorna (columnas, filas). Las filas son tuplas que salen
+# directamente de un queryset .values_list(), sin instanciar modelos.
+
+def services_report_rows(compania, fecha_inicio, fecha_fin):
+    """Columnas y filas del reporte de servicios."""
+    from ..models.models import Viaje
+
+    columns = ['id_cliente', 'nombre_cliente', 'nombre_empresa', 'id_empresa', 'fecha',
+               'id_conductor', 'nombre_conductor', 'origen', 'destino', 'estado', 'valor_total']
+
+    viajes = Viaje.objects.filter(
+        compania=compania,
+        fecha_solicitud__gte=fecha_inicio,
+        fecha_solicitud__lte=fecha_fin
+    ).values_list(
+        'cliente_id', 'cliente__user__first_name', 'cliente__segundo_nombre',
+        'cliente__user__last_name', 'cliente__segundo_apellido',
+        'fecha_solicitud', 'conductor_id', 'conductor__user__first_name', 'conductor__segundo_nombre',
+        'conductor__user__last_name', 'conductor__segundo_apellido',
+        'origen', 'destino', 'estado', 'valor_total'
+    )
+
+    def rows():
+        for (cliente_id, c_nombre, c_nombre2, c_apellido, c_apellido2,
+             fecha, conductor_id, d_nombre, d_nombre2, d_apellido, d_apellido2,
+             origen, destino, estado, valor_total) in viajes.iterator(chunk_size=QUERY_CHUNK_SIZE):
+            yield (
+                cliente_id,
+                nombre_completo(c_nombre, c_nombre2, c_apellido, c_apellido2),
+                compania.nombre,
+                compania.id,
+                fecha.strftime('%Y-%m-%d %H:%M'),
+                conductor_id,
+                nombre_completo(d_nombre, d_nombre2, d_apellido, d_apellido2),
+                origen,
+                destino,
+                estado,
+                str(valor_total)
+            )
+
+    return columns, rows()
+
+
+def income_report_rows(compania, fecha_inicio, fecha_fin):
+    """Columnas y filas del reporte de ingresos (viajes completados)."""
+    from ..models.models import Viaje
+
+    columns = ['id_viaje', 'fecha', 'id_empresa', 'nombre_empresa', 'monto', 'metodo_pago', 'origen', 'destino']
+
+    viajes = Viaje.objects.filter(
+        compania=compania,
+        fecha_solicitud__gte=fecha_inicio,
+        fecha_solicitud__lte=fecha_fin,
+        estado='Completado'
+    ).values_list('id', 'fecha_solicitud', 'valor_total', 'metodo_pago', 'origen', 'destino')
+
+    def rows():
+        for id_viaje, fecha, monto, metodo_pago, origen, destino in viajes.iterator(chunk_size=QUERY_CHUNK_SIZE):
+            yield (
+                id_viaje,
+                fecha.strftime('%Y-%m-%d %H:%M'),
+                compania.id,
+                compania.nombre,
+                str(monto),
+                metodo_pago,
+                origen,
+                destino
+            )
+
+    return columns, rows()
+
+
+def issues_report_rows(compania, fecha_inicio, fecha_fin):
+    """Columnas y filas del reporte de novedades."""
+    from ..models.models import Novedad
+
+    columns = ['id_novedad', 'fecha_creacion', 'tipo_novedad', 'descripcion', 'estado', 'prioridad',
+               'creado_por', 'id_viaje', 'conductor', 'cliente', 'fecha_resolucion']
+
+    novedades = Novedad.objects.filter(
+        compania=compania,
+        fecha_creacion__gte=fecha_inicio,
+        fecha_creacion__lte=fecha_fin
+    ).values_list(
+        'id', 'fecha_creacion', 'tipo_novedad', 'descripcion', 'estado', 'prioridad',
+        'creado_por_id', 'creado_por__first_name', 'creado_por__last_name', 'viaje_id',
+        'conductor_id', 'conductor__user__first_name', 'conductor__segundo_nombre',
+        'conductor__user__last_name', 'conductor__segundo_apellido',
+        'cliente_id', 'cliente__user__first_name', 'cliente__segundo_nombre',
+        'cliente__user__last_name', 'cliente__segundo_apellido',
+        'fecha_resolucion'
+    )
+
+    def rows():
+        for (id_novedad, fecha_creacion, tipo_novedad, descripcion, estado, prioridad,
+             creado_por_id, creador_nombre, creador_apellido, viaje_id,
+             conductor_id, d_nombre, d_nombre2, d_apellido, d_apellido2,
+             cliente_id, c_nombre, c_nombre2, c_apellido, c_apellido2,
+             fecha_resolucion) in novedades.iterator(chunk_size=QUERY_CHUNK_SIZE):
+            yield (
+                id_novedad,
+                fecha_creacion.strftime('%Y-%m-%d %H:%M'),
+                tipo_novedad,
+                descripcion,
+                estado,
+                prioridad,
+                f"{creador_nombre} {creador_apellido}".strip() if creado_por_id else 'Sistema',
+                viaje_id if viaje_id else 'N/A',
+                nombre_completo(d_nombre, d_nombre2, d_apellido, d_apellido2) if conductor_id else 'N/A',
+                nombre_completo(c_nombre, c_nombre2, c_apellido, c_apellido2) if cliente_id else 'N/A',
+                fecha_resolucion.strftime('%Y-%m-%d %H:%M') if fecha_resolucion else 'Pendiente'
+            )
+
+    return columns, rows()
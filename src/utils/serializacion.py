@@ -0,0 +1,59 @@
+"""
+Proyección de campos para los endpoints de listado.
+
+Cada endpoint declara sus campos de salida como
+    nombre -> (columnas de .values(), función que arma el valor)
+y el cliente elige cuáles necesita con `fields=a,b,c`. Solo se consultan
+las columnas de los campos pedidos; si la función es None, el valor es
+la única columna tal cual.
+"""
+
+
+def nombre_completo(primer_nombre, segundo_nombre, primer_apellido, segundo_apellido):
+    """Igual a get_nombre_completo() de Cliente/Conductor, sobre valores sueltos."""
+    nombres = ' '.join(n for n in (primer_nombre, segundo_nombre) if n)
+    apellidos = ' '.join(a for a in (primer_apellido, segundo_apellido) if a)
+    return f"{nombres} {apellidos}"
+
+
+def parse_fields(value, available, default=None):
+    """
+    Lee el parámetro `fields` (separado por comas) y lo valida contra los
+    campos disponibles. Sin parámetro retorna `default` (o todos).
+    Lanza ValueError si se pide un campo desconocido.
+    """
+    if not value:
+        return list(default or available)
+
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    desconocidos = [field for field in fields if field not in available]
+    if desconocidos:
+        raise ValueError(
+            f'Campos no válidos: {", ".join(desconocidos)}. '
+            f'Disponibles: {", ".join(available)}'
+        )
+    return fields
+
+
+def date_field(column, formato='%Y-%m-%d'):
+    """Formateador para un campo de fecha (None si la columna está vacía)."""
+    return lambda row: row[column].strftime(formato) if row[column] else None
+
+
+def columns_for(field_specs, fields, extra=()):
+    """Columnas de .values() necesarias para los campos pedidos (sin repetir)."""
+    columns = list(extra)
+    for field in fields:
+        for column in field_specs[field][0]:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def project_row(row, field_specs, fields):
+    """Arma el dict de salida de una fila de .values() con los campos pedidos."""
+    data = {}
+    for field in fields:
+        columns, build = field_specs[field]
+        data[field] = build(row) if build else row[columns[0]]
+    return data
@@ -0,0 +1,46 @@
+"""
+Pool local de workers para ejecutar tareas en segundo plano.
+No requiere un broker externo: las tareas corren en hilos del mismo proceso.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Retorna el pool compartido, creándolo la primera vez que se usa."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BACKGROUND_WORKERS', 2),
+                thread_name_prefix='evory-worker'
+            )
+    return _executor
+
+
+def _run(func, *args, **kwargs):
+    # Cada hilo usa su propia conexión; se cierra al terminar la tarea
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception('Error ejecutando tarea en segundo plano: %s', func.__name__)
+        raise
+    finally:
+        close_old_connections()
+
+
+def submit(func, *args, **kwargs):
+    """Encola `func(*args, **kwargs)` en el pool de workers."""
+    return get_executor().submit(_run, func, *args, **kwargs)
@@ -0,0 +1,157 @@
+"""
+Generación de reportes en segundo plano.
+
+Los endpoints de reportes encolan un TrabajoReporte y retornan su id; un
+worker del pool local genera el archivo en MEDIA_ROOT y el cliente lo
+descarga desde el endpoint de estado cuando está listo. Los trabajos y
+sus archivos se eliminan pasado REPORT_JOB_RETENTION_DAYS con
+`python manage.py purgar_reportes`.
+"""
+
+import hashlib
+import json
+import tempfile
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+
+from . import tareas
+from .reportes import build_driver_report, build_income_report, build_issues_report, build_services_report
+
+
+# Un trabajo pendiente más antiguo que esto se considera abandonado
+# (p. ej. el proceso se reinició) y no se reutiliza al deduplicar.
+STALE_JOB_MINUTES = getattr(settings, 'REPORT_JOB_STALE_MINUTES', 30)
+
+
+def _clave_trabajo(tipo, parametros):
+    contenido = json.dumps({'tipo': tipo, 'parametros': parametros}, sort_keys=True)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def encolar_reporte(tipo, parametros, user):
+    """
+    Crea un trabajo de reporte y lo envía al pool de workers.
+    `user` debe estar autenticado: el trabajo queda a su nombre y solo él
+    (o un admin) puede consultarlo y descargarlo.
+    Si el mismo usuario ya tiene un trabajo idéntico pendiente o en
+    proceso, lo retorna en lugar de crear otro.
+    Retorna (trabajo, creado).
+    """
+    from ..models.models import TrabajoReporte
+
+    clave = _clave_trabajo(tipo, parametros)
+    limite = timezone.now() - timedelta(minutes=STALE_JOB_MINUTES)
+    if user is None or not user.is_authenticated:
+        raise ValueError('Los reportes en segundo plano requieren un usuario autenticado')
+
+    with transaction.atomic():
+        existente = TrabajoReporte.objects.select_for_update().filter(
+            clave=clave,
+            solicitado_por=user,
+            estado__in=['Pendiente', 'En Proceso'],
+            fecha_creacion__gte=limite
+        ).first()
+        if existente:
+            return existente, False
+
+        trabajo = TrabajoReporte.objects.create(
+            tipo=tipo,
+            parametros=parametros,
+            clave=clave,
+            solicitado_por=user
+        )
+        transaction.on_commit(lambda: tareas.submit(ejecutar_trabajo, trabajo.id))
+
+    return trabajo, True
+
+
+def _generar(trabajo):
+    """Construye el reporte del trabajo. Retorna (writer, nombre_archivo)."""
+    from ..models.models import Compania, Conductor
+
+    params = trabajo.parametros
+
+    if trabajo.tipo == 'conductor':
+        driver = Conductor.objects.select_related('user', 'vehiculo').get(id=params['driver_id'])
+        writer = build_driver_report(driver, params['report_type'], params['start_date'], params['end_date'])
+        filename = f"reporte_{params['report_type']}_{driver.numero_documento}_{params['start_date']}_{params['end_date']}.xlsx"
+        return writer, filename
+
+    builders = {
+        'servicios': build_services_report,
+        'ingresos': build_income_report,
+        'novedades': build_issues_report,
+    }
+    compania = Compania.objects.get(id=params['company_id'])
+    fecha_inicio = datetime.strptime(params['fecha_inicio'], '%Y-%m-%d')
+    fecha_fin = datetime.strptime(params['fecha_fin'], '%Y-%m-%d')
+    writer = builders[trabajo.tipo](compania, fecha_inicio, fecha_fin)
+    filename = f"reporte_{trabajo.tipo}_{compania.nombre}_{params['fecha_inicio']}_{params['fecha_fin']}.xlsx"
+    return writer, filename
+
+
+def ejecutar_trabajo(trabajo_id):
+    """
+    Genera el archivo de un trabajo y actualiza su estado. Corre en un worker.
+    Cualquier falla deja el trabajo en 'Error': uno que quedara 'En Proceso'
+    seguiría devolviéndose al deduplicar.
+    """
+    from ..models.models import TrabajoReporte
+
+    try:
+        actualizados = TrabajoReporte.objects.filter(id=trabajo_id, estado='Pendiente').update(estado='En Proceso')
+        if not actualizados:
+            return
+        trabajo = TrabajoReporte.objects.get(id=trabajo_id)
+
+        writer, filename = _generar(trabajo)
+        with tempfile.TemporaryFile() as archivo:
+            writer.save(archivo)
+            archivo.seek(0)
+            trabajo.archivo.save(filename, File(archivo), save=False)
+        trabajo.estado = 'Completado'
+        trabajo.fecha_finalizacion = timezone.now()
+        trabajo.save(update_fields=['archivo', 'estado', 'fecha_finalizacion'])
+    except Exception as e:
+        TrabajoReporte.objects.filter(id=trabajo_id).update(
+            estado='Error',
+            mensaje_error=str(e),
+            fecha_finalizacion=timezone.now()
+        )
+
+
+def serializar_trabajo(trabajo):
+    """Representación JSON del estado de un trabajo."""
+    return {
+        'id': trabajo.id,
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado,
+        'fecha_creacion': trabajo.fecha_creacion.strftime('%Y-%m-%d %H:%M:%S'),
+        'fecha_finalizacion': trabajo.fecha_finalizacion.strftime('%Y-%m-%d %H:%M:%S') if trabajo.fecha_finalizacion else None,
+        'mensaje_error': trabajo.mensaje_error,
+        'status_url': reverse('report_job_status_api', args=[trabajo.id]),
+        'download_url': reverse('report_job_download', args=[trabajo.id]) if trabajo.estado == 'Completado' else None,
+    }
+
+
+def job_accepted_response(trabajo, creado):
+    """Respuesta 202 para un reporte encolado."""
+    return JsonResponse({
+        'success': True,
+        'message': 'Reporte en generación' if creado else 'Ya existe un reporte idéntico en generación',
+        'data': serializar_trabajo(trabajo)
+    }, status=202)
+
+
+def job_login_required_response():
+    """Respuesta 401 para una solicitud en segundo plano sin sesión."""
+    return JsonResponse({
+        'success': False,
+        'message': 'Debe iniciar sesión para generar reportes en segundo plano'
+    }, status=401)
@@ -158,7 +158,7 @@ def crear_novedades_prueba():
     for compania in companias:
         # Crear entre 3 y 8 novedades por compañía
         num_novedades = random.randint(3, 8)
-        viajes_compania = viajes.filter(cliente__compania=compania)
+        viajes_compania = viajes.filter(compania=compania)
         
         if viajes_compania.count() == 0:
             continue
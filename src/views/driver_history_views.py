@@ -5,16 +5,42 @@ from django.http import HttpResponse, JsonResponse
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from django.db.models import Q
+from django.db.models import Avg, Count, Max, Q, Subquery
+from django.utils import timezone
 from datetime import datetime, timedelta
 import csv
-import io
 import random
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from ..utils.busqueda import autocompletar_conductores, buscar_conductores
 from ..utils.decorators import admin_required, cliente_required, conductor_required, get_user_type
+from ..utils.estadisticas import obtener_estadisticas
+from ..utils.paginacion import keyset_page
+from ..utils.reportes import build_driver_report
+from ..utils.trabajos import encolar_reporte, job_accepted_response
 
-from ..models.models import Conductor
+from ..models.models import Conductor, DocumentoConductor, Novedad, Viaje
+
+# Viajes por página en el historial del conductor
+TRIPS_PAGE_SIZE = 20
+
+
+def _parse_date_range(date_start, date_end):
+    """
+    Convierte los filtros date_start/date_end (YYYY-MM-DD) en un rango
+    [desde, hasta) de datetimes con zona horaria. Valores vacíos o
+    inválidos se ignoran (None).
+    """
+    def _parse(value):
+        try:
+            return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+        except (TypeError, ValueError):
+            return None
+
+    fecha_desde = _parse(date_start)
+    fecha_hasta = _parse(date_end)
+    if fecha_hasta:
+        # La fecha final es inclusiva
+        fecha_hasta += timedelta(days=1)
+    return fecha_desde, fecha_hasta
 
 @login_required
 def detalle_conductor(request, id):
@@ -47,62 +73,41 @@ def driver_history(request):
     date_end = request.GET.get('date_end', '')
     
     if search_term:
-        # Buscar conductor por nombre, documento o placa
-        driver = Conductor.objects.filter(
-            Q(user__first_name__icontains=search_term) |
-            Q(user__last_name__icontains=search_term) |
-            Q(numero_documento__icontains=search_term) |
-            Q(vehiculo__placa__icontains=search_term)
-        ).select_related('user', 'vehiculo').first()
+        # Buscar conductor por nombre, documento o placa (índice de búsqueda)
+        driver = buscar_conductores(search_term).select_related('user', 'vehiculo').first()
         
         if driver:
-            # ========== GENERAR DATA MOCKEADA DE VIAJES ==========
-            trips = []
-            base_date = datetime.now()
+            # ========== VIAJES DEL CONDUCTOR ==========
+            # Usa el índice (conductor, -fecha_solicitud); la lista se pagina
+            # por cursor, de modo que cada página es un recorrido acotado.
+            fecha_desde, fecha_hasta = _parse_date_range(date_start, date_end)
+            viajes = Viaje.objects.filter(conductor=driver)
+            if fecha_desde:
+                viajes = viajes.filter(fecha_solicitud__gte=fecha_desde)
+            if fecha_hasta:
+                viajes = viajes.filter(fecha_solicitud__lt=fecha_hasta)
 
-            for i in range(5):  # Cambia este número para más o menos viajes
-                # Fechas aleatorias en los últimos 90 días
-                days_ago = random.randint(0, 90)
-                trip_date = base_date - timedelta(days=days_ago, hours=random.randint(6, 22))
-                
-                # Estados posibles con probabilidades realistas
-                status_weights = [('Completado', 0.85), ('Cancelado', 0.10), ('En Progreso', 0.04), ('Aceptado', 0.01)]
-                status = random.choices([s[0] for s in status_weights], weights=[s[1] for s in status_weights])[0]
-                
-                # Calificación solo para viajes completados
-                rating = random.choice([4.5, 5.0, 4.0, 4.5, 3.5, 5.0, 4.0, 4.5, 5.0, 3.0]) if status == 'Completado' and random.random() > 0.1 else None
-                
-                # Ubicaciones realistas en Bogotá
-                locations = [
-                    'Centro Internacional', 'Aeropuerto El Dorado', 'Zona Rosa', 'Parque de la 93',
-                    'Centro Andino', 'Gran Estación', 'Plaza de las Américas', 'Calle 80',
-                    'Centro Empresarial Santa Fe', 'Parque Nacional', 'Usaquén', 'Chapinero',
-                    'Salitre Plaza', 'Portal Norte', 'Calle 170', 'Centro Histórico'
-                ]
-                
-                origin = random.choice(locations)
-                destination = random.choice([loc for loc in locations if loc != origin])
-                
-                # Clientes mockeados
-                clients = [
-                    'María González', 'Carlos Rodríguez', 'Ana López', 'Juan Martínez', 
-                    'Laura Sánchez', 'Diego Pérez', 'Camila Torres', 'Andrés Ramírez',
-                    'Valentina Morales', 'Santiago Herrera', 'Isabella Castro', 'Mateo Vargas'
-                ]
-                
-                trip = {
-                    'id': f'TRP{1000 + i}',
-                    'date': trip_date,
-                    'status': status,
-                    'rating': rating,
-                    'origin': origin,
-                    'destination': destination,
-                    'client': random.choice(clients),
-                    'amount': random.randint(15000, 45000),
-                    'distance': round(random.uniform(5.0, 25.0), 1),
-                    'duration': f"{random.randint(20, 90):02d}:{random.randint(0, 59):02d}:00"
-                }
-                trips.append(trip)
+            viajes_lista = viajes.select_related('cliente__user')
+            cursor = request.GET.get('cursor') or None
+            try:
+                viajes_pagina, next_cursor = keyset_page(viajes_lista, cursor, TRIPS_PAGE_SIZE, 'fecha_solicitud')
+            except ValueError:
+                # Cursor inválido: se muestra la primera página
+                cursor = None
+                viajes_pagina, next_cursor = keyset_page(viajes_lista, None, TRIPS_PAGE_SIZE, 'fecha_solicitud')
+
+            trips = [{
+                'id': viaje.id,
+                'date': viaje.fecha_solicitud,
+                'status': viaje.estado,
+                'rating': viaje.calificacion_conductor,
+                'origin': viaje.origen,
+                'destination': viaje.destino,
+                'client': viaje.cliente.get_nombre_completo(),
+                'amount': viaje.valor_total,
+                'distance': viaje.distancia_km,
+                'duration': str(viaje.tiempo_real) if viaje.tiempo_real else ''
+            } for viaje in viajes_pagina]
 
             # ========== OBTENER HISTORIAL DE ESTADOS ==========
             try:
@@ -184,17 +189,36 @@ def driver_history(request):
                     status_history.append(change)
 
             # ========== CALCULAR ESTADÍSTICAS ==========
-            total_trips = len(trips)
-            completed_trips = len([t for t in trips if t['status'] == 'Completado'])
-            rated_trips = [t for t in trips if t['rating']]
-            avg_rating = sum(t['rating'] for t in rated_trips) / len(rated_trips) if rated_trips else 0
-            completion_rate = int((completed_trips / total_trips * 100)) if total_trips > 0 else 0
+            # Una sola consulta agregada sobre la fila del conductor (LEFT JOIN
+            # con sus viajes del rango), con el conteo de novedades como
+            # subconsulta. Así el resultado existe aunque no haya viajes.
+            en_rango = Q()
+            novedades = Novedad.objects.filter(conductor=driver)
+            if fecha_desde:
+                en_rango &= Q(viajes__fecha_solicitud__gte=fecha_desde)
+                novedades = novedades.filter(fecha_creacion__gte=fecha_desde)
+            if fecha_hasta:
+                en_rango &= Q(viajes__fecha_solicitud__lt=fecha_hasta)
+                novedades = novedades.filter(fecha_creacion__lt=fecha_hasta)
+
+            resumen = Conductor.objects.filter(pk=driver.pk).aggregate(
+                total_trips=Count('viajes', filter=en_rango),
+                completed_trips=Count('viajes', filter=en_rango & Q(viajes__estado='Completado')),
+                avg_rating=Avg('viajes__calificacion_conductor', filter=en_rango),
+                total_reports=Max(Subquery(
+                    novedades.order_by().values('conductor').annotate(total=Count('id')).values('total')
+                ))
+            )
+
+            total_trips = resumen['total_trips']
+            completion_rate = int(resumen['completed_trips'] * 100 / total_trips) if total_trips > 0 else 0
 
             stats = {
                 'total_trips': total_trips,
-                'avg_rating': round(avg_rating, 1) if avg_rating > 0 else 4.8,
+                'completed_trips': resumen['completed_trips'],
+                'avg_rating': round(resumen['avg_rating'], 1) if resumen['avg_rating'] else 0,
                 'completion_rate': completion_rate,
-                'total_reports': random.randint(0, 5)
+                'total_reports': resumen['total_reports'] or 0
             }
             
             # ========== ACTUALIZAR CONTEXTO ==========
@@ -202,6 +226,8 @@ def driver_history(request):
                 'driver': driver,
                 'stats': stats,
                 'trips': trips,
+                'cursor': cursor,
+                'next_cursor': next_cursor,
                 'status_history': status_history,
                 'search_term': search_term,
                 'active_tab': active_tab,
@@ -327,137 +353,18 @@ def generate_report(request, driver_id):
                 'message': 'La fecha de inicio debe ser anterior a la fecha final'
             }, status=400)
         
-        # Crear workbook de Excel
-        wb = Workbook()
-        ws = wb.active
-        
-        # Estilos para el encabezado
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="1E40AF", end_color="1E40AF", fill_type="solid")
-        alignment_center = Alignment(horizontal="center", vertical="center")
-        border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-        
-        # Información del reporte (primera fila)
-        ws['A1'] = f"Reporte {report_type.title()}"
-        ws['A1'].font = Font(bold=True, size=16)
-        ws.merge_cells('A1:K1')
-        
-        # Información del conductor
-        ws['A3'] = "Información del Conductor"
-        ws['A3'].font = Font(bold=True)
-        ws.merge_cells('A3:K3')
-        
-        conductor_info = [
-            ["Nombre:", driver.get_nombre_completo()],
-            ["Documento:", driver.numero_documento],
-            ["Placa:", driver.vehiculo.placa if hasattr(driver, 'vehiculo') and driver.vehiculo else 'N/A'],
-            ["Período:", f"{start_date} al {end_date}"],
-        ]
-        
-        for i, (label, value) in enumerate(conductor_info, 5):
-            ws[f'A{i}'] = label
-            ws[f'A{i}'].font = Font(bold=True)
-            ws[f'B{i}'] = value
-            ws.merge_cells(f'B{i}:K{i}')
-        
-        # Espacio en blanco
-        current_row = len(conductor_info) + 6
-        
-        if report_type in ['monthly', 'daily']:
-            # Reporte de viajes
-            ws[f'A{current_row}'] = "REPORTE DE VIAJES"
-            ws[f'A{current_row}'].font = Font(bold=True, size=14)
-            ws.merge_cells(f'A{current_row}:K{current_row}')
-            
-            # Encabezados
-            headers = [
-                "ID Conductor", "Nombre Conductor", "Placa Vehículo", "ID Cliente", 
-                "Nombre Cliente", "Lugar Recogida", "Destino", "Distancia (km)", 
-                "Tiempo Acumulado", "Fecha Inicio", "Fecha Fin"
-            ]
-            
-            header_row = current_row + 2
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=header_row, column=col)
-                cell.value = header
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = alignment_center
-                cell.border = border
-            
-            # Datos de ejemplo
-            sample_trips = [
-                [driver.id, driver.get_nombre_completo(), driver.vehiculo.placa if hasattr(driver, 'vehiculo') and driver.vehiculo else 'N/A', 
-                 "CLI001", "Juan Pérez", "Centro", "Aeropuerto", 15.5, "02:30:00", "2025-01-15 08:00", "2025-01-15 10:30"],
-                [driver.id, driver.get_nombre_completo(), driver.vehiculo.placa if hasattr(driver, 'vehiculo') and driver.vehiculo else 'N/A',
-                 "CLI002", "María González", "Mall", "Hospital", 8.2, "01:45:00", "2025-01-16 14:00", "2025-01-16 15:45"],
-                [driver.id, driver.get_nombre_completo(), driver.vehiculo.placa if hasattr(driver, 'vehiculo') and driver.vehiculo else 'N/A',
-                 "CLI003", "Carlos Rodríguez", "Estadio", "Centro", 12.8, "02:15:00", "2025-01-17 19:00", "2025-01-17 21:15"],
-            ]
-            
-            # Agregar datos
-            for row_idx, trip in enumerate(sample_trips, header_row + 1):
-                for col_idx, value in enumerate(trip, 1):
-                    cell = ws.cell(row=row_idx, column=col_idx)
-                    cell.value = value
-                    cell.border = border
-            
-            # Total de viajes
-            total_row = header_row + len(sample_trips) + 2
-            ws[f'A{total_row}'] = f"TOTAL VIAJES: {len(sample_trips)}"
-            ws[f'A{total_row}'].font = Font(bold=True)
-            ws.merge_cells(f'A{total_row}:K{total_row}')
-            
-        elif report_type == 'monetary':
-            # Reporte monetario
-            ws[f'A{current_row}'] = "REPORTE MONETARIO"
-            ws[f'A{current_row}'].font = Font(bold=True, size=14)
-            ws.merge_cells(f'A{current_row}:K{current_row}')
-            
-            # Encabezados
-            headers = ["ID Conductor", "Nombre Conductor", "Fecha Inicio", "Fecha Fin", "Valor Total Generado"]
-            
-            header_row = current_row + 2
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=header_row, column=col)
-                cell.value = header
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = alignment_center
-                cell.border = border
-            
-            # Datos de ejemplo
-            total_value = 2850000
-            
-            data_row = header_row + 1
-            ws.cell(row=data_row, column=1).value = driver.id
-            ws.cell(row=data_row, column=2).value = driver.get_nombre_completo()
-            ws.cell(row=data_row, column=3).value = start_date
-            ws.cell(row=data_row, column=4).value = end_date
-            ws.cell(row=data_row, column=5).value = f"${total_value:,.0f}"
-            
-            # Aplicar bordes
-            for col in range(1, 6):
-                ws.cell(row=data_row, column=col).border = border
-        
-        # Ajustar ancho de columnas
-        for col in range(1, 12):
-            ws.column_dimensions[chr(64 + col)].width = 15
-        
-        # Crear respuesta HTTP
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        
-        response = HttpResponse(
-            buffer.getvalue(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        if request.POST.get('async') in ('true', '1'):
+            job, created = encolar_reporte('conductor', {
+                'driver_id': driver.id,
+                'report_type': report_type,
+                'start_date': start_date,
+                'end_date': end_date
+            }, request.user)
+            return job_accepted_response(job, created)
         
+        writer = build_driver_report(driver, report_type, start_date, end_date)
         filename = f'reporte_{report_type}_{driver.numero_documento}_{start_date}_{end_date}.xlsx'
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
+        return writer.response(filename)
     
     except Exception as e:
         return JsonResponse({
@@ -500,9 +407,16 @@ def export_history(request, driver_id):
 @admin_required
 @require_http_methods(["GET"])
 def driver_statistics_api(request, driver_id):
-    """Endpoint API para obtener estadísticas del conductor"""
+    """
+    Endpoint API para obtener estadísticas del conductor.
+    Las cifras de viajes salen del resumen precalculado (EstadisticaConductor),
+    sin recorrer los viajes del conductor.
+    """
     try:
-        driver = get_object_or_404(Conductor, id=driver_id)
+        driver = get_object_or_404(
+            Conductor.objects.select_related('user', 'vehiculo', 'estadisticas'), id=driver_id
+        )
+        resumen = obtener_estadisticas(driver)
         
         statistics = {
             'conductor': {
@@ -519,10 +433,14 @@ def driver_statistics_api(request, driver_id):
                 'modelo': driver.vehiculo.modelo if hasattr(driver, 'vehiculo') and driver.vehiculo else None,
             } if hasattr(driver, 'vehiculo') and driver.vehiculo else None,
             'stats': {
-                'total_viajes': 247,
-                'calificacion_promedio': 4.8,
-                'tasa_completado': 96,
-                'total_reportes': 2,
+                'total_viajes': resumen.total_viajes,
+                'viajes_completados': resumen.viajes_completados,
+                'viajes_cancelados': resumen.viajes_cancelados,
+                'calificacion_promedio': float(resumen.calificacion_promedio) if resumen.calificacion_promedio is not None else None,
+                'tasa_completado': resumen.tasa_completado,
+                'ingresos': str(resumen.ingresos),
+                'ultimo_viaje': resumen.ultimo_viaje.strftime('%Y-%m-%d %H:%M') if resumen.ultimo_viaje else None,
+                'total_reportes': driver.novedades.count(),
             }
         }
         
@@ -537,37 +455,78 @@ def driver_statistics_api(request, driver_id):
 @admin_required
 @require_http_methods(["GET"])
 def driver_autocomplete_api(request):
-    """API para autocompletado de conductores"""
+    """
+    API para autocompletado de conductores.
+    Busca por prefijo de palabra en nombre, documento o placa usando el
+    índice de búsqueda; las coincidencias exactas de documento o placa
+    aparecen primero. Los resultados recientes se guardan en caché y se
+    reutilizan para textos más largos con el mismo prefijo.
+    """
     try:
         search_term = request.GET.get('q', '').strip()
         
         if not search_term or len(search_term) < 2:
             return JsonResponse({'results': []})
         
-        conductores = Conductor.objects.select_related('user', 'vehiculo').filter(
-            Q(user__first_name__icontains=search_term) |
-            Q(user__last_name__icontains=search_term) |
-            Q(segundo_nombre__icontains=search_term) |
-            Q(segundo_apellido__icontains=search_term) |
-            Q(numero_documento__icontains=search_term) |
-            Q(vehiculo__placa__icontains=search_term)
-        )[:10]
-        
-        results = []
-        for conductor in conductores:
-            placa = conductor.vehiculo.placa if hasattr(conductor, 'vehiculo') and conductor.vehiculo else 'Sin placa'
-            results.append({
-                'id': conductor.id,
-                'nombre_completo': conductor.get_nombre_completo(),
-                'numero_documento': conductor.numero_documento,
-                'placa': placa,
-                'estado': conductor.estado
-            })
-        
-        return JsonResponse({'results': results})
+        return JsonResponse({'results': autocompletar_conductores(search_term)})
     
     except Exception as e:
         return JsonResponse({
             'success': False,
             'message': f'Error: {str(e)}'
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+
+# Versión de cada documento que retorna driver_documents_api
+DOCUMENT_VERSIONS = ('vista_previa', 'miniatura', 'original')
+
+
+@admin_required
+@require_http_methods(["GET"])
+def driver_documents_api(request, driver_id):
+    """
+    API con los documentos del conductor para las pantallas de revisión.
+    Query params:
+    - version: vista_previa (por defecto), miniatura u original. Las
+      versiones reducidas solo existen para imágenes; si aún no se han
+      generado se entrega el original.
+    `url_original` siempre apunta al archivo subido.
+    """
+    try:
+        version = request.GET.get('version', 'vista_previa')
+        if version not in DOCUMENT_VERSIONS:
+            return JsonResponse({
+                'success': False,
+                'message': f'version no válida. Use una de: {", ".join(DOCUMENT_VERSIONS)}'
+            }, status=400)
+
+        driver = get_object_or_404(Conductor.objects.only('id'), id=driver_id)
+        documentos = DocumentoConductor.objects.filter(conductor=driver, activo=True).only(
+            'id', 'tipo_documento', 'archivo', 'nombre_original', 'tamaño_archivo',
+            'estado_derivados', 'vista_previa', 'tamaño_vista_previa', 'miniatura',
+            'tamaño_miniatura', 'fecha_subida'
+        )
+
+        data = []
+        for documento in documentos:
+            url, tamaño = documento.get_version(version)
+            data.append({
+                'id': documento.id,
+                'tipo_documento': documento.tipo_documento,
+                'tipo_documento_display': documento.get_tipo_documento_display(),
+                'nombre_original': documento.nombre_original,
+                'url': url,
+                'tamaño': tamaño,
+                'url_original': documento.archivo.url,
+                'tamaño_original': documento.tamaño_archivo,
+                'estado_derivados': documento.estado_derivados,
+                'fecha_subida': documento.fecha_subida.strftime('%Y-%m-%d %H:%M'),
+            })
+
+        return JsonResponse({'success': True, 'count': len(data), 'data': data})
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': f'Error: {str(e)}'
+        }, status=500)
@@ -0,0 +1,63 @@
+# views/report_jobs_views.py
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from ..models.models import TrabajoReporte
+from ..utils.decorators import get_user_type
+from ..utils.trabajos import serializar_trabajo
+
+
+def _trabajos_visibles(user):
+    """Trabajos que puede consultar el usuario: todos si es admin, si no solo los suyos."""
+    if get_user_type(user) == 'admin':
+        return TrabajoReporte.objects.all()
+    return TrabajoReporte.objects.filter(solicitado_por=user)
+
+
+@login_required
+@require_http_methods(["GET"])
+def report_job_status_api(request, job_id):
+    """
+    Endpoint GET para consultar el estado de un reporte en segundo plano.
+    Cuando el estado es 'Completado' incluye la URL de descarga.
+    Un trabajo de otro usuario responde 404, igual que uno inexistente.
+    """
+    try:
+        trabajo = _trabajos_visibles(request.user).get(id=job_id)
+        return JsonResponse({
+            'success': True,
+            'data': serializar_trabajo(trabajo)
+        }, status=200)
+    
+    except TrabajoReporte.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'message': 'Trabajo de reporte no encontrado'
+        }, status=404)
+
+
+@login_required
+@require_http_methods(["GET"])
+def report_job_download(request, job_id):
+    """Descarga el archivo generado por un trabajo de reporte completado."""
+    try:
+        trabajo = _trabajos_visibles(request.user).get(id=job_id)
+    except TrabajoReporte.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'message': 'Trabajo de reporte no encontrado'
+        }, status=404)
+    
+    if trabajo.estado != 'Completado' or not trabajo.archivo:
+        return JsonResponse({
+            'success': False,
+            'message': f'El reporte aún no está disponible (estado: {trabajo.estado})',
+            'data': serializar_trabajo(trabajo)
+        }, status=409)
+    
+    return FileResponse(
+        trabajo.archivo.open('rb'),
+        as_attachment=True,
+        filename=trabajo.archivo.name.rsplit('/', 1)[-1]
+    )
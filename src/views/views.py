@@ -4,7 +4,8 @@ from django.contrib.auth.models import User
 from django.http import HttpResponse, JsonResponse
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
+from django.utils.cache import patch_cache_control
 from django.db import transaction, IntegrityError
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
@@ -19,29 +20,122 @@ from django.shortcuts import render, redirect, get_object_or_404
 
 from ..models.models import Cliente, Compania, Conductor, Vehiculo, DocumentoConductor, Viaje, Novedad
 from ..utils.decorators import admin_required, cliente_required, conductor_required, get_user_type
+from ..utils.derivados import encolar_derivados, es_imagen
+from ..utils.cache_companias import companies_payload
+from ..utils.cache_reportes import cached_xlsx_response, report_cache, report_key
+from ..utils.cargas import DocumentoUploadHandler, guardar_archivos, liberar_contenidos, reservar_contenidos
+from ..utils.busqueda import filtro_companias
+from ..utils.estadisticas import obtener_estadisticas
+from ..utils.metricas import get_company_with_metrics, get_metrics_for_companies
+from ..utils.paginacion import get_limit, get_page_params, keyset_page, keyset_page_asc
+from ..utils.registro import primer_duplicado
+from ..utils.reportes import (
+    REPORT_FORMATS, build_income_report, build_issues_report, build_services_report,
+    flat_report_response, income_report_rows, issues_report_rows, services_report_rows, to_money
+)
+from ..utils.serializacion import columns_for, date_field, nombre_completo, parse_fields, project_row
+from ..utils.trabajos import encolar_reporte, job_accepted_response, job_login_required_response
+
+
+# Estados que muestra cada listado de conductores (None = todos)
+LISTADO_CONDUCTORES_ESTADOS = {
+    'activos': ('Activo',),
+    'inactivos': ('Inactivo', 'Suspendido', 'Bloqueado', 'Dado de Baja'),
+    'todos': None,
+}
+LISTADO_CONDUCTORES_TITULOS = {
+    'activos': 'Conductores Activos',
+    'inactivos': 'Conductores Inactivos',
+    'todos': 'Listado de Conductores',
+}
+LISTADO_CONDUCTORES_PAGE_SIZE = 50
 
 
 @admin_required
 @login_required
-def conductores_todos(request):
+def conductores_todos(request, filtro='todos'):
     """
-    Lista todos los conductores (sin filtros) y renderiza la plantilla.
+    Lista los conductores del filtro (activos, inactivos o todos), 50 por
+    página y del más reciente al más antiguo. Con `?parcial=1` solo se
+    renderizan las filas de la página pedida por `cursor`, para que la
+    tabla las agregue al hacer scroll.
     """
-    #  Agrega 'vehiculo' al select_related para optimizar la consulta
-    conductores = Conductor.objects.select_related('user', 'vehiculo').all()
-    return render(request, 'conductores/listado_todos.html', {'conductores': conductores})
+    estados = LISTADO_CONDUCTORES_ESTADOS[filtro]
+    conductores = Conductor.objects.select_related('user', 'vehiculo')
+    if estados:
+        # Filtra por el índice de estado
+        conductores = conductores.filter(estado__in=estados)
+
+    try:
+        desde = max(int(request.GET.get('desde', 0)), 0)
+    except ValueError:
+        desde = 0
+
+    try:
+        pagina, next_cursor = keyset_page(
+            conductores, request.GET.get('cursor'), LISTADO_CONDUCTORES_PAGE_SIZE, 'fecha_registro'
+        )
+    except ValueError:
+        # Un cursor inválido vuelve a la primera página
+        pagina, next_cursor = keyset_page(conductores, None, LISTADO_CONDUCTORES_PAGE_SIZE, 'fecha_registro')
+        desde = 0
+
+    context = {
+        'conductores': pagina,
+        'desde': desde,
+        'next_cursor': next_cursor,
+        'siguiente_desde': desde + len(pagina),
+    }
+    if request.GET.get('parcial'):
+        response = render(request, 'conductores/listado_filas.html', context)
+        # El script de la tabla lee aquí los datos de la página siguiente
+        response['X-Next-Cursor'] = next_cursor or ''
+        response['X-Next-Desde'] = str(context['siguiente_desde'])
+        return response
+
+    context.update({
+        'filtro': filtro,
+        'titulo': LISTADO_CONDUCTORES_TITULOS[filtro],
+        'total': conductores.count(),
+    })
+    return render(request, 'conductores/listado_todos.html', context)
+
+# Viajes por página en el detalle del conductor
+DETALLE_CONDUCTOR_VIAJES = 20
+
 
 @admin_required
 @login_required
 def detalle_conductor(request, id):
     """
-    Detalle simple de conductor. Mantener si lo necesitas en otras partes.
+    Detalle de un conductor con el resumen de sus viajes y los más
+    recientes, 20 por página sobre el índice (conductor, -fecha_solicitud).
+    Con `?parcial=1` solo se renderizan las filas de la página pedida por
+    `cursor` ("Cargar más").
     """
-    conductor = get_object_or_404(Conductor.objects.select_related('user', 'vehiculo'), id=id)
-    viajes = Viaje.objects.filter(conductor=conductor).select_related('cliente', 'destino')
-    return render(request, 'conductores/detalle.html', {'conductor': conductor, 'viajes': viajes})
+    conductor = get_object_or_404(Conductor.objects.select_related('user', 'vehiculo', 'estadisticas'), id=id)
+    viajes = Viaje.objects.filter(conductor=conductor).select_related('cliente__user')
+
+    try:
+        viajes_pagina, next_cursor = keyset_page(
+            viajes, request.GET.get('cursor'), DETALLE_CONDUCTOR_VIAJES, 'fecha_solicitud'
+        )
+    except ValueError:
+        # Un cursor inválido vuelve a la primera página
+        viajes_pagina, next_cursor = keyset_page(viajes, None, DETALLE_CONDUCTOR_VIAJES, 'fecha_solicitud')
 
+    context = {'viajes': viajes_pagina, 'next_cursor': next_cursor}
+    if request.GET.get('parcial'):
+        response = render(request, 'conductores/detalle_viajes_filas.html', context)
+        response['X-Next-Cursor'] = next_cursor or ''
+        return response
 
+    # El resumen sale de EstadisticaConductor (ya cargado con el conductor)
+    context.update({
+        'conductor': conductor,
+        'resumen': obtener_estadisticas(conductor),
+    })
+    return render(request, 'conductores/detalle.html', context)
 
 
 def login_view(request):
@@ -249,19 +343,26 @@ def client_registration_api(request):
         # ===================================
         # VERIFICAR USUARIO NO EXISTENTE
         # ===================================
+        # Una sola consulta para responder antes de escribir. La unicidad la
+        # garantizan las restricciones de la base (ver IntegrityError abajo).
+        from django.db.models import Q
+        
+        verificaciones = [
+            # El email también es el username; ambos son únicos en la base
+            # (auth_user_email_unico no distingue mayúsculas, ver migración 0018)
+            ('email', User.objects.filter(Q(email__iexact=email) | Q(username=email))),
+            ('numero_documento', Cliente.objects.filter(numero_documento=numero_documento)),
+        ]
+        mensajes_duplicado = {
+            'email': 'El email se encuentra registrado',
+            'numero_documento': 'El numero de documento se encuentra registrado',
+        }
         
-        # Verificar por email
-        if User.objects.filter(email=email).exists():
-            return JsonResponse({
-                'success': False,
-                'message': 'El email se encuentra registrado'
-            }, status=409)
-        
-        # Verificar por número de documento
-        if Cliente.objects.filter(numero_documento=numero_documento).exists():
+        duplicado = primer_duplicado(verificaciones)
+        if duplicado:
             return JsonResponse({
                 'success': False,
-                'message': 'El numero de documento se encuentra registrado'
+                'message': mensajes_duplicado[duplicado]
             }, status=409)
         
         # ===================================
@@ -278,26 +379,36 @@ def client_registration_api(request):
         # ===================================
         # CREAR USUARIO Y CLIENTE
         # ===================================
-        with transaction.atomic():
-            # Crear usuario de Django
-            user = User.objects.create_user(
-                username=email,  # Usamos el email como username
-                email=email,
-                password=password,
-                first_name=data['primer_nombre'].strip(),
-                last_name=data['primer_apellido'].strip()
-            )
-            
-            # Crear perfil de cliente
-            cliente = Cliente.objects.create(
-                user=user,
-                segundo_nombre=data.get('segundo_nombre', '').strip(),
-                segundo_apellido=data.get('segundo_apellido', '').strip(),
-                tipo_documento=data['tipo_documento'],
-                numero_documento=numero_documento,
-                telefono=telefono,
-                compania=compania
-            )
+        try:
+            with transaction.atomic():
+                # Crear usuario de Django
+                user = User.objects.create_user(
+                    username=email,  # Usamos el email como username
+                    email=email,
+                    password=password,
+                    first_name=data['primer_nombre'].strip(),
+                    last_name=data['primer_apellido'].strip()
+                )
+                
+                # Crear perfil de cliente
+                cliente = Cliente.objects.create(
+                    user=user,
+                    segundo_nombre=data.get('segundo_nombre', '').strip(),
+                    segundo_apellido=data.get('segundo_apellido', '').strip(),
+                    tipo_documento=data['tipo_documento'],
+                    numero_documento=numero_documento,
+                    telefono=telefono,
+                    compania=compania
+                )
+        except IntegrityError:
+            # Un registro simultáneo ocupó el email o el documento
+            duplicado = primer_duplicado(verificaciones)
+            if duplicado is None:
+                raise
+            return JsonResponse({
+                'success': False,
+                'message': mensajes_duplicado[duplicado]
+            }, status=409)
         
         return JsonResponse({
             'success': True,
@@ -328,6 +439,35 @@ def client_registration_api(request):
         }, status=500)
 
 
+# Campos disponibles en client_list_api: nombre -> (columnas, formateador)
+CLIENT_LIST_FIELDS = {
+    'id': (('id',), None),
+    'nombre_completo': (
+        ('user__first_name', 'segundo_nombre', 'user__last_name', 'segundo_apellido'),
+        lambda row: nombre_completo(
+            row['user__first_name'], row['segundo_nombre'], row['user__last_name'], row['segundo_apellido']
+        )
+    ),
+    'primer_nombre': (('user__first_name',), None),
+    'segundo_nombre': (('segundo_nombre',), None),
+    'primer_apellido': (('user__last_name',), None),
+    'segundo_apellido': (('segundo_apellido',), None),
+    'tipo_documento': (('tipo_documento',), None),
+    'numero_documento': (('numero_documento',), None),
+    'email': (('user__email',), None),
+    'telefono': (('telefono',), None),
+    'compania': (
+        ('compania_id', 'compania__nombre'),
+        lambda row: {'id': row['compania_id'], 'nombre': row['compania__nombre']}
+    ),
+    'activo': (('activo',), None),
+    'fecha_registro': (('fecha_registro',), date_field('fecha_registro', '%Y-%m-%d %H:%M:%S')),
+}
+
+# Modos del filtro de email en client_list_api
+EMAIL_MATCH_MODES = ('exact', 'prefix', 'contains')
+
+
 @admin_required
 @csrf_exempt
 @require_http_methods(["GET"])
@@ -338,28 +478,56 @@ def client_list_api(request):
     
     Query params:
     - email: filtrar por email
+    - email_match: exact, prefix (por defecto) o contains. exact y prefix
+      usan el índice de email_normalizado; contains recorre la tabla y
+      debe pedirse explícitamente
     - numero_documento: filtrar por número de documento
     - compania_id: filtrar por compañía
     - activo: filtrar por estado (true/false)
+    - fields: campos a incluir separados por coma (por defecto, todos)
+    - limit, cursor: paginación; `next_cursor` de la respuesta se envía
+      como `cursor` para obtener la página siguiente
     
     Requiere permisos de administrador (validación básica).
     """
     try:
-        # TODO: Implementar validación de permisos de administrador
-        # Por ahora permitimos la consulta
-        
         # Obtener parámetros de filtro
         email = request.GET.get('email')
+        email_match = request.GET.get('email_match', 'prefix')
         numero_documento = request.GET.get('numero_documento')
         compania_id = request.GET.get('compania_id')
         activo = request.GET.get('activo')
         
+        if email_match not in EMAIL_MATCH_MODES:
+            return JsonResponse({
+                'success': False,
+                'message': f'email_match no válido. Use uno de: {", ".join(EMAIL_MATCH_MODES)}'
+            }, status=400)
+        
+        try:
+            fields = parse_fields(request.GET.get('fields'), CLIENT_LIST_FIELDS)
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'message': str(e)
+            }, status=400)
+        
         # Iniciar queryset
-        clientes = Cliente.objects.select_related('user', 'compania').all()
+        clientes = Cliente.objects.all()
         
         # Aplicar filtros
         if email:
-            clientes = clientes.filter(user__email__icontains=email)
+            email_normalizado = email.strip().lower()
+            if email_match == 'exact':
+                clientes = clientes.filter(email_normalizado=email_normalizado)
+            elif email_match == 'prefix':
+                # Rango sobre el índice en lugar de LIKE 'prefijo%'
+                clientes = clientes.filter(
+                    email_normalizado__gte=email_normalizado,
+                    email_normalizado__lt=email_normalizado + '\uffff'
+                )
+            else:
+                clientes = clientes.filter(email_normalizado__contains=email_normalizado)
         
         if numero_documento:
             clientes = clientes.filter(numero_documento=numero_documento)
@@ -371,31 +539,28 @@ def client_list_api(request):
             activo_bool = activo.lower() == 'true'
             clientes = clientes.filter(activo=activo_bool)
         
+        total = clientes.count()
+        
+        # Página con solo las columnas necesarias (id y fecha_registro para el cursor)
+        columns = columns_for(CLIENT_LIST_FIELDS, fields, extra=('id', 'fecha_registro'))
+        try:
+            filas, next_cursor = keyset_page(
+                clientes.values(*columns), request.GET.get('cursor'), get_limit(request.GET), 'fecha_registro'
+            )
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'message': str(e)
+            }, status=400)
+        
         # Serializar datos (sin incluir contraseñas)
-        clientes_data = []
-        for cliente in clientes:
-            clientes_data.append({
-                'id': cliente.id,
-                'nombre_completo': cliente.get_nombre_completo(),
-                'primer_nombre': cliente.user.first_name,
-                'segundo_nombre': cliente.segundo_nombre,
-                'primer_apellido': cliente.user.last_name,
-                'segundo_apellido': cliente.segundo_apellido,
-                'tipo_documento': cliente.tipo_documento,
-                'numero_documento': cliente.numero_documento,
-                'email': cliente.user.email,
-                'telefono': cliente.telefono,
-                'compania': {
-                    'id': cliente.compania.id,
-                    'nombre': cliente.compania.nombre
-                },
-                'activo': cliente.activo,
-                'fecha_registro': cliente.fecha_registro.strftime('%Y-%m-%d %H:%M:%S')
-            })
+        clientes_data = [project_row(fila, CLIENT_LIST_FIELDS, fields) for fila in filas]
         
         return JsonResponse({
             'success': True,
-            'count': len(clientes_data),
+            'count': total,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None,
             'data': clientes_data
         }, status=200)
     
@@ -408,27 +573,26 @@ def client_list_api(request):
 
 @csrf_exempt
 @require_http_methods(["GET"])
+@condition(
+    etag_func=lambda request: companies_payload()[1],
+    last_modified_func=lambda request: companies_payload()[2]
+)
 def companies_list_api(request):
     """
     Endpoint GET para obtener lista de compañías activas.
     Usado para popular el select del formulario de registro.
     Acceso público para permitir registro de clientes.
+    
+    El cuerpo se sirve desde la caché del proceso y lleva ETag y
+    Last-Modified: las peticiones condicionales que coinciden reciben
+    un 304 sin cuerpo.
     """
     try:
-        companias = Compania.objects.filter(estado=True).order_by('nombre')
-        
-        companias_data = [
-            {
-                'id': c.id,
-                'nombre': c.nombre
-            }
-            for c in companias
-        ]
-        
-        return JsonResponse({
-            'success': True,
-            'data': companias_data
-        }, status=200)
+        contenido, _, _ = companies_payload()
+        response = HttpResponse(contenido, content_type='application/json')
+        # Navegadores y CDN pueden guardar la respuesta, pero deben revalidarla
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
     
     except Exception as e:
         return JsonResponse({
@@ -454,6 +618,11 @@ def driver_registration_api(request):
     - data: información adicional (opcional)
     """
     try:
+        # Los archivos se escriben por bloques en temporales y se validan
+        # mientras llegan (ver src/utils/cargas.py)
+        upload_handler = DocumentoUploadHandler(request)
+        request.upload_handlers = [upload_handler]
+        
         # Parsear datos del formulario (multipart/form-data)
         data = request.POST
         files = request.FILES
@@ -637,22 +806,28 @@ def driver_registration_api(request):
         # ===================================
         # VERIFICAR USUARIO NO EXISTENTE
         # ===================================
-        if User.objects.filter(email=email).exists():
-            return JsonResponse({
-                'success': False,
-                'message': 'El usuario se encuentra registrado'
-            }, status=409)
-        
-        if Conductor.objects.filter(numero_documento=numero_documento).exists():
-            return JsonResponse({
-                'success': False,
-                'message': 'El conductor se encuentra registrado'
-            }, status=409)
+        # Una sola consulta para responder antes de escribir. La unicidad la
+        # garantizan las restricciones de la base (ver IntegrityError abajo).
+        from django.db.models import Q
+        
+        verificaciones = [
+            # El email también es el username; ambos son únicos en la base
+            # (auth_user_email_unico no distingue mayúsculas, ver migración 0018)
+            ('email', User.objects.filter(Q(email__iexact=email) | Q(username=email))),
+            ('numero_documento', Conductor.objects.filter(numero_documento=numero_documento)),
+            ('placa', Vehiculo.objects.filter(placa=placa)),
+        ]
+        mensajes_duplicado = {
+            'email': 'El usuario se encuentra registrado',
+            'numero_documento': 'El conductor se encuentra registrado',
+            'placa': 'La placa del vehículo ya está registrada',
+        }
         
-        if Vehiculo.objects.filter(placa=placa).exists():
+        duplicado = primer_duplicado(verificaciones)
+        if duplicado:
             return JsonResponse({
                 'success': False,
-                'message': 'La placa del vehículo ya está registrada'
+                'message': mensajes_duplicado[duplicado]
             }, status=409)
         
         # ===================================
@@ -693,6 +868,13 @@ def driver_registration_api(request):
             'certificado_tecnomecanica'
         ]
         
+        if upload_handler.errores:
+            return JsonResponse({
+                'success': False,
+                'message': 'Algunos archivos no son válidos',
+                'invalid_files': upload_handler.errores
+            }, status=400)
+        
         missing_files = [file for file in required_files if file not in files]
         if missing_files:
             return JsonResponse({
@@ -701,76 +883,112 @@ def driver_registration_api(request):
                 'missing_files': missing_files
             }, status=400)
         
+        # ===================================
+        # GUARDAR ARCHIVOS (FUERA DE LA TRANSACCIÓN)
+        # ===================================
+        # Tipos de documento por campo del formulario
+        documento_types = {
+            'documento_frontal': 'documento_frontal',
+            'documento_reverso': 'documento_reverso',
+            'tarjeta_propiedad': 'tarjeta_propiedad',
+            'certificado_reconocimiento': 'certificado_reconocimiento',
+            'foto_licencia': 'foto_licencia',
+            'documento_soat': 'documento_soat',
+            'antecedentes_judiciales': 'antecedentes_judiciales',
+            'foto_vehiculo_frontal': 'foto_vehiculo_frontal',
+            'foto_vehiculo_lateral': 'foto_vehiculo_lateral',
+            'foto_vehiculo_interior': 'foto_vehiculo_interior',
+            'certificado_tecnomecanica': 'certificado_tecnomecanica'
+        }
+        
+        archivos = {campo: files[campo] for campo in documento_types if campo in files}
+        
+        # Las referencias de cada contenido se reservan y los temporales se
+        # mueven al almacenamiento por contenido antes de abrir la
+        # transacción, que así solo inserta filas. Un contenido ya guardado
+        # (p. ej. un documento reenviado) no se vuelve a escribir.
+        reservas = reservar_contenidos(archivos)
+        
         # ===================================
         # CREAR USUARIO, CONDUCTOR, VEHÍCULO Y DOCUMENTOS
         # ===================================
-        with transaction.atomic():
-            # Crear usuario de Django
-            user = User.objects.create_user(
-                username=email,
-                email=email,
-                password=password,
-                first_name=data['primer_nombre'].strip(),
-                last_name=data['primer_apellido'].strip()
-            )
-            
-            # Crear perfil de conductor
-            conductor = Conductor.objects.create(
-                user=user,
-                segundo_nombre=data.get('segundo_nombre', '').strip() or None,
-                segundo_apellido=data.get('segundo_apellido', '').strip() or None,
-                tipo_documento=data['tipo_documento'],
-                numero_documento=numero_documento,
-                fecha_nacimiento=fecha_nacimiento,
-                telefono_principal=telefono_principal,
-                telefono_secundario=telefono_secundario or None,
-                direccion=data['direccion'].strip(),
-                ciudad=data['ciudad'],
-                numero_licencia=data['numero_licencia'].strip(),
-                licencia_expedicion=licencia_expedicion,
-                licencia_vencimiento=licencia_vencimiento,
-                tipo_cuenta=data['tipo_cuenta'],
-                banco=data['banco'],
-                numero_cuenta=numero_cuenta
-            )
-            
-            # Crear vehículo
-            vehiculo = Vehiculo.objects.create(
-                conductor=conductor,
-                placa=placa,
-                marca=data['marca'].strip().upper(),
-                modelo=data['modelo'].strip(),
-                anio=anio_vehiculo,
-                color=data['color'].strip(),
-                tipo_vehiculo=data['tipo_vehiculo'].strip(),
-                num_pasajeros=int(data['num_pasajeros'])
-            )
-            
-            # Crear documentos
-            documento_types = {
-                'documento_frontal': 'documento_frontal',
-                'documento_reverso': 'documento_reverso',
-                'tarjeta_propiedad': 'tarjeta_propiedad',
-                'certificado_reconocimiento': 'certificado_reconocimiento',
-                'foto_licencia': 'foto_licencia',
-                'documento_soat': 'documento_soat',
-                'antecedentes_judiciales': 'antecedentes_judiciales',
-                'foto_vehiculo_frontal': 'foto_vehiculo_frontal',
-                'foto_vehiculo_lateral': 'foto_vehiculo_lateral',
-                'foto_vehiculo_interior': 'foto_vehiculo_interior',
-                'certificado_tecnomecanica': 'certificado_tecnomecanica'
-            }
+        try:
+            guardados = guardar_archivos(archivos)
             
-            for file_field, tipo_doc in documento_types.items():
-                if file_field in files:
-                    file = files[file_field]
-                    DocumentoConductor.objects.create(
+            with transaction.atomic():
+                # Crear usuario de Django
+                user = User.objects.create_user(
+                    username=email,
+                    email=email,
+                    password=password,
+                    first_name=data['primer_nombre'].strip(),
+                    last_name=data['primer_apellido'].strip()
+                )
+                
+                # Crear perfil de conductor
+                conductor = Conductor.objects.create(
+                    user=user,
+                    segundo_nombre=data.get('segundo_nombre', '').strip() or None,
+                    segundo_apellido=data.get('segundo_apellido', '').strip() or None,
+                    tipo_documento=data['tipo_documento'],
+                    numero_documento=numero_documento,
+                    fecha_nacimiento=fecha_nacimiento,
+                    telefono_principal=telefono_principal,
+                    telefono_secundario=telefono_secundario or None,
+                    direccion=data['direccion'].strip(),
+                    ciudad=data['ciudad'],
+                    numero_licencia=data['numero_licencia'].strip(),
+                    licencia_expedicion=licencia_expedicion,
+                    licencia_vencimiento=licencia_vencimiento,
+                    tipo_cuenta=data['tipo_cuenta'],
+                    banco=data['banco'],
+                    numero_cuenta=numero_cuenta
+                )
+                
+                # Crear vehículo
+                vehiculo = Vehiculo.objects.create(
+                    conductor=conductor,
+                    placa=placa,
+                    marca=data['marca'].strip().upper(),
+                    modelo=data['modelo'].strip(),
+                    anio=anio_vehiculo,
+                    color=data['color'].strip(),
+                    tipo_vehiculo=data['tipo_vehiculo'].strip(),
+                    num_pasajeros=int(data['num_pasajeros'])
+                )
+                
+                # Crear documentos con los archivos ya guardados
+                documentos = DocumentoConductor.objects.bulk_create([
+                    DocumentoConductor(
                         conductor=conductor,
-                        tipo_documento=tipo_doc,
-                        archivo=file,
-                        nombre_original=file.name,
-                        tamaño_archivo=file.size
+                        tipo_documento=documento_types[file_field],
+                        archivo=nombre_archivo,
+                        contenido=reservas[hash_hex][0],
+                        nombre_original=archivos[file_field].name,
+                        tamaño_archivo=archivos[file_field].size,
+                        estado_derivados='Pendiente' if es_imagen(nombre_archivo) else 'No Aplica'
                     )
+                    for file_field, (nombre_archivo, hash_hex) in guardados.items()
+                ])
+                
+                # Vista previa y miniatura de las fotos, en segundo plano
+                encolar_derivados(
+                    documento.id for documento in documentos if documento.estado_derivados == 'Pendiente'
+                )
+        except IntegrityError:
+            # Un registro simultáneo ocupó el email, el documento o la placa
+            liberar_contenidos(reservas)
+            duplicado = primer_duplicado(verificaciones)
+            if duplicado is None:
+                raise
+            return JsonResponse({
+                'success': False,
+                'message': mensajes_duplicado[duplicado]
+            }, status=409)
+        except BaseException:
+            # Los archivos que solo usaba este registro no deben quedar guardados
+            liberar_contenidos(reservas)
+            raise
         
         return JsonResponse({
             'success': True,
@@ -797,12 +1015,79 @@ def driver_registration_api(request):
         }, status=500)
 
 
+def _edad(row):
+    from datetime import date
+    today = date.today()
+    nacimiento = row['fecha_nacimiento']
+    return today.year - nacimiento.year - ((today.month, today.day) < (nacimiento.month, nacimiento.day))
+
+
+def _vehiculo(row):
+    if row['vehiculo__placa'] is None:
+        return None
+    return {
+        'placa': row['vehiculo__placa'],
+        'marca': row['vehiculo__marca'],
+        'modelo': row['vehiculo__modelo'],
+        'anio': row['vehiculo__anio'],
+        'color': row['vehiculo__color'],
+        'tipo_vehiculo': row['vehiculo__tipo_vehiculo'],
+        'num_pasajeros': row['vehiculo__num_pasajeros']
+    }
+
+
+# Campos disponibles en driver_list_api: nombre -> (columnas, formateador)
+DRIVER_LIST_FIELDS = {
+    'id': (('id',), None),
+    'nombre_completo': (
+        ('user__first_name', 'segundo_nombre', 'user__last_name', 'segundo_apellido'),
+        lambda row: nombre_completo(
+            row['user__first_name'], row['segundo_nombre'], row['user__last_name'], row['segundo_apellido']
+        )
+    ),
+    'primer_nombre': (('user__first_name',), None),
+    'segundo_nombre': (('segundo_nombre',), None),
+    'primer_apellido': (('user__last_name',), None),
+    'segundo_apellido': (('segundo_apellido',), None),
+    'tipo_documento': (('tipo_documento',), None),
+    'numero_documento': (('numero_documento',), None),
+    'fecha_nacimiento': (('fecha_nacimiento',), date_field('fecha_nacimiento')),
+    'edad': (('fecha_nacimiento',), _edad),
+    'email': (('user__email',), None),
+    'telefono_principal': (('telefono_principal',), None),
+    'telefono_secundario': (('telefono_secundario',), None),
+    'direccion': (('direccion',), None),
+    'ciudad': (('ciudad',), None),
+    'numero_licencia': (('numero_licencia',), None),
+    'licencia_expedicion': (('licencia_expedicion',), date_field('licencia_expedicion')),
+    'licencia_vencimiento': (('licencia_vencimiento',), date_field('licencia_vencimiento')),
+    'tipo_cuenta': (('tipo_cuenta',), None),
+    'banco': (('banco',), None),
+    'numero_cuenta': (('numero_cuenta',), None),
+    'estado': (('estado',), None),
+    'vehiculo': (
+        ('vehiculo__placa', 'vehiculo__marca', 'vehiculo__modelo', 'vehiculo__anio',
+         'vehiculo__color', 'vehiculo__tipo_vehiculo', 'vehiculo__num_pasajeros'),
+        _vehiculo
+    ),
+    'activo': (('activo',), None),
+    'fecha_registro': (('fecha_registro',), date_field('fecha_registro', '%Y-%m-%d %H:%M:%S')),
+}
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def driver_list_api(request):
     """
     Endpoint GET para consultar conductores.
     Permite filtrar por: email, numero_documento, estado, placa
+    Query params adicionales:
+    - fields: campos a incluir separados por coma (por defecto, todos)
+    - limit, cursor: paginación; `next_cursor` de la respuesta se envía
+      como `cursor` para obtener la página siguiente
+    
+    Solo se consultan las columnas de los campos pedidos (.values()) y el
+    total sale de un COUNT aparte sobre los mismos filtros.
     """
     try:
         # Obtener parámetros de filtro
@@ -812,8 +1097,16 @@ def driver_list_api(request):
         placa = request.GET.get('placa')
         activo = request.GET.get('activo')
         
+        try:
+            fields = parse_fields(request.GET.get('fields'), DRIVER_LIST_FIELDS)
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'message': str(e)
+            }, status=400)
+        
         # Iniciar queryset
-        conductores = Conductor.objects.select_related('user', 'vehiculo').all()
+        conductores = Conductor.objects.all()
         
         # Aplicar filtros
         if email:
@@ -832,52 +1125,27 @@ def driver_list_api(request):
             activo_bool = activo.lower() == 'true'
             conductores = conductores.filter(activo=activo_bool)
         
-        # Serializar datos
-        conductores_data = []
-        for conductor in conductores:
-            vehiculo_data = None
-            if hasattr(conductor, 'vehiculo'):
-                vehiculo_data = {
-                    'placa': conductor.vehiculo.placa,
-                    'marca': conductor.vehiculo.marca,
-                    'modelo': conductor.vehiculo.modelo,
-                    'anio': conductor.vehiculo.anio,
-                    'color': conductor.vehiculo.color,
-                    'tipo_vehiculo': conductor.vehiculo.tipo_vehiculo,
-                    'num_pasajeros': conductor.vehiculo.num_pasajeros
-                }
-            
-            conductores_data.append({
-                'id': conductor.id,
-                'nombre_completo': conductor.get_nombre_completo(),
-                'primer_nombre': conductor.user.first_name,
-                'segundo_nombre': conductor.segundo_nombre,
-                'primer_apellido': conductor.user.last_name,
-                'segundo_apellido': conductor.segundo_apellido,
-                'tipo_documento': conductor.tipo_documento,
-                'numero_documento': conductor.numero_documento,
-                'fecha_nacimiento': conductor.fecha_nacimiento.strftime('%Y-%m-%d'),
-                'edad': conductor.get_edad(),
-                'email': conductor.user.email,
-                'telefono_principal': conductor.telefono_principal,
-                'telefono_secundario': conductor.telefono_secundario,
-                'direccion': conductor.direccion,
-                'ciudad': conductor.ciudad,
-                'numero_licencia': conductor.numero_licencia,
-                'licencia_expedicion': conductor.licencia_expedicion.strftime('%Y-%m-%d'),
-                'licencia_vencimiento': conductor.licencia_vencimiento.strftime('%Y-%m-%d'),
-                'tipo_cuenta': conductor.tipo_cuenta,
-                'banco': conductor.banco,
-                'numero_cuenta': conductor.numero_cuenta,
-                'estado': conductor.estado,
-                'vehiculo': vehiculo_data,
-                'activo': conductor.activo,
-                'fecha_registro': conductor.fecha_registro.strftime('%Y-%m-%d %H:%M:%S')
-            })
+        total = conductores.count()
+        
+        # Página con solo las columnas necesarias (id y fecha_registro para el cursor)
+        columns = columns_for(DRIVER_LIST_FIELDS, fields, extra=('id', 'fecha_registro'))
+        try:
+            filas, next_cursor = keyset_page(
+                conductores.values(*columns), request.GET.get('cursor'), get_limit(request.GET), 'fecha_registro'
+            )
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'message': str(e)
+            }, status=400)
+        
+        conductores_data = [project_row(fila, DRIVER_LIST_FIELDS, fields) for fila in filas]
         
         return JsonResponse({
             'success': True,
-            'count': len(conductores_data),
+            'count': total,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None,
             'data': conductores_data
         }, status=200)
     
@@ -916,45 +1184,85 @@ def company_detail(request, company_id):
         return redirect('inicio')
 
 
+# Un NIT se escribe con dígitos y, opcionalmente, guion o puntos
+NIT_PATTERN = re.compile(r'^[0-9][0-9.\-]*$')
+COMPANY_SEARCH_PAGE_SIZE = 20
+COMPANY_SEARCH_MAX_PAGE_SIZE = 100
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def company_search_api(request):
     """
     Endpoint GET para buscar compañías.
     Query params:
-    - q: término de búsqueda (nombre, NIT, razón social)
+    - q: término de búsqueda. Cada palabra debe ser prefijo de alguna palabra
+      del nombre o la razón social (sin tildes ni mayúsculas); si parece un
+      NIT, primero se intenta la coincidencia exacta y luego el prefijo del NIT
     - estado: filtrar por estado de cuenta
+    - limit, cursor: paginación en orden alfabético; `next_cursor` de la
+      respuesta se envía como `cursor` para obtener la página siguiente
+    - incluir_metricas: true para agregar las métricas (cacheadas) de cada compañía
+    
+    `count` es la cantidad de resultados de la página.
     """
     try:
+        from django.db.models import Q
+        
         query = request.GET.get('q', '').strip()
         estado = request.GET.get('estado')
+        cursor = request.GET.get('cursor')
+        limit = get_limit(request.GET, COMPANY_SEARCH_PAGE_SIZE, COMPANY_SEARCH_MAX_PAGE_SIZE)
+        incluir_metricas = request.GET.get('incluir_metricas', '').lower() == 'true'
         
         companias = Compania.objects.filter(estado=True)
-        
-        if query:
-            from django.db.models import Q
-            companias = companias.filter(
-                Q(nombre__icontains=query) |
-                Q(nit__icontains=query) |
-                Q(razon_social__icontains=query)
-            )
-        
         if estado:
             companias = companias.filter(estado_cuenta=estado)
         
+        columns = ('id', 'nombre', 'razon_social', 'nit', 'estado_cuenta', 'nombre_normalizado')
+        es_nit = bool(NIT_PATTERN.match(query))
+        
+        filas = None
+        next_cursor = None
+        if es_nit and not cursor:
+            # Camino rápido: NIT exacto por el índice único
+            filas = list(companias.filter(nit=query).values(*columns)[:1])
+        
+        if not filas:
+            if query:
+                filtro = filtro_companias(query) or Q()
+                if es_nit:
+                    filtro |= Q(nit__gte=query, nit__lt=query + '\uffff')
+                companias = companias.filter(filtro)
+            
+            try:
+                filas, next_cursor = keyset_page_asc(companias.values(*columns), cursor, limit, 'nombre_normalizado')
+            except ValueError as e:
+                return JsonResponse({
+                    'success': False,
+                    'message': str(e)
+                }, status=400)
+        
+        metricas = get_metrics_for_companies([fila['id'] for fila in filas]) if incluir_metricas else {}
+        
         companias_data = []
-        for c in companias:
-            companias_data.append({
-                'id': c.id,
-                'nombre': c.nombre,
-                'razon_social': c.razon_social,
-                'nit': c.nit,
-                'estado_cuenta': c.estado_cuenta,
-            })
+        for fila in filas:
+            compania = {
+                'id': fila['id'],
+                'nombre': fila['nombre'],
+                'razon_social': fila['razon_social'],
+                'nit': fila['nit'],
+                'estado_cuenta': fila['estado_cuenta'],
+            }
+            if incluir_metricas:
+                compania['metricas'] = metricas.get(fila['id'])
+            companias_data.append(compania)
         
         return JsonResponse({
             'success': True,
             'count': len(companias_data),
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None,
             'data': companias_data
         }, status=200)
     
@@ -971,43 +1279,10 @@ def company_detail_api(request, company_id):
     """
     Endpoint GET para obtener detalle completo de una compañía con métricas.
     Incluye: información básica, métricas de servicios, empleados activos, etc.
+    Las métricas salen de una sola consulta agregada (o de la caché).
     """
     try:
-        compania = Compania.objects.get(id=company_id)
-        
-        # Calcular métricas
-        from datetime import datetime, timedelta
-        from django.db.models import Count, Sum, Q
-        
-        # Total de clientes activos
-        clientes_activos = Cliente.objects.filter(compania=compania, activo=True).count()
-        
-        # Servicios del mes actual
-        hoy = datetime.now()
-        primer_dia_mes = hoy.replace(day=1)
-        servicios_mes = Viaje.objects.filter(
-            cliente__compania=compania,
-            fecha_solicitud__gte=primer_dia_mes
-        ).count()
-        
-        # Total de servicios realizados (TODOS los viajes, no solo completados)
-        servicios_realizados = Viaje.objects.filter(
-            cliente__compania=compania
-        ).count()
-        
-        # Calcular porcentaje del mes actual vs mes anterior
-        mes_anterior_inicio = (primer_dia_mes - timedelta(days=1)).replace(day=1)
-        servicios_mes_anterior = Viaje.objects.filter(
-            cliente__compania=compania,
-            fecha_solicitud__gte=mes_anterior_inicio,
-            fecha_solicitud__lt=primer_dia_mes
-        ).count()
-        
-        porcentaje_mes = 0
-        if servicios_mes_anterior > 0:
-            porcentaje_mes = ((servicios_mes - servicios_mes_anterior) / servicios_mes_anterior) * 100
-        elif servicios_mes > 0:
-            porcentaje_mes = 100
+        compania, metricas = get_company_with_metrics(company_id)
         
         compania_data = {
             'id': compania.id,
@@ -1022,12 +1297,7 @@ def company_detail_api(request, company_id):
             'estado_cuenta': compania.estado_cuenta,
             'estado': compania.estado,
             # Métricas
-            'metricas': {
-                'servicios_realizados': servicios_realizados,
-                'empleados_activos': clientes_activos,
-                'servicios_mes': servicios_mes,
-                'porcentaje_mes': round(porcentaje_mes, 1)
-            }
+            'metricas': metricas
         }
         
         return JsonResponse({
@@ -1054,33 +1324,42 @@ def company_clients_api(request, company_id):
     """
     Endpoint GET para obtener clientes asociados a una compañía.
     Incluye: nombre, ID, cargo, total viajes, calificación promedio, último viaje, estado.
+    Query params: page, page_size.
+    
+    Los totales por cliente se calculan con annotate() y los datos del último
+    viaje con subconsultas, de modo que el número de consultas es constante
+    sin importar cuántos clientes tenga la compañía.
     """
     try:
+        from django.db.models import Avg, Count, Max, OuterRef, Subquery
+        
         compania = Compania.objects.get(id=company_id)
-        clientes = Cliente.objects.filter(compania=compania).select_related('user')
+        page, page_size, offset = get_page_params(request.GET)
+        
+        clientes = Cliente.objects.filter(compania=compania)
+        total_clientes = clientes.count()
+        
+        # Último viaje de cada cliente (índice cliente, -fecha_solicitud)
+        ultimo_viaje = Viaje.objects.filter(cliente=OuterRef('pk')).order_by('-fecha_solicitud', '-id')
         
-        from django.db.models import Count, Avg, Max
+        clientes = clientes.select_related('user').annotate(
+            total_viajes=Count('viajes'),
+            calificacion_promedio=Avg('viajes__calificacion_cliente'),
+            ultimo_viaje_fecha=Max('viajes__fecha_solicitud'),
+            ultimo_viaje_origen=Subquery(ultimo_viaje.values('origen')[:1]),
+            ultimo_viaje_destino=Subquery(ultimo_viaje.values('destino')[:1]),
+            ultimo_viaje_estado=Subquery(ultimo_viaje.values('estado')[:1])
+        ).order_by('-fecha_registro', '-id')[offset:offset + page_size]
         
         clientes_data = []
         for cliente in clientes:
-            # Calcular total de viajes
-            total_viajes = Viaje.objects.filter(cliente=cliente).count()
-            
-            # Calcular calificación promedio del cliente
-            calificacion_promedio = Viaje.objects.filter(
-                cliente=cliente,
-                calificacion_cliente__isnull=False
-            ).aggregate(Avg('calificacion_cliente'))['calificacion_cliente__avg']
-            
-            # Obtener último viaje
-            ultimo_viaje = Viaje.objects.filter(cliente=cliente).order_by('-fecha_solicitud').first()
             ultimo_viaje_data = None
-            if ultimo_viaje:
+            if cliente.ultimo_viaje_fecha:
                 ultimo_viaje_data = {
-                    'fecha': ultimo_viaje.fecha_solicitud.strftime('%Y-%m-%d %H:%M'),
-                    'origen': ultimo_viaje.origen,
-                    'destino': ultimo_viaje.destino,
-                    'estado': ultimo_viaje.estado
+                    'fecha': cliente.ultimo_viaje_fecha.strftime('%Y-%m-%d %H:%M'),
+                    'origen': cliente.ultimo_viaje_origen,
+                    'destino': cliente.ultimo_viaje_destino,
+                    'estado': cliente.ultimo_viaje_estado
                 }
             
             clientes_data.append({
@@ -1090,8 +1369,8 @@ def company_clients_api(request, company_id):
                 'numero_documento': cliente.numero_documento,
                 'email': cliente.user.email,
                 'telefono': cliente.telefono,
-                'total_viajes': total_viajes,
-                'calificacion_promedio': round(calificacion_promedio, 1) if calificacion_promedio else 0,
+                'total_viajes': cliente.total_viajes,
+                'calificacion_promedio': round(cliente.calificacion_promedio, 1) if cliente.calificacion_promedio else 0,
                 'ultimo_viaje': ultimo_viaje_data,
                 'activo': cliente.activo,
                 'fecha_registro': cliente.fecha_registro.strftime('%Y-%m-%d')
@@ -1099,7 +1378,10 @@ def company_clients_api(request, company_id):
         
         return JsonResponse({
             'success': True,
-            'count': len(clientes_data),
+            'count': total_clientes,
+            'page': page,
+            'page_size': page_size,
+            'has_next': offset + len(clientes_data) < total_clientes,
             'data': clientes_data
         }, status=200)
     
@@ -1177,18 +1459,24 @@ def generate_services_report_api(request):
     - fecha_inicio: fecha de inicio (YYYY-MM-DD)
     - fecha_fin: fecha de fin (YYYY-MM-DD)
     - export: true para exportar a Excel, false para solo JSON
+    - format: json (por defecto), xlsx, csv o ndjson
+    - async: true para generar el Excel en segundo plano (retorna id del trabajo)
+    - limit, cursor: paginación de la respuesta JSON; `next_cursor` de la
+      respuesta se envía como `cursor` para obtener la página siguiente
+    
+    La exportación a Excel usa un workbook write-only y se envía por bloques,
+    por lo que el consumo de memoria no crece con el número de viajes.
+    La respuesta JSON se pagina por cursor sobre (fecha_solicitud, id), de modo
+    que cada página es un recorrido acotado del índice de fecha_solicitud.
     """
     try:
         from datetime import datetime
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, Alignment, PatternFill
-        from django.http import HttpResponse
         
         data = json.loads(request.body)
         company_id = data.get('company_id')
         fecha_inicio_str = data.get('fecha_inicio')
         fecha_fin_str = data.get('fecha_fin')
-        export = data.get('export', False)
+        formato = data.get('format') or ('xlsx' if data.get('export', False) else 'json')
         
         if not all([company_id, fecha_inicio_str, fecha_fin_str]):
             return JsonResponse({
@@ -1196,19 +1484,72 @@ def generate_services_report_api(request):
                 'message': 'Faltan campos obligatorios'
             }, status=400)
         
+        if formato not in REPORT_FORMATS:
+            return JsonResponse({
+                'success': False,
+                'message': f'Formato no válido. Use uno de: {", ".join(REPORT_FORMATS)}'
+            }, status=400)
+        
         compania = Compania.objects.get(id=company_id)
         fecha_inicio = datetime.strptime(fecha_inicio_str, '%Y-%m-%d')
         fecha_fin = datetime.strptime(fecha_fin_str, '%Y-%m-%d')
+        # Texto normalizado para parámetros de trabajos y nombres de archivo
+        fecha_inicio_str = fecha_inicio.strftime('%Y-%m-%d')
+        fecha_fin_str = fecha_fin.strftime('%Y-%m-%d')
         
         # Consultar viajes en el rango de fechas
         viajes = Viaje.objects.filter(
-            cliente__compania=compania,
+            compania=compania,
             fecha_solicitud__gte=fecha_inicio,
             fecha_solicitud__lte=fecha_fin
         ).select_related('cliente__user', 'conductor__user', 'cliente__compania')
         
+        # Generación en segundo plano: retorna el id del trabajo, que queda
+        # a nombre del usuario (un trabajo anónimo no podría consultarse)
+        if data.get('async'):
+            if not request.user.is_authenticated:
+                return job_login_required_response()
+            job, created = encolar_reporte('servicios', {
+                'company_id': compania.id,
+                'fecha_inicio': fecha_inicio_str,
+                'fecha_fin': fecha_fin_str
+            }, request.user)
+            return job_accepted_response(job, created)
+        
+        # CSV / NDJSON: filas en streaming directamente desde values_list()
+        if formato in ('csv', 'ndjson'):
+            columns, rows = services_report_rows(compania, fecha_inicio, fecha_fin)
+            return flat_report_response(
+                formato, columns, rows,
+                f'reporte_servicios_{compania.nombre}_{fecha_inicio_str}_{fecha_fin_str}'
+            )
+        
+        # Si se solicita exportación a Excel
+        if formato == 'xlsx':
+            return cached_xlsx_response(
+                report_key('servicios', compania.id, fecha_inicio, fecha_fin, 'xlsx'),
+                f'reporte_servicios_{compania.nombre}_{fecha_inicio_str}_{fecha_fin_str}.xlsx',
+                lambda: build_services_report(compania, fecha_inicio, fecha_fin)
+            )
+        
+        # Respuesta JSON paginada (desde caché si la misma página ya se generó)
+        cursor = data.get('cursor') or None
+        limit = get_limit(data)
+        cache_key = report_key('servicios', compania.id, fecha_inicio, fecha_fin, f'json:{cursor}:{limit}')
+        cached = report_cache.get(cache_key)
+        if cached is not None:
+            return JsonResponse(cached, status=200)
+        
+        try:
+            viajes_pagina, next_cursor = keyset_page(viajes, cursor, limit, 'fecha_solicitud')
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'message': str(e)
+            }, status=400)
+        
         reportes_data = []
-        for viaje in viajes:
+        for viaje in viajes_pagina:
             reportes_data.append({
                 'id_cliente': viaje.cliente.id,
                 'nombre_cliente': viaje.cliente.get_nombre_completo(),
@@ -1223,70 +1564,16 @@ def generate_services_report_api(request):
                 'valor_total': str(viaje.valor_total)
             })
         
-        # Si se solicita exportación a Excel
-        if export:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Reporte de Servicios"
-            
-            # Estilo para encabezados
-            header_fill = PatternFill(start_color="0066CC", end_color="0066CC", fill_type="solid")
-            header_font = Font(bold=True, color="FFFFFF")
-            
-            # Encabezados
-            headers = ['ID Cliente', 'Nombre Cliente', 'Empresa', 'ID Empresa', 'Fecha', 
-                      'ID Conductor', 'Nombre Conductor', 'Origen', 'Destino', 'Estado', 'Valor Total']
-            ws.append(headers)
-            
-            # Aplicar estilo a encabezados
-            for cell in ws[1]:
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Datos
-            for reporte in reportes_data:
-                ws.append([
-                    reporte['id_cliente'],
-                    reporte['nombre_cliente'],
-                    reporte['nombre_empresa'],
-                    reporte['id_empresa'],
-                    reporte['fecha'],
-                    reporte['id_conductor'],
-                    reporte['nombre_conductor'],
-                    reporte['origen'],
-                    reporte['destino'],
-                    reporte['estado'],
-                    reporte['valor_total']
-                ])
-            
-            # Ajustar ancho de columnas
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(cell.value)
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-            
-            # Preparar respuesta de descarga
-            response = HttpResponse(
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            response['Content-Disposition'] = f'attachment; filename=reporte_servicios_{compania.nombre}_{fecha_inicio_str}_{fecha_fin_str}.xlsx'
-            wb.save(response)
-            return response
-        
-        # Respuesta JSON
-        return JsonResponse({
+        response_data = {
             'success': True,
             'count': len(reportes_data),
+            'limit': limit,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None,
             'data': reportes_data
-        }, status=200)
+        }
+        report_cache.set(cache_key, response_data)
+        return JsonResponse(response_data, status=200)
     
     except Compania.DoesNotExist:
         return JsonResponse({
@@ -1311,19 +1598,25 @@ def generate_income_report_api(request):
     - fecha_inicio: fecha de inicio (YYYY-MM-DD)
     - fecha_fin: fecha de fin (YYYY-MM-DD)
     - export: true para exportar a Excel
+    - format: json (por defecto), xlsx, csv o ndjson
+    - async: true para generar el Excel en segundo plano (retorna id del trabajo)
+    - detalle: true para incluir el listado de viajes (paginado)
+    - page, page_size: paginación del detalle
+    
+    Los totales se calculan en la base de datos (Sum/Count), con desglose
+    por método de pago y por día, sin cargar los viajes en memoria.
     """
     try:
         from datetime import datetime
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, Alignment, PatternFill, numbers
-        from django.http import HttpResponse
-        from django.db.models import Sum
+        from django.db.models import Count, Sum
+        from django.db.models.functions import TruncDate
         
         data = json.loads(request.body)
         company_id = data.get('company_id')
         fecha_inicio_str = data.get('fecha_inicio')
         fecha_fin_str = data.get('fecha_fin')
-        export = data.get('export', False)
+        formato = data.get('format') or ('xlsx' if data.get('export', False) else 'json')
+        detalle = data.get('detalle', False)
         
         if not all([company_id, fecha_inicio_str, fecha_fin_str]):
             return JsonResponse({
@@ -1331,111 +1624,125 @@ def generate_income_report_api(request):
                 'message': 'Faltan campos obligatorios'
             }, status=400)
         
+        if formato not in REPORT_FORMATS:
+            return JsonResponse({
+                'success': False,
+                'message': f'Formato no válido. Use uno de: {", ".join(REPORT_FORMATS)}'
+            }, status=400)
+        
         compania = Compania.objects.get(id=company_id)
         fecha_inicio = datetime.strptime(fecha_inicio_str, '%Y-%m-%d')
         fecha_fin = datetime.strptime(fecha_fin_str, '%Y-%m-%d')
+        # Texto normalizado para parámetros de trabajos y nombres de archivo
+        fecha_inicio_str = fecha_inicio.strftime('%Y-%m-%d')
+        fecha_fin_str = fecha_fin.strftime('%Y-%m-%d')
         
         # Consultar viajes completados en el rango de fechas
         viajes = Viaje.objects.filter(
-            cliente__compania=compania,
+            compania=compania,
             fecha_solicitud__gte=fecha_inicio,
             fecha_solicitud__lte=fecha_fin,
             estado='Completado'
-        ).select_related('cliente__compania')
-        
-        reportes_data = []
-        total_ingresos = 0
-        
-        for viaje in viajes:
-            monto = float(viaje.valor_total)
-            total_ingresos += monto
-            
-            reportes_data.append({
-                'id_viaje': viaje.id,
-                'fecha': viaje.fecha_solicitud.strftime('%Y-%m-%d %H:%M'),
-                'id_empresa': viaje.cliente.compania.id,
-                'nombre_empresa': viaje.cliente.compania.nombre,
-                'monto': monto,
-                'metodo_pago': viaje.metodo_pago,
-                'origen': viaje.origen,
-                'destino': viaje.destino
-            })
+        )
+        
+        # Generación en segundo plano: retorna el id del trabajo, que queda
+        # a nombre del usuario (un trabajo anónimo no podría consultarse)
+        if data.get('async'):
+            if not request.user.is_authenticated:
+                return job_login_required_response()
+            job, created = encolar_reporte('ingresos', {
+                'company_id': compania.id,
+                'fecha_inicio': fecha_inicio_str,
+                'fecha_fin': fecha_fin_str
+            }, request.user)
+            return job_accepted_response(job, created)
+        
+        # CSV / NDJSON: filas en streaming directamente desde values_list()
+        if formato in ('csv', 'ndjson'):
+            columns, rows = income_report_rows(compania, fecha_inicio, fecha_fin)
+            return flat_report_response(
+                formato, columns, rows,
+                f'reporte_ingresos_{compania.nombre}_{fecha_inicio_str}_{fecha_fin_str}'
+            )
         
         # Si se solicita exportación a Excel
-        if export:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Reporte de Ingresos"
-            
-            # Estilo para encabezados
-            header_fill = PatternFill(start_color="00AA00", end_color="00AA00", fill_type="solid")
-            header_font = Font(bold=True, color="FFFFFF")
-            
-            # Título
-            ws.merge_cells('A1:H1')
-            title_cell = ws['A1']
-            title_cell.value = f"REPORTE DE INGRESOS - {compania.nombre}"
-            title_cell.font = Font(bold=True, size=14)
-            title_cell.alignment = Alignment(horizontal='center')
-            
-            # Encabezados
-            ws.append([])
-            headers = ['ID Viaje', 'Fecha', 'ID Empresa', 'Nombre Empresa', 'Monto', 'Método de Pago', 'Origen', 'Destino']
-            ws.append(headers)
-            
-            # Aplicar estilo a encabezados
-            for cell in ws[3]:
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Datos
-            for reporte in reportes_data:
-                ws.append([
-                    reporte['id_viaje'],
-                    reporte['fecha'],
-                    reporte['id_empresa'],
-                    reporte['nombre_empresa'],
-                    reporte['monto'],
-                    reporte['metodo_pago'],
-                    reporte['origen'],
-                    reporte['destino']
-                ])
-            
-            # Fila de total
-            ws.append([])
-            total_row = ws.max_row + 1
-            ws[f'D{total_row}'] = 'TOTAL INGRESOS:'
-            ws[f'D{total_row}'].font = Font(bold=True)
-            ws[f'E{total_row}'] = total_ingresos
-            ws[f'E{total_row}'].font = Font(bold=True, color="00AA00")
-            ws[f'E{total_row}'].number_format = numbers.FORMAT_CURRENCY_USD_SIMPLE
-            
-            # Ajustar ancho de columnas
-            ws.column_dimensions['A'].width = 10
-            ws.column_dimensions['B'].width = 18
-            ws.column_dimensions['C'].width = 12
-            ws.column_dimensions['D'].width = 30
-            ws.column_dimensions['E'].width = 15
-            ws.column_dimensions['F'].width = 18
-            ws.column_dimensions['G'].width = 25
-            ws.column_dimensions['H'].width = 25
-            
-            # Preparar respuesta de descarga
-            response = HttpResponse(
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        if formato == 'xlsx':
+            return cached_xlsx_response(
+                report_key('ingresos', compania.id, fecha_inicio, fecha_fin, 'xlsx'),
+                f'reporte_ingresos_{compania.nombre}_{fecha_inicio_str}_{fecha_fin_str}.xlsx',
+                lambda: build_income_report(compania, fecha_inicio, fecha_fin)
             )
-            response['Content-Disposition'] = f'attachment; filename=reporte_ingresos_{compania.nombre}_{fecha_inicio_str}_{fecha_fin_str}.xlsx'
-            wb.save(response)
-            return response
         
-        # Respuesta JSON
-        return JsonResponse({
+        # Respuesta JSON (desde caché si el mismo reporte ya se generó)
+        page, page_size, offset = get_page_params(data)
+        cache_format = f'json:detalle:{page}:{page_size}' if detalle else 'json'
+        cache_key = report_key('ingresos', compania.id, fecha_inicio, fecha_fin, cache_format)
+        cached = report_cache.get(cache_key)
+        if cached is not None:
+            return JsonResponse(cached, status=200)
+        
+        # Totales calculados en SQL
+        totales = viajes.aggregate(total=Sum('valor_total'), count=Count('id'))
+        total_ingresos = to_money(totales['total'])
+        
+        # Desglose por método de pago y por día
+        por_metodo_pago = [
+            {
+                'metodo_pago': fila['metodo_pago'],
+                'total': str(to_money(fila['total'])),
+                'count': fila['count']
+            }
+            for fila in viajes.order_by().values('metodo_pago').annotate(
+                total=Sum('valor_total'), count=Count('id')
+            ).order_by('metodo_pago')
+        ]
+        
+        por_dia = [
+            {
+                'fecha': fila['dia'].strftime('%Y-%m-%d'),
+                'total': str(to_money(fila['total'])),
+                'count': fila['count']
+            }
+            for fila in viajes.order_by().annotate(dia=TruncDate('fecha_solicitud')).values('dia').annotate(
+                total=Sum('valor_total'), count=Count('id')
+            ).order_by('dia')
+        ]
+        
+        response_data = {
             'success': True,
-            'count': len(reportes_data),
-            'total_ingresos': total_ingresos,
-            'data': reportes_data
-        }, status=200)
+            'count': totales['count'],
+            'total_ingresos': str(total_ingresos),
+            'por_metodo_pago': por_metodo_pago,
+            'por_dia': por_dia
+        }
+        
+        # Detalle de viajes (opcional y paginado)
+        if detalle:
+            detalle_viajes = viajes.values_list(
+                'id', 'fecha_solicitud', 'valor_total', 'metodo_pago', 'origen', 'destino'
+            ).order_by('-fecha_solicitud', '-id')[offset:offset + page_size]
+            
+            response_data.update({
+                'page': page,
+                'page_size': page_size,
+                'has_next': offset + page_size < totales['count'],
+                'data': [
+                    {
+                        'id_viaje': id_viaje,
+                        'fecha': fecha.strftime('%Y-%m-%d %H:%M'),
+                        'id_empresa': compania.id,
+                        'nombre_empresa': compania.nombre,
+                        'monto': str(monto),
+                        'metodo_pago': metodo_pago,
+                        'origen': origen,
+                        'destino': destino
+                    }
+                    for id_viaje, fecha, monto, metodo_pago, origen, destino in detalle_viajes
+                ]
+            })
+        
+        report_cache.set(cache_key, response_data)
+        return JsonResponse(response_data, status=200)
     
     except Compania.DoesNotExist:
         return JsonResponse({
@@ -1460,18 +1767,17 @@ def generate_issues_report_api(request):
     - fecha_inicio: fecha de inicio (YYYY-MM-DD)
     - fecha_fin: fecha de fin (YYYY-MM-DD)
     - export: true para exportar a Excel
+    - format: json (por defecto), xlsx, csv o ndjson
+    - async: true para generar el Excel en segundo plano (retorna id del trabajo)
     """
     try:
         from datetime import datetime
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, Alignment, PatternFill
-        from django.http import HttpResponse
         
         data = json.loads(request.body)
         company_id = data.get('company_id')
         fecha_inicio_str = data.get('fecha_inicio')
         fecha_fin_str = data.get('fecha_fin')
-        export = data.get('export', False)
+        formato = data.get('format') or ('xlsx' if data.get('export', False) else 'json')
         
         if not all([company_id, fecha_inicio_str, fecha_fin_str]):
             return JsonResponse({
@@ -1479,9 +1785,18 @@ def generate_issues_report_api(request):
                 'message': 'Faltan campos obligatorios'
             }, status=400)
         
+        if formato not in REPORT_FORMATS:
+            return JsonResponse({
+                'success': False,
+                'message': f'Formato no válido. Use uno de: {", ".join(REPORT_FORMATS)}'
+            }, status=400)
+        
         compania = Compania.objects.get(id=company_id)
         fecha_inicio = datetime.strptime(fecha_inicio_str, '%Y-%m-%d')
         fecha_fin = datetime.strptime(fecha_fin_str, '%Y-%m-%d')
+        # Texto normalizado para parámetros de trabajos y nombres de archivo
+        fecha_inicio_str = fecha_inicio.strftime('%Y-%m-%d')
+        fecha_fin_str = fecha_fin.strftime('%Y-%m-%d')
         
         # Consultar novedades en el rango de fechas
         novedades = Novedad.objects.filter(
@@ -1490,6 +1805,40 @@ def generate_issues_report_api(request):
             fecha_creacion__lte=fecha_fin
         ).select_related('creado_por', 'viaje', 'conductor__user', 'cliente__user')
         
+        # Generación en segundo plano: retorna el id del trabajo, que queda
+        # a nombre del usuario (un trabajo anónimo no podría consultarse)
+        if data.get('async'):
+            if not request.user.is_authenticated:
+                return job_login_required_response()
+            job, created = encolar_reporte('novedades', {
+                'company_id': compania.id,
+                'fecha_inicio': fecha_inicio_str,
+                'fecha_fin': fecha_fin_str
+            }, request.user)
+            return job_accepted_response(job, created)
+        
+        # CSV / NDJSON: filas en streaming directamente desde values_list()
+        if formato in ('csv', 'ndjson'):
+            columns, rows = issues_report_rows(compania, fecha_inicio, fecha_fin)
+            return flat_report_response(
+                formato, columns, rows,
+                f'reporte_novedades_{compania.nombre}_{fecha_inicio_str}_{fecha_fin_str}'
+            )
+        
+        # Si se solicita exportación a Excel
+        if formato == 'xlsx':
+            return cached_xlsx_response(
+                report_key('novedades', compania.id, fecha_inicio, fecha_fin, 'xlsx'),
+                f'reporte_novedades_{compania.nombre}_{fecha_inicio_str}_{fecha_fin_str}.xlsx',
+                lambda: build_issues_report(compania, fecha_inicio, fecha_fin)
+            )
+        
+        # Respuesta JSON (desde caché si el mismo reporte ya se generó)
+        cache_key = report_key('novedades', compania.id, fecha_inicio, fecha_fin, 'json')
+        cached = report_cache.get(cache_key)
+        if cached is not None:
+            return JsonResponse(cached, status=200)
+        
         reportes_data = []
         for novedad in novedades:
             reportes_data.append({
@@ -1506,78 +1855,13 @@ def generate_issues_report_api(request):
                 'fecha_resolucion': novedad.fecha_resolucion.strftime('%Y-%m-%d %H:%M') if novedad.fecha_resolucion else 'Pendiente'
             })
         
-        # Si se solicita exportación a Excel
-        if export:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Reporte de Novedades"
-            
-            # Estilo para encabezados
-            header_fill = PatternFill(start_color="FF6600", end_color="FF6600", fill_type="solid")
-            header_font = Font(bold=True, color="FFFFFF")
-            
-            # Título
-            ws.merge_cells('A1:K1')
-            title_cell = ws['A1']
-            title_cell.value = f"REPORTE DE NOVEDADES - {compania.nombre}"
-            title_cell.font = Font(bold=True, size=14)
-            title_cell.alignment = Alignment(horizontal='center')
-            
-            # Encabezados
-            ws.append([])
-            headers = ['ID', 'Fecha Creación', 'Tipo', 'Descripción', 'Estado', 'Prioridad', 
-                      'Creado Por', 'ID Viaje', 'Conductor', 'Cliente', 'Fecha Resolución']
-            ws.append(headers)
-            
-            # Aplicar estilo a encabezados
-            for cell in ws[3]:
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Datos
-            for reporte in reportes_data:
-                ws.append([
-                    reporte['id_novedad'],
-                    reporte['fecha_creacion'],
-                    reporte['tipo_novedad'],
-                    reporte['descripcion'],
-                    reporte['estado'],
-                    reporte['prioridad'],
-                    reporte['creado_por'],
-                    reporte['id_viaje'],
-                    reporte['conductor'],
-                    reporte['cliente'],
-                    reporte['fecha_resolucion']
-                ])
-            
-            # Ajustar ancho de columnas
-            ws.column_dimensions['A'].width = 8
-            ws.column_dimensions['B'].width = 18
-            ws.column_dimensions['C'].width = 18
-            ws.column_dimensions['D'].width = 40
-            ws.column_dimensions['E'].width = 15
-            ws.column_dimensions['F'].width = 12
-            ws.column_dimensions['G'].width = 20
-            ws.column_dimensions['H'].width = 10
-            ws.column_dimensions['I'].width = 25
-            ws.column_dimensions['J'].width = 25
-            ws.column_dimensions['K'].width = 18
-            
-            # Preparar respuesta de descarga
-            response = HttpResponse(
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            response['Content-Disposition'] = f'attachment; filename=reporte_novedades_{compania.nombre}_{fecha_inicio_str}_{fecha_fin_str}.xlsx'
-            wb.save(response)
-            return response
-        
-        # Respuesta JSON
-        return JsonResponse({
+        response_data = {
             'success': True,
             'count': len(reportes_data),
             'data': reportes_data
-        }, status=200)
+        }
+        report_cache.set(cache_key, response_data)
+        return JsonResponse(response_data, status=200)
     
     except Compania.DoesNotExist:
         return JsonResponse({